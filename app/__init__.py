@@ -1,6 +1,9 @@
-from flask import Flask
+import os
+
+from flask import Flask, abort
+from . import metrics
 from .config import Config
-from .extensions import db, migrate, login_manager
+from .extensions import configure_sqlite, db, migrate, login_manager
 
 def create_app(config_object=Config) -> Flask:
     app = Flask(__name__, instance_relative_config=True)
@@ -9,18 +12,65 @@ def create_app(config_object=Config) -> Flask:
     db.init_app(app)
     migrate.init_app(app, db)
     login_manager.init_app(app)
-
-    # Create tables automatically (simplifies local run; migrations optional)
     with app.app_context():
-        db.create_all()
+        configure_sqlite(db.engine, app.config.get("SQLITE_PRAGMAS", ""))
+
+    from .auth.identity import user_cache
+    user_cache.invalidate()
+    user_cache.ttl_s = float(app.config.get("USER_CACHE_TTL_S", 60))
+    user_cache.maxsize = int(app.config.get("USER_CACHE_SIZE", 1024))
+
+    # tabele tworzy `flask init-db` raz przy wdrożeniu; DB_AUTO_CREATE=1 (domyślnie lokalnie)
+    # tworzy je przy każdym starcie – wygodne w dev, ale każdy worker płaci za to osobno
+    if app.config.get("DB_AUTO_CREATE", False):
+        with app.app_context():
+            db.create_all()
+
+    metrics.init_app(app)
 
     from .auth.routes import bp as auth_bp
     from .dashboard.routes import bp as dashboard_bp
     app.register_blueprint(auth_bp)
     app.register_blueprint(dashboard_bp)
 
+    from .dashboard.services import fragments, memo, series_indexes
+    memo.maxsize = int(app.config.get("DASHBOARD_MEMO_SIZE", 8))
+    fragments.maxsize = int(app.config.get("FRAGMENT_CACHE_SIZE", 64))
+    series_indexes.maxsize = int(app.config.get("SERIES_INDEX_SIZE", 4))
+
+    from .data.cache import configure_shared_cache
+    configure_shared_cache(
+        app.config.get("SHARED_CACHE_URL") or None,
+        ttl_s=float(app.config.get("SHARED_CACHE_TTL_S", 7 * 24 * 3600)),
+        lock_ttl_s=float(app.config.get("SHARED_CACHE_LOCK_TTL_S", 900.0)),
+    )
+
+    from .data.charts import configure_renderer
+    configure_renderer(
+        mode=app.config.get("CHART_RENDER_MODE", "inline"),
+        max_workers=int(app.config.get("CHART_RENDER_WORKERS", 3)),
+        wait_s=float(app.config.get("CHART_RENDER_WAIT_S", 1.0)),
+    )
+
+    from .dashboard.services import create_refresher
+    refresher = create_refresher(app.config)
+    app.extensions["bdl_refresher"] = refresher
+    # przy debug reloaderze create_app woła się też w procesie-obserwatorze – tam bez harmonogramu
+    reloader_parent = app.debug and os.environ.get("WERKZEUG_RUN_MAIN") != "true"
+    if app.config.get("REFRESH_SCHEDULER", False) and not app.testing and not reloader_parent:
+        refresher.start_scheduler()
+
+    from .cli import register_cli
+    register_cli(app)
+
     @app.get("/health")
     def health():
-        return {"status": "ok"}
+        return {"status": "ok", "data": refresher.health()}
+
+    @app.get("/metrics")
+    def metrics_endpoint():
+        if not metrics.enabled():
+            abort(404)
+        return metrics.registry.render(), 200, {"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
 
     return app
@@ -0,0 +1,114 @@
+"""
+Cache tożsamości dla `login_manager.user_loader`: każde zalogowane zapytanie ładuje użytkownika
+z sesji, a bez cache to osobne SELECT do SQLite na każde zapytanie.
+
+Trzymamy tylko kolumny wiersza (nie obiekt ORM – ten jest związany z sesją zapytania)
+i przy trafieniu odtwarzamy z nich odłączony obiekt User: kolumny są załadowane, więc
+current_user.email itp. działa bez sesji; db.session.add(current_user) dołącza go jak zwykle.
+Wpis żyje USER_CACHE_TTL_S sekund; zmiana albo usunięcie użytkownika przez ORM czyści go
+od razu w tym procesie, pozostałe workery widzą zmianę najpóźniej po TTL.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+from sqlalchemy import event
+from sqlalchemy.orm import make_transient_to_detached
+
+from .. import metrics
+from ..extensions import db
+from ..models import User
+
+_Key = tuple[str, int]
+
+
+class UserCache:
+    """Ograniczony (LRU) cache kolumn użytkowników z czasem życia wpisu; ttl_s <= 0 wyłącza cache."""
+
+    def __init__(self, maxsize: int = 1024, ttl_s: float = 60.0) -> None:
+        self.maxsize = maxsize
+        self.ttl_s = ttl_s
+        self._items: OrderedDict[_Key, tuple[float, dict[str, Any]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_s > 0 and self.maxsize > 0
+
+    def get(self, key: _Key) -> dict[str, Any] | None:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            expires, row = item
+            if expires <= time.monotonic():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return row
+
+    def put(self, key: _Key, row: dict[str, Any]) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._items[key] = (time.monotonic() + self.ttl_s, row)
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def invalidate(self, user_id: int | None = None) -> None:
+        with self._lock:
+            if user_id is None:
+                self._items.clear()
+                return
+            for k in [k for k in self._items if k[1] == user_id]:
+                del self._items[k]
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+user_cache = UserCache()
+
+
+def _row(user: User) -> dict[str, Any]:
+    return {c.key: getattr(user, c.key) for c in User.__table__.columns}
+
+
+def _detached(row: dict[str, Any]) -> User:
+    """Obiekt User z zapamiętanych kolumn, ze stanem „odłączony” (jak po zamknięciu sesji)."""
+    user = User(**row)
+    make_transient_to_detached(user)
+    return user
+
+
+def load_user(user_id: str) -> User | None:
+    try:
+        uid = int(user_id)
+    except (TypeError, ValueError):
+        return None
+    if not user_cache.enabled:
+        return db.session.get(User, uid)
+
+    # ta sama liczba id w dwóch bazach (np. testy, DATABASE_URL) to różni użytkownicy
+    key = (str(db.engine.url), uid)
+    row = user_cache.get(key)
+    if row is not None:
+        metrics.inc("user_cache_lookups_total", result="hit")
+        return _detached(row)
+
+    metrics.inc("user_cache_lookups_total", result="miss")
+    user = db.session.get(User, uid)
+    if user is not None:
+        user_cache.put(key, _row(user))
+    return user
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_user(mapper, connection, target: User) -> None:
+    # zmiany masowe (query.update/delete) omijają zdarzenia mappera – po nich user_cache.invalidate()
+    user_cache.invalidate(target.id)
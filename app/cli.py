@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import json
+
+import click
+from flask import Flask, current_app
+from flask.cli import with_appcontext
+
+from .dashboard.services import allowed_unit_levels, create_refresher
+from .extensions import db
+
+
+@click.command("refresh")
+@click.option("--level", type=int, default=None, help="poziom jednostek BDL (2, 5, 6); domyślnie BDL_UNIT_LEVEL")
+@click.option("--async/--sync", "use_async", default=None, help="pobieranie przez AsyncBDLClient; domyślnie BDL_ASYNC")
+@click.option("--timeout", type=float, default=None, help="przerwij pobieranie z BDL po tylu sekundach (tylko --async)")
+@with_appcontext
+def refresh_command(level: int | None, use_async: bool | None, timeout: float | None) -> None:
+    """Odświeża cache BDL teraz, niezależnie od jego wieku (np. z crona)."""
+    cfg = current_app.config
+    if level is not None and level not in allowed_unit_levels(cfg):
+        raise click.BadParameter(f"unit level {level} is not in UNIT_LEVELS", param_hint="--level")
+    refresher = create_refresher(cfg, level)
+    if use_async is not None:
+        refresher.use_async = use_async
+    if timeout is not None:
+        refresher.refresh_timeout_s = timeout or None
+    ok = refresher.refresh_now()
+    click.echo(json.dumps(refresher.health()["refresh"], ensure_ascii=False, indent=2))
+    if not ok:
+        raise SystemExit(1)
+
+
+@click.command("init-db")
+@with_appcontext
+def init_db_command() -> None:
+    """Tworzy brakujące tabele – raz przy wdrożeniu, zamiast przy starcie każdego workera."""
+    db.create_all()
+    click.echo(f"Database ready: {db.engine.url.render_as_string(hide_password=True)}")
+
+
+@click.command("startup-report")
+@click.option("--top", type=int, default=15, show_default=True, help="ile pakietów pokazać")
+@click.option("--budget-ms", type=float, default=None, help="kod wyjścia 1, gdy zimny start trwa dłużej")
+@click.option("--json", "as_json", is_flag=True, help="wynik jako JSON (np. do CI)")
+def startup_report_command(top: int, budget_ms: float | None, as_json: bool) -> None:
+    """Mierzy zimny start (importy + create_app) w świeżym procesie: python -X importtime."""
+    from .startup import measure_startup
+
+    report = measure_startup()
+    if as_json:
+        click.echo(json.dumps(report.as_dict(top), ensure_ascii=False, indent=2))
+    else:
+        click.echo(
+            f"cold start: {report.total_s * 1000:.0f} ms "
+            f"(imports {report.import_s * 1000:.0f} ms, create_app {report.create_app_s * 1000:.0f} ms)"
+        )
+        for name, ms in report.packages(top):
+            click.echo(f"  {ms:8.1f} ms  {name}")
+        if report.heavy_loaded:
+            click.echo(f"heavy modules loaded at startup: {', '.join(report.heavy_loaded)}")
+    if budget_ms is not None and report.total_s * 1000 > budget_ms:
+        click.echo(f"cold start exceeds budget of {budget_ms:g} ms", err=True)
+        raise SystemExit(1)
+
+
+def register_cli(app: Flask) -> None:
+    app.cli.add_command(refresh_command)
+    app.cli.add_command(init_db_command)
+    app.cli.add_command(startup_report_command)
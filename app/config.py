@@ -1,6 +1,14 @@
 import os
 from pathlib import Path
 
+
+def _engine_options(uri: str, pool_size: int) -> dict:
+    """Pula połączeń dla bazy w pliku/na serwerze; SQLite w pamięci zostaje przy puli Flask-SQLAlchemy."""
+    if uri.startswith("sqlite") and (uri in ("sqlite://", "sqlite:///:memory:") or "mode=memory" in uri):
+        return {}
+    return {"pool_size": pool_size, "max_overflow": pool_size, "pool_timeout": 10}
+
+
 class Config:
     SECRET_KEY = os.getenv("SECRET_KEY", "dev-only-change-me")
     DEBUG = os.getenv("FLASK_DEBUG", "0") == "1"
@@ -8,11 +16,94 @@ class Config:
     DB_PATH = os.getenv("DB_PATH", str(Path("instance") / "app.sqlite3"))
     SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL", f"sqlite:///{DB_PATH}")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # 0 w kontenerze: schemat tworzy `flask init-db` przed startem workerów
+    DB_AUTO_CREATE = os.getenv("DB_AUTO_CREATE", "1") == "1"
+    # połączenia trzymane w puli (+ tyle samo nadmiarowych) – bez otwierania pliku SQLite na zapytanie
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+    SQLALCHEMY_ENGINE_OPTIONS = _engine_options(SQLALCHEMY_DATABASE_URI, DB_POOL_SIZE)
+    # PRAGMA na każde nowe połączenie SQLite: WAL – czytelnicy nie czekają na zapis (/register),
+    # busy_timeout – piszący czeka na blokadę zamiast „database is locked”; "" = ustawienia SQLite
+    SQLITE_PRAGMAS = os.getenv("SQLITE_PRAGMAS", "journal_mode=WAL,synchronous=NORMAL,busy_timeout=5000")
+
+    # użytkownik z sesji brany z pamięci procesu zamiast SELECT na każde zapytanie;
+    # zmiany w innych workerach widać najpóźniej po USER_CACHE_TTL_S (0 = bez cache)
+    USER_CACHE_TTL_S = float(os.getenv("USER_CACHE_TTL_S", "60"))
+    USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "1024"))
 
     WTF_CSRF_ENABLED = os.getenv("WTF_CSRF_ENABLED", "1") == "1"
 
     BDL_BASE_URL = os.getenv("BDL_BASE_URL", "https://bdl.stat.gov.pl/api/v1")
     BDL_CLIENT_ID = os.getenv("BDL_CLIENT_ID", "").strip()
+    BDL_TIMEOUT_S = float(os.getenv("BDL_TIMEOUT_S", "20"))
+    BDL_POOL_SIZE = int(os.getenv("BDL_POOL_SIZE", "8"))
+    BDL_MAX_RETRIES = int(os.getenv("BDL_MAX_RETRIES", "4"))
+    BDL_MAX_WORKERS = int(os.getenv("BDL_MAX_WORKERS", "4"))
+    BDL_MIN_INTERVAL_S = float(os.getenv("BDL_MIN_INTERVAL_S", "0"))
+
+    # zakres lat; odświeżenie pobiera tylko brakujące lata i BDL_MUTABLE_YEARS ostatnich lat z danymi
+    BDL_START_YEAR = int(os.getenv("BDL_START_YEAR", "2015"))
+    # poziom jednostek: 2 = województwa, 5 = powiaty, 6 = gminy; UNIT_LEVELS = poziomy do wyboru w ?level=
+    BDL_UNIT_LEVEL = int(os.getenv("BDL_UNIT_LEVEL", "2"))
+    UNIT_LEVELS = os.getenv("UNIT_LEVELS", "2,5,6")
+    BDL_MUTABLE_YEARS = int(os.getenv("BDL_MUTABLE_YEARS", "2"))
+    # >0: starsze partycje (rok, zmienna) i tak pobieramy ponownie po tylu dniach
+    BDL_PARTITION_MAX_AGE_DAYS = float(os.getenv("BDL_PARTITION_MAX_AGE_DAYS", "0"))
+    # id zmiennych BDL są zapamiętywane na tyle dni; nadpisanie: "unemployment_rate=60270,avg_wage=64428"
+    BDL_VARIABLE_TTL_DAYS = float(os.getenv("BDL_VARIABLE_TTL_DAYS", "30"))
+    BDL_VARIABLE_OVERRIDES = os.getenv("BDL_VARIABLE_OVERRIDES", "")
+    # wskaźniki zbioru (app/data/indicators.py) – do unemployment_rate i avg_wage, np. "job_offers";
+    # BDL_INDICATOR_DEFS: własne wpisy jako JSON [{"column", "phrase", "unit", "name", "reject"}]
+    BDL_INDICATORS = os.getenv("BDL_INDICATORS", "")
+    BDL_INDICATOR_DEFS = os.getenv("BDL_INDICATOR_DEFS", "")
+    # zmienne z tymi samymi latami idą wspólnie: auto wybiera /data/by-variable albo /data/by-unit
+    # (do BDL_MAX_VARS_PER_CALL zmiennych w zapytaniu) według szacowanej liczby zapytań
+    BDL_BATCH_STRATEGY = os.getenv("BDL_BATCH_STRATEGY", "auto")
+    BDL_MAX_VARS_PER_CALL = int(os.getenv("BDL_MAX_VARS_PER_CALL", "20"))
+
+    # odświeżenie w tle i `flask refresh` przez AsyncBDLClient (httpx): strony idą z jednej pętli
+    # asyncio, najwyżej BDL_ASYNC_CONCURRENCY naraz; BDL_REFRESH_TIMEOUT_S > 0 przerywa całe pobieranie
+    BDL_ASYNC = os.getenv("BDL_ASYNC", "0") == "1"
+    BDL_ASYNC_CONCURRENCY = int(os.getenv("BDL_ASYNC_CONCURRENCY", "16"))
+    BDL_REFRESH_TIMEOUT_S = float(os.getenv("BDL_REFRESH_TIMEOUT_S", "0"))
 
     CACHE_DIR = os.getenv("CACHE_DIR", str(Path("instance") / "cache"))
     CACHE_MAX_AGE_HOURS = int(os.getenv("CACHE_MAX_AGE_HOURS", "168"))
+    # nieświeży cache serwujemy od razu, a odświeżenie BDL idzie w tle
+    STALE_WHILE_REVALIDATE = os.getenv("STALE_WHILE_REVALIDATE", "1") == "1"
+    # wątek odświeżający cache zawczasu (po REFRESH_LEAD_FRACTION * CACHE_MAX_AGE_HOURS)
+    REFRESH_SCHEDULER = os.getenv("REFRESH_SCHEDULER", "1") == "1"
+    REFRESH_LEAD_FRACTION = float(os.getenv("REFRESH_LEAD_FRACTION", "0.9"))
+    # ile zapytanie bez żadnego cache czeka, aż inny proces skończy odświeżanie
+    CACHE_LOCK_TIMEOUT_S = float(os.getenv("CACHE_LOCK_TIMEOUT_S", "300"))
+    # wspólny cache replik (dane, agregaty, PNG): "" = wyłączony | redis://redis:6379/0 |
+    # sqlite:////shared/cache.db | disk:///shared/cache
+    SHARED_CACHE_URL = os.getenv("SHARED_CACHE_URL", "")
+    SHARED_CACHE_TTL_S = float(os.getenv("SHARED_CACHE_TTL_S", str(7 * 24 * 3600)))
+    # TTL blokady odświeżania między replikami; właściciel przedłuża ją co 1/3 TTL, więc
+    # wygasa tylko po padnięciu repliki – tyle czekają pozostałe, zanim przejmą odświeżanie
+    SHARED_CACHE_LOCK_TTL_S = float(os.getenv("SHARED_CACHE_LOCK_TTL_S", "900"))
+
+    # parquet | feather | csv.gz (bez pyarrow zawsze csv.gz; stary CSV.gz jest migrowany przy odczycie)
+    CACHE_FORMAT = os.getenv("CACHE_FORMAT", "parquet")
+    # ile wersji wyników dashboardu trzymać w pamięci procesu
+    DASHBOARD_MEMO_SIZE = int(os.getenv("DASHBOARD_MEMO_SIZE", "8"))
+    # ile wyrenderowanych fragmentów HTML (podsumowanie, strony rankingu) trzymać w pamięci
+    FRAGMENT_CACHE_SIZE = int(os.getenv("FRAGMENT_CACHE_SIZE", "64"))
+
+    # liczniki/histogramy na /metrics (format Prometheusa) i nagłówek Server-Timing z etapami zapytania
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+    SERVER_TIMING = os.getenv("SERVER_TIMING", "1") == "1"
+
+    # png = wykresy renderowane na serwerze; client = przeglądarka rysuje z /api/charts/<nazwa>
+    CHART_MODE = os.getenv("CHART_MODE", "png")
+    # wiersze rankingu na stronę (gminy: ~2500 jednostek)
+    RANKING_PAGE_SIZE = int(os.getenv("RANKING_PAGE_SIZE", "50"))
+    # /api/series i /api/ranking: ile wersji indeksu trzymać w pamięci, największe dozwolone ?limit=
+    SERIES_INDEX_SIZE = int(os.getenv("SERIES_INDEX_SIZE", "4"))
+    API_MAX_LIMIT = int(os.getenv("API_MAX_LIMIT", "500"))
+
+    # pool = wykresy w puli procesów poza wątkiem zapytania; inline = w bieżącym wątku
+    CHART_RENDER_MODE = os.getenv("CHART_RENDER_MODE", "pool")
+    CHART_RENDER_WORKERS = int(os.getenv("CHART_RENDER_WORKERS", "3"))
+    # ile zapytanie czeka na wykres, zanim odda placeholder (0 = nie czeka wcale)
+    CHART_RENDER_WAIT_S = float(os.getenv("CHART_RENDER_WAIT_S", "1.0"))
@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import csv
+import hashlib
+import json
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Iterator, Sequence
+
+from ..data.cache import HAS_PYARROW, atomic_write
+
+# ile wierszy naraz trafia do pliku (grupa wierszy w Parquet, porcja w CSV)
+CHUNK_ROWS = 5000
+# ile wersji eksportu danego rodzaju zostaje na dysku (pobieranie mogło właśnie trwać)
+KEEP_VERSIONS = 2
+
+SHEETS = (("ranking", "Ranking"), ("top5", "Top5"), ("bottom5", "Bottom5"))
+
+
+@dataclass(frozen=True)
+class ExportFormat:
+    name: str
+    suffix: str
+    mimetype: str
+    write: Callable[[dict[str, Any], Path], None]
+    requires_pyarrow: bool = False
+
+
+def _chunks(rows: Sequence[Any], size: int = CHUNK_ROWS) -> Iterator[Sequence[Any]]:
+    for start in range(0, len(rows), size):
+        yield rows[start : start + size]
+
+
+def _write_xlsx(data: dict[str, Any], path: Path) -> None:
+    from openpyxl import Workbook
+
+    # tryb write-only: wiersze idą prosto do pliku, bez modelu komórek całego skoroszytu w pamięci
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Podsumowanie")
+    ws.append(["Parametr", "Wartość"])
+    for k, v in data["summary"].items():
+        ws.append([k, v])
+    for name, sheet in SHEETS:
+        table = data["tables"][name]
+        ws = wb.create_sheet(sheet)
+        ws.append(table["columns"])
+        for row in table["rows"]:
+            ws.append(row)
+    wb.save(path)
+
+
+def _write_csv(data: dict[str, Any], path: Path) -> None:
+    # CSV i Parquet niosą jedną tabelę – pełny ranking jednostek
+    table = data["tables"]["ranking"]
+    with path.open("w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(table["columns"])
+        for chunk in _chunks(table["rows"]):
+            writer.writerows(chunk)
+
+
+def _write_parquet(data: dict[str, Any], path: Path) -> None:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    table = data["tables"]["ranking"]
+    columns = table["columns"]
+    # pierwsza kolumna to nazwa jednostki, reszta liczby
+    schema = pa.schema([(c, pa.string() if i == 0 else pa.float64()) for i, c in enumerate(columns)])
+    with pq.ParquetWriter(path, schema, compression="zstd") as writer:
+        for chunk in _chunks(table["rows"]):
+            cols = {c: [r[i] for r in chunk] for i, c in enumerate(columns)}
+            writer.write_table(pa.table(cols, schema=schema))
+        if not table["rows"]:
+            writer.write_table(schema.empty_table())
+
+
+EXPORT_FORMATS: dict[str, ExportFormat] = {
+    "xlsx": ExportFormat(
+        "xlsx", "xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", _write_xlsx
+    ),
+    "csv": ExportFormat("csv", "csv", "text/csv", _write_csv),
+    "parquet": ExportFormat(
+        "parquet", "parquet", "application/vnd.apache.parquet", _write_parquet, requires_pyarrow=True
+    ),
+}
+
+
+def export_available(name: str) -> bool:
+    fmt = EXPORT_FORMATS.get(name)
+    return fmt is not None and (HAS_PYARROW or not fmt.requires_pyarrow)
+
+
+def _export_token(data: dict[str, Any]) -> str:
+    # wersja danych (klucz + odcisk cache) wyznacza treść eksportu; bez niej – hash treści
+    version = data.get("version")
+    if version is not None:
+        raw = repr(tuple(version[1:]))
+    else:
+        raw = json.dumps([data["summary"], data["tables"]], sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def _prune(exports_dir: Path, prefix: str, suffix: str, keep: int = KEEP_VERSIONS) -> None:
+    files = sorted(exports_dir.glob(f"{prefix}-*.{suffix}"), key=lambda p: p.stat().st_mtime, reverse=True)
+    for p in files[keep:]:
+        p.unlink(missing_ok=True)
+
+
+_write_lock = threading.Lock()
+
+
+def get_export(exports_dir: Path, data: dict[str, Any], name: str) -> Path:
+    """
+    Plik eksportu dla wersji danych z `data` – generowany raz, potem tylko serwowany z dysku.
+    Nazwa zawiera poziom jednostek i wersję danych, więc nowy odczyt BDL daje nowy plik.
+    """
+    fmt = EXPORT_FORMATS[name]
+    prefix = f"raport-level{data.get('unit_level', 2)}"
+    path = exports_dir / f"{prefix}-{_export_token(data)}.{fmt.suffix}"
+    if path.exists():
+        return path
+    exports_dir.mkdir(parents=True, exist_ok=True)
+    # w obrębie procesu generuje jeden wątek; między procesami chroni atomowy zapis
+    with _write_lock:
+        if not path.exists():
+            atomic_write(path, lambda p: fmt.write(data, p))
+            _prune(exports_dir, prefix, fmt.suffix)
+    return path
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import hashlib
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Iterable
+
+from flask import Flask
+
+# treść pliku po (ścieżka, mtime, rozmiar) – hash liczony raz na wersję pliku
+_file_hashes: dict[tuple[str, int, int], str] = {}
+_hash_lock = threading.Lock()
+
+
+def file_version(path: Path) -> str | None:
+    """Krótki hash treści pliku (do ?v= w adresach statycznych i tokenu renderowania)."""
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    key = (str(path), st.st_mtime_ns, st.st_size)
+    with _hash_lock:
+        digest = _file_hashes.get(key)
+    if digest is None:
+        digest = hashlib.sha256(path.read_bytes()).hexdigest()[:12]
+        with _hash_lock:
+            _file_hashes[key] = digest
+    return digest
+
+
+def _render_files(app: Flask) -> Iterable[Path]:
+    yield from sorted(Path(app.root_path, app.template_folder or "templates").rglob("*.html"))
+    static = Path(app.static_folder or "")
+    for sub in ("css", "js"):
+        yield from sorted(p for p in (static / sub).rglob("*") if p.is_file())
+
+
+def render_token(app: Flask) -> str:
+    """
+    Wersja „kodu widoku”: szablony + CSS/JS. Wchodzi do ETag i kluczy fragmentów,
+    więc wdrożenie zmienionego szablonu nie zostawia w przeglądarkach starego HTML.
+    """
+    h = hashlib.sha256()
+    for p in _render_files(app):
+        h.update(f"{p.name}:{file_version(p)}".encode("utf-8"))
+    return h.hexdigest()[:16]
+
+
+def version_modified_at(version: tuple | None) -> datetime | None:
+    # version = (cache_dir, key, "<created_at_iso>|<hash>") z services._memo_key
+    if not version:
+        return None
+    try:
+        return datetime.fromisoformat(str(version[2]).split("|", 1)[0]).astimezone(timezone.utc)
+    except ValueError:
+        return None
+
+
+def view_etag(*parts: Any) -> str:
+    return hashlib.sha256(repr(parts).encode("utf-8")).hexdigest()[:32]
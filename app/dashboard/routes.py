@@ -1,67 +1,379 @@
+import re
 from pathlib import Path
-from io import BytesIO
 from datetime import datetime
 
-import pandas as pd
-from flask import Blueprint, current_app, render_template, send_file
-from flask_login import login_required
+from flask import (
+    Blueprint,
+    abort,
+    current_app,
+    jsonify,
+    make_response,
+    render_template,
+    request,
+    send_file,
+    session,
+    url_for,
+)
+from flask_login import current_user, login_required
+from markupsafe import Markup
 
-from .services import get_dashboard_data
+from ..data.charts import BAR_TOP_N
+from ..data.units import unit_level_labels
+from .exports import EXPORT_FORMATS, export_available, get_export
+from .http_cache import file_version, render_token, version_modified_at, view_etag
+from .services import (
+    allowed_unit_levels,
+    bdl_options_from_config,
+    create_refresher,
+    dataset_options_from_config,
+    fragments,
+    get_dashboard_data,
+    get_series_index,
+    paginate,
+)
 
 bp = Blueprint("dashboard", __name__)
 
+CHART_MODES = ("png", "client")
+CHART_SERIES = ("trend", "bar_unemp", "scatter", "hist_unemp")
 
-def _build_data():
-    cache_dir = Path(current_app.config["CACHE_DIR"])
-    charts_dir = Path(current_app.root_path) / "static" / "charts"
-    charts_dir.mkdir(parents=True, exist_ok=True)
+# charts/<rodzaj>-<hash>.png – treść pod danym adresem nigdy się nie zmienia
+_CHART_URL_RE = re.compile(r"^charts/[a-z_]+-[0-9a-f]{16}\.png$")
+STATIC_MAX_AGE_S = 365 * 24 * 3600
+
+
+@bp.app_url_defaults
+def _versioned_static_urls(endpoint: str, values: dict) -> None:
+    # url_for('static', filename='css/x.css') -> /static/css/x.css?v=<hash treści>
+    if endpoint != "static" or "v" in values:
+        return
+    filename = values.get("filename") or ""
+    if _CHART_URL_RE.match(filename):
+        return  # PNG wykresów mają hash już w nazwie
+    version = file_version(Path(current_app.static_folder) / filename)
+    if version:
+        values["v"] = version
+
+
+@bp.after_app_request
+def _immutable_static_headers(response):
+    if request.endpoint != "static" or response.status_code not in (200, 304):
+        return response
+    filename = (request.view_args or {}).get("filename", "")
+    v = request.args.get("v")
+    # adres z hashem treści nigdy nie zmienia zawartości; stary ?v= dostaje zwykłe nagłówki
+    if _CHART_URL_RE.match(filename) or (v and v == file_version(Path(current_app.static_folder) / filename)):
+        response.cache_control.public = True
+        response.cache_control.max_age = STATIC_MAX_AGE_S
+        response.cache_control.immutable = True
+    return response
+
+
+def _chart_mode() -> str:
+    # ?charts=client|png nadpisuje CHART_MODE dla pojedynczego widoku
+    mode = (request.args.get("charts") or current_app.config.get("CHART_MODE") or "png").lower()
+    return mode if mode in CHART_MODES else "png"
 
-    return get_dashboard_data(
-        cache_dir=cache_dir,
-        static_charts_dir=charts_dir,
+
+def _unit_level() -> int:
+    # ?level=5 (powiaty) / 6 (gminy) – tylko poziomy dozwolone w UNIT_LEVELS
+    levels = allowed_unit_levels(current_app.config)
+    level = request.args.get("level", type=int)
+    return level if level in levels else int(current_app.config.get("BDL_UNIT_LEVEL", 2))
+
+
+def _refresher(level: int):
+    default = current_app.extensions.get("bdl_refresher")
+    if default is not None and default.dataset_options.get("unit_level") == level:
+        return default
+    # pozostałe poziomy dostają własny refresher przy pierwszym użyciu (bez harmonogramu)
+    refreshers = current_app.extensions.setdefault("bdl_refreshers", {})
+    if level not in refreshers:
+        refreshers[level] = create_refresher(current_app.config, unit_level=level)
+    return refreshers[level]
+
+
+def _dataset_source(level: int) -> dict:
+    """Skąd i jak brać zbiór danego poziomu – wspólne dla dashboardu, eksportów i API."""
+    revalidate = None
+    if current_app.config.get("STALE_WHILE_REVALIDATE", False):
+        revalidate = _refresher(level).trigger
+
+    return dict(
+        cache_dir=Path(current_app.config["CACHE_DIR"]),
         max_age_hours=int(current_app.config["CACHE_MAX_AGE_HOURS"]),
         bdl_client_id=current_app.config.get("BDL_CLIENT_ID") or None,
         bdl_base_url=current_app.config.get("BDL_BASE_URL"),
+        bdl_options=bdl_options_from_config(current_app.config),
+        cache_format=current_app.config.get("CACHE_FORMAT") or None,
+        revalidate=revalidate,
+        lock_timeout_s=float(current_app.config.get("CACHE_LOCK_TIMEOUT_S", 300.0)),
+        dataset_options=dataset_options_from_config(current_app.config, level),
     )
 
 
+def _build_data(with_charts: bool = True):
+    charts_dir = Path(current_app.root_path) / "static" / "charts"
+    charts_dir.mkdir(parents=True, exist_ok=True)
+    return get_dashboard_data(static_charts_dir=charts_dir, with_charts=with_charts, **_dataset_source(_unit_level()))
+
+
+def _fragment(name: str, version: tuple | None, params: tuple, **context) -> Markup:
+    """
+    Wyrenderowany fragment (_summary / _ranking) z cache – klucz: wersja danych, wersja
+    szablonów i parametry widoku. Fragmenty nie zależą od użytkownika.
+    """
+    key = None if version is None else (*version, render_token(current_app), name, *params)
+    html = fragments.get(key) if key else None
+    if html is None:
+        html = Markup(render_template(f"_{name}.html", **context))
+        if key:
+            fragments.put(key, html)
+    return html
+
+
+def _set_validators(response, etag: str, modified_at) -> None:
+    response.set_etag(etag)
+    if modified_at is not None:
+        response.last_modified = modified_at
+    # HTML zawiera dane konta – tylko cache przeglądarki, zawsze z rewalidacją
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+
+
 @bp.get("/dashboard")
 @login_required
 def dashboard():
-    data = _build_data()
-    return render_template(
+    chart_mode = _chart_mode()
+    data = _build_data(with_charts=chart_mode == "png")
+    level = data["unit_level"]
+    version = data["version"]
+
+    # 304 bez renderowania: ta sama wersja danych, ten sam użytkownik i adres, te same PNG.
+    # Pomijamy, gdy wykresy jeszcze się renderują albo czeka komunikat flash.
+    etag = view_etag(version, current_user.get_id(), request.full_path, data["chart_paths"], render_token(current_app))
+    modified_at = version_modified_at(version)
+    conditional = version is not None and not data["charts_pending"] and not session.get("_flashes")
+    if conditional:
+        probe = current_app.response_class()
+        _set_validators(probe, etag, modified_at)
+        if probe.make_conditional(request).status_code == 304:
+            return probe
+
+    per_page = int(current_app.config.get("RANKING_PAGE_SIZE", 50))
+    ranking = paginate(data["tables"]["ranking"]["rows"], request.args.get("page", 1, type=int), per_page)
+    labels = unit_level_labels(level)
+    html = render_template(
         "dashboard.html",
+        title=f"Raport: rynek pracy – {labels.plural} (BDL)",
+        fragments={
+            "summary": _fragment("summary", version, (), summary=data["summary"]),
+            "ranking": _fragment(
+                "ranking",
+                version,
+                (level, ranking["page"], per_page, request.args.get("charts")),
+                summary=data["summary"],
+                tables=data["tables"],
+                ranking=ranking,
+                unit_level=level,
+                unit_labels=labels,
+            ),
+        },
         summary=data["summary"],
-        tables=data["tables"],
         chart_paths=data["chart_paths"],
+        charts_pending=data.get("charts_pending", False),
+        chart_mode=chart_mode,
+        aggregated=data["aggregated"],
+        unit_level=level,
+        unit_labels=labels,
+        unit_levels=[(lv, unit_level_labels(lv).plural) for lv in allowed_unit_levels(current_app.config)],
+        bar_top_n=BAR_TOP_N,
     )
+    response = make_response(html)
+    if conditional:
+        _set_validators(response, etag, modified_at)
+    return response
 
 
-@bp.get("/export/excel")
+@bp.get("/api/charts/<name>")
 @login_required
-def export_excel():
-    data = _build_data()
-    summary = data["summary"]
-    tables = data["tables"]
-
-    buf = BytesIO()
-    with pd.ExcelWriter(buf, engine="openpyxl") as writer:
-        pd.DataFrame([{"Parametr": k, "Wartość": v} for k, v in summary.items()]).to_excel(
-            writer, index=False, sheet_name="Podsumowanie"
-        )
-        tables["ranking"].to_excel(writer, index=False, sheet_name="Ranking")
-        tables["top5"].to_excel(writer, index=False, sheet_name="Top5")
-        tables["bottom5"].to_excel(writer, index=False, sheet_name="Bottom5")
-
-    buf.seek(0)
-    filename = f"bdl_raport_{datetime.now().strftime('%Y-%m-%d_%H-%M')}.xlsx"
-    return send_file(
-        buf,
+def chart_data(name: str):
+    if name not in CHART_SERIES:
+        abort(404)
+    data = _build_data(with_charts=False)
+    response = jsonify(data["series"][name])
+    # ETag z treści serii: przeglądarka dostaje 304, dopóki dane się nie zmienią
+    response.add_etag()
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
+def _api_error(status: int, message: str):
+    abort(make_response(jsonify({"error": message}), status))
+
+
+def _int_arg(name: str, default: int | None = None, minimum: int | None = None) -> int | None:
+    raw = request.args.get(name)
+    if raw is None or raw == "":
+        return default
+    try:
+        value = int(raw)
+    except ValueError:
+        _api_error(400, f"Parameter '{name}' must be an integer")
+    if minimum is not None and value < minimum:
+        _api_error(400, f"Parameter '{name}' must be >= {minimum}")
+    return value
+
+
+def _list_arg(name: str) -> list[str]:
+    # ?unit=a,b i ?unit=a&unit=b znaczą to samo
+    return [v.strip() for raw in request.args.getlist(name) for v in raw.split(",") if v.strip()]
+
+
+def _window() -> tuple[int, int]:
+    max_limit = int(current_app.config.get("API_MAX_LIMIT", 500))
+    limit = min(_int_arg("limit", int(current_app.config.get("RANKING_PAGE_SIZE", 50)), minimum=1), max_limit)
+    return _int_arg("offset", 0, minimum=0), limit
+
+
+def _page(total: int, offset: int, limit: int) -> dict:
+    nxt = None
+    if offset + limit < total:
+        args = {**request.args.to_dict(flat=False), "offset": offset + limit, "limit": limit}
+        nxt = url_for(request.endpoint, **args)
+    return {"total": total, "offset": offset, "limit": limit, "next": nxt}
+
+
+def _api_response(version: tuple | None, build):
+    """
+    JSON z indeksu z ETag wersji danych i adresu: 304 zapada przed budowaniem odpowiedzi.
+    Dane nie zależą od użytkownika, ale wymagają logowania – tylko cache prywatny.
+    """
+    etag = view_etag(version, request.full_path)
+    modified_at = version_modified_at(version)
+    if version is not None:
+        probe = current_app.response_class()
+        _set_validators(probe, etag, modified_at)
+        if probe.make_conditional(request).status_code == 304:
+            return probe
+    response = jsonify(build())
+    if version is not None:
+        _set_validators(response, etag, modified_at)
+    return response
+
+
+def _metrics_arg(index, default: tuple[str, ...]) -> tuple[str, ...]:
+    names = tuple(_list_arg("metric")) or default
+    unknown = [m for m in names if m not in index.metrics]
+    if unknown:
+        _api_error(400, f"Unknown metric(s): {', '.join(unknown)} (available: {', '.join(index.metrics)})")
+    return names
+
+
+@bp.get("/api/series")
+@login_required
+def api_series():
+    """
+    Szeregi czasowe jednostek: ?unit=<unitId>[,...]&metric=<kolumna>[,...]&from=&to=&level=.
+    Bez ?unit= – wszystkie jednostki poziomu, stronicowane po jednostkach (?limit=&offset=).
+    """
+    start, end = _int_arg("from"), _int_arg("to")
+    offset, limit = _window()
+    level = _unit_level()
+    index, version = get_series_index(**_dataset_source(level))
+    names = _metrics_arg(index, index.metrics)
+    unit_ids = _list_arg("unit")
+    unknown = [u for u in unit_ids if u not in index.units]
+    if unknown:
+        _api_error(404, f"Unknown unit(s): {', '.join(unknown[:10])}")
+    selected = unit_ids or index.unit_ids
+
+    def build():
+        return {
+            "unit_level": level,
+            "metrics": list(names),
+            "from": start,
+            "to": end,
+            "page": _page(len(selected), offset, limit),
+            "series": index.series(list(selected[offset : offset + limit]), names, start, end),
+        }
+
+    return _api_response(version, build)
+
+
+@bp.get("/api/ranking")
+@login_required
+def api_ranking():
+    """
+    Ranking jednostek w roku: ?year=&metric=unemployment_rate&order=desc&limit=&offset=&level=.
+    Bez ?year= – najnowszy rok z danymi wskaźnika.
+    """
+    order = (request.args.get("order") or "desc").lower()
+    if order not in ("asc", "desc"):
+        _api_error(400, "Parameter 'order' must be 'asc' or 'desc'")
+    year = _int_arg("year")
+    offset, limit = _window()
+    level = _unit_level()
+    index, version = get_series_index(**_dataset_source(level))
+    names = _metrics_arg(index, ("unemployment_rate",))
+    if len(names) != 1:
+        _api_error(400, "Ranking takes exactly one metric")
+    metric = names[0]
+    if year is None:
+        year = index.latest_year(metric)
+
+    def build():
+        total, rows = index.ranking(year, metric, order == "desc", offset, limit) if year is not None else (0, [])
+        return {
+            "unit_level": level,
+            "year": year,
+            "metric": metric,
+            "order": order,
+            "page": _page(total, offset, limit),
+            "rows": rows,
+        }
+
+    return _api_response(version, build)
+
+
+def _send_export(name: str):
+    if not export_available(name):
+        abort(404)
+    data = _build_data(with_charts=False)
+    path = get_export(Path(current_app.config["CACHE_DIR"]) / "exports", data, name)
+    filename = f"bdl_raport_{datetime.now().strftime('%Y-%m-%d_%H-%M')}.{EXPORT_FORMATS[name].suffix}"
+    # plik się nie zmienia w obrębie wersji: ETag/Last-Modified, 304 i Range z send_file
+    response = send_file(
+        path,
         as_attachment=True,
         download_name=filename,
-        mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        mimetype=EXPORT_FORMATS[name].mimetype,
+        conditional=True,
+        etag=True,
+        max_age=0,
     )
+    response.cache_control.private = True
+    return response
+
+
+@bp.get("/export/excel")
+@login_required
+def export_excel():
+    return _send_export("xlsx")
+
+
+@bp.get("/export/csv")
+@login_required
+def export_csv():
+    return _send_export("csv")
+
+
+@bp.get("/export/parquet")
+@login_required
+def export_parquet():
+    return _send_export("parquet")
 
 
 # Uwaga: endpoint /report (alias do eksportu) został usunięty na życzenie.
-# Zostawiamy tylko /export/excel oraz przycisk „Pobierz Excel”.
+# Zostawiamy /export/excel (przycisk „Pobierz Excel”) oraz warianty /export/csv i /export/parquet.
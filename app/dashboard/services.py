@@ -1,13 +1,307 @@
+from __future__ import annotations
+
+import math
+import threading
+from collections import OrderedDict
 from pathlib import Path
-from ..data.pipeline import load_or_refresh_dataset
-from ..data.analysis import build_analysis_outputs
-
-def get_dashboard_data(cache_dir: Path, static_charts_dir: Path, max_age_hours: int, bdl_client_id: str | None, bdl_base_url: str):
-    df = load_or_refresh_dataset(
-        cache_dir=cache_dir,
-        max_age_hours=max_age_hours,
-        bdl_client_id=bdl_client_id,
-        bdl_base_url=bdl_base_url,
+from typing import TYPE_CHECKING, Any, Callable, Mapping, Sequence
+
+from .. import metrics
+from ..data.cache import cache_fingerprint, is_cache_fresh, load_aggregates, on_cache_write
+from ..data.dataset import AGGREGATES_SCHEMA, dataset_key
+from ..data.refresh import BackgroundRefresher
+from ..data.indicators import select_indicators
+from ..data.variables import parse_overrides
+from ..data.charts import PENDING_CHART
+from ..lazy import lazy_function
+
+if TYPE_CHECKING:
+    from ..data.series_index import SeriesIndex
+
+# pipeline i analiza ciągną pandas/numpy i klienta BDL – ładują się przy pierwszym użyciu;
+# ciepły dashboard czyta gotowe agregaty i nie potrzebuje żadnego z nich
+load_or_refresh_dataset = lazy_function("app.data.pipeline", "load_or_refresh_dataset")
+build_aggregates = lazy_function("app.data.analysis", "build_aggregates")
+render_charts = lazy_function("app.data.analysis", "render_charts")
+result_from_aggregates = lazy_function("app.data.analysis", "result_from_aggregates")
+build_series_index = lazy_function("app.data.series_index", "build_series_index")
+
+
+class DashboardMemo:
+    """
+    Wyniki dashboardu (summary, tabele, serie wykresów, ścieżki PNG) trzymane w pamięci procesu.
+
+    Klucz zawiera odcisk danych z cache (created_at_iso + hash pliku), więc nowa wersja
+    danych zawsze trafia w pusty wpis; dodatkowo zapis cache czyści wpisy danego katalogu.
+    Zwracane obiekty są współdzielone między zapytaniami – nie wolno ich modyfikować;
+    to, co liczone później (np. ścieżki PNG), trafia pod własny klucz przez put().
+    """
+
+    def __init__(self, maxsize: int = 8) -> None:
+        self.maxsize = maxsize
+        self._items: OrderedDict[tuple, dict[str, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> dict[str, Any] | None:
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+            return value
+
+    def put(self, key: tuple, value: dict[str, Any]) -> None:
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def invalidate(self, cache_dir: Path | None = None) -> None:
+        with self._lock:
+            if cache_dir is None:
+                self._items.clear()
+                return
+            for k in [k for k in self._items if k[0] == str(cache_dir)]:
+                del self._items[k]
+
+
+memo = DashboardMemo()
+# wyrenderowane fragmenty HTML (podsumowanie, strona rankingu) – te same klucze wersji co memo
+fragments = DashboardMemo(maxsize=64)
+# indeksy zapytań API (/api/series, /api/ranking) – jeden na wersję danych i poziom jednostek
+series_indexes = DashboardMemo(maxsize=4)
+# AnalysisResult (wersja danych) i ścieżki PNG (wersja danych + katalog wykresów) – liczone
+# dopiero przy renderowaniu wykresów, więc osobno od wpisów memo
+analysis_results = DashboardMemo(maxsize=4)
+rendered_charts = DashboardMemo(maxsize=8)
+
+
+def bdl_options_from_config(cfg: Mapping[str, Any]) -> dict[str, Any]:
+    return {
+        "timeout_s": float(cfg.get("BDL_TIMEOUT_S", 20.0)),
+        "pool_size": int(cfg.get("BDL_POOL_SIZE", 8)),
+        "max_retries": int(cfg.get("BDL_MAX_RETRIES", 4)),
+        "min_interval_s": float(cfg.get("BDL_MIN_INTERVAL_S", 0.0)),
+        "max_workers": int(cfg.get("BDL_MAX_WORKERS", 4)),
+    }
+
+
+def dataset_options_from_config(cfg: Mapping[str, Any], unit_level: int | None = None) -> dict[str, Any]:
+    return {
+        "unit_level": int(unit_level or cfg.get("BDL_UNIT_LEVEL", 2)),
+        "start_year": int(cfg.get("BDL_START_YEAR", 2015)),
+        "mutable_years": int(cfg.get("BDL_MUTABLE_YEARS", 2)),
+        "partition_max_age_days": float(cfg.get("BDL_PARTITION_MAX_AGE_DAYS", 0)),
+        "variable_ttl_days": float(cfg.get("BDL_VARIABLE_TTL_DAYS", 30)),
+        "variable_overrides": parse_overrides(cfg.get("BDL_VARIABLE_OVERRIDES")),
+        "indicators": select_indicators(cfg.get("BDL_INDICATORS"), cfg.get("BDL_INDICATOR_DEFS")),
+        "batch_strategy": str(cfg.get("BDL_BATCH_STRATEGY", "auto")),
+        "max_vars_per_call": int(cfg.get("BDL_MAX_VARS_PER_CALL", 20)),
+    }
+
+
+def allowed_unit_levels(cfg: Mapping[str, Any]) -> list[int]:
+    raw = str(cfg.get("UNIT_LEVELS", "2,5,6"))
+    levels = [int(x) for x in raw.split(",") if x.strip().isdigit()]
+    default = int(cfg.get("BDL_UNIT_LEVEL", 2))
+    return levels if default in levels else [default, *levels]
+
+
+def create_refresher(cfg: Mapping[str, Any], unit_level: int | None = None) -> BackgroundRefresher:
+    return BackgroundRefresher(
+        cache_dir=Path(cfg["CACHE_DIR"]),
+        max_age_hours=int(cfg["CACHE_MAX_AGE_HOURS"]),
+        bdl_client_id=cfg.get("BDL_CLIENT_ID") or None,
+        bdl_base_url=cfg.get("BDL_BASE_URL"),
+        bdl_options=bdl_options_from_config(cfg),
+        cache_format=cfg.get("CACHE_FORMAT") or None,
+        lead_fraction=float(cfg.get("REFRESH_LEAD_FRACTION", 0.9)),
+        dataset_options=dataset_options_from_config(cfg, unit_level),
+        use_async=bool(cfg.get("BDL_ASYNC", False)),
+        async_concurrency=int(cfg.get("BDL_ASYNC_CONCURRENCY", 16)),
+        refresh_timeout_s=float(cfg.get("BDL_REFRESH_TIMEOUT_S", 0)),
     )
-    summary, tables, chart_paths = build_analysis_outputs(df=df, charts_dir=static_charts_dir)
-    return {"summary": summary, "tables": tables, "chart_paths": chart_paths}
+
+
+@on_cache_write
+def _invalidate_on_write(cache_dir: Path, key: str) -> None:
+    memo.invalidate(cache_dir)
+    fragments.invalidate(cache_dir)
+    series_indexes.invalidate(cache_dir)
+    analysis_results.invalidate(cache_dir)
+    rendered_charts.invalidate(cache_dir)
+
+
+def _memo_key(cache_dir: Path, key: str) -> tuple | None:
+    fp = cache_fingerprint(cache_dir, key)
+    return None if fp is None else (str(cache_dir), key, fp)
+
+
+@metrics.timed("aggregates_read")
+def _stored_aggregates(cache_dir: Path, key: str, unit_level: int) -> dict[str, Any] | None:
+    agg = load_aggregates(cache_dir, key)
+    if agg is None or agg.get("schema") != AGGREGATES_SCHEMA or agg.get("unit_level") != unit_level:
+        return None
+    return agg
+
+
+def _charts_exist(static_charts_dir: Path, chart_paths: dict[str, str]) -> bool:
+    # ścieżki są względem /static, a static_charts_dir to <static>/charts
+    static_root = static_charts_dir.parent
+    return all((static_root / p).exists() for p in chart_paths.values())
+
+
+def get_dashboard_data(
+    cache_dir: Path,
+    static_charts_dir: Path,
+    max_age_hours: int,
+    bdl_client_id: str | None,
+    bdl_base_url: str,
+    bdl_options: dict[str, Any] | None = None,
+    cache_format: str | None = None,
+    with_charts: bool = True,
+    revalidate: Callable[[], Any] | None = None,
+    lock_timeout_s: float = 300.0,
+    dataset_options: dict[str, Any] | None = None,
+):
+    """
+    Dane dashboardu: summary, tables ({"columns", "rows"}), series (JSON dla wykresów
+    w przeglądarce) oraz – gdy with_charts – chart_paths do PNG. Eksport i tryb wykresów
+    po stronie klienta przekazują with_charts=False i nie płacą za matplotlib.
+
+    Wszystko poza PNG pochodzi z agregatów zapisanych przy save_cache, więc zapytanie
+    czyta jeden plik JSON (albo wpis memo), a nie ramkę danych.
+
+    Z `revalidate` (stale-while-revalidate) nieświeży cache jest serwowany od razu,
+    a odświeżenie idzie w tle – zapytanie nigdy nie czeka na BDL, jeśli ma co pokazać.
+    """
+    entry = None
+    cache_key = dataset_key(dataset_options)
+    unit_level = int((dataset_options or {}).get("unit_level", 2))
+    fresh = is_cache_fresh(cache_dir, cache_key, max_age_hours)
+    agg = None
+    if fresh or revalidate is not None:
+        key = _memo_key(cache_dir, cache_key)
+        entry = memo.get(key) if key else None
+        metrics.inc("dashboard_memo_lookups_total", result="miss" if entry is None else "hit")
+        if entry is None:
+            # agregaty zapisane razem z danymi: odczyt JSON zamiast ładowania i analizy ramki
+            agg = _stored_aggregates(cache_dir, cache_key, unit_level)
+        if (entry is not None or agg is not None) and not fresh:
+            revalidate()
+
+    if entry is None:
+        if agg is None:
+            with metrics.stage("dataset"):
+                df = load_or_refresh_dataset(
+                    cache_dir=cache_dir,
+                    max_age_hours=max_age_hours,
+                    bdl_client_id=bdl_client_id,
+                    bdl_base_url=bdl_base_url,
+                    bdl_options=bdl_options,
+                    cache_format=cache_format,
+                    revalidate=revalidate,
+                    lock_timeout_s=lock_timeout_s,
+                    dataset_options=dataset_options,
+                )
+            # odświeżenie zapisało agregaty; cache sprzed ich wprowadzenia liczymy tutaj
+            agg = _stored_aggregates(cache_dir, cache_key, unit_level) or build_aggregates(df, unit_level=unit_level)
+        entry = {
+            "summary": agg["summary"],
+            "tables": agg["tables"],
+            "series": agg["series"],
+            "aggregated": agg["aggregated"],
+            "aggregates": agg,
+            "version": _memo_key(cache_dir, cache_key),
+        }
+        if entry["version"] is not None:
+            memo.put(entry["version"], entry)
+
+    data = {k: entry[k] for k in ("summary", "tables", "series", "version", "aggregated")}
+    data["unit_level"] = unit_level
+    data["chart_paths"] = {}
+    data["charts_pending"] = False
+    if not with_charts:
+        return data
+
+    version = entry["version"]
+    charts_key = None if version is None else (*version, str(static_charts_dir))
+    chart_paths = rendered_charts.get(charts_key) if charts_key else None
+    if chart_paths is None or not _charts_exist(static_charts_dir, chart_paths):
+        # AnalysisResult odtwarzany dopiero, gdy trzeba renderować PNG
+        result = analysis_results.get(version) if version else None
+        if result is None:
+            result = result_from_aggregates(entry["aggregates"])
+            if version is not None:
+                analysis_results.put(version, result)
+        chart_paths = render_charts(result, static_charts_dir)
+        # ścieżki z placeholderem nie są zapamiętywane – kolejne zapytanie podejmie gotowe pliki
+        if charts_key is not None and PENDING_CHART not in chart_paths.values():
+            rendered_charts.put(charts_key, chart_paths)
+
+    data["chart_paths"] = chart_paths
+    data["charts_pending"] = PENDING_CHART in chart_paths.values()
+    return data
+
+
+def get_series_index(
+    cache_dir: Path,
+    max_age_hours: int,
+    bdl_client_id: str | None,
+    bdl_base_url: str,
+    bdl_options: dict[str, Any] | None = None,
+    cache_format: str | None = None,
+    revalidate: Callable[[], Any] | None = None,
+    lock_timeout_s: float = 300.0,
+    dataset_options: dict[str, Any] | None = None,
+) -> tuple[SeriesIndex, tuple | None]:
+    """
+    Indeks zbioru dla API i jego wersja (ta sama co w get_dashboard_data – do ETag).
+    Ramka jest ładowana i indeksowana raz na wersję; kolejne zapytania biorą indeks z pamięci.
+    """
+    cache_key = dataset_key(dataset_options)
+    fresh = is_cache_fresh(cache_dir, cache_key, max_age_hours)
+    if fresh or revalidate is not None:
+        version = _memo_key(cache_dir, cache_key)
+        index = series_indexes.get(version) if version else None
+        metrics.inc("series_index_lookups_total", result="miss" if index is None else "hit")
+        if index is not None:
+            if not fresh:
+                revalidate()
+            return index, version
+
+    with metrics.stage("dataset"):
+        df = load_or_refresh_dataset(
+            cache_dir=cache_dir,
+            max_age_hours=max_age_hours,
+            bdl_client_id=bdl_client_id,
+            bdl_base_url=bdl_base_url,
+            bdl_options=bdl_options,
+            cache_format=cache_format,
+            revalidate=revalidate,
+            lock_timeout_s=lock_timeout_s,
+            dataset_options=dataset_options,
+        )
+    with metrics.stage("series_index"):
+        index = build_series_index(df)
+    version = _memo_key(cache_dir, cache_key)
+    if version is not None:
+        series_indexes.put(version, index)
+    return index, version
+
+
+def paginate(rows: Sequence[Any], page: int, per_page: int) -> dict[str, Any]:
+    """Jedna strona tabeli (np. rankingu gmin) – do szablonu trafia tylko per_page wierszy."""
+    per_page = max(1, int(per_page))
+    total = len(rows)
+    pages = max(1, math.ceil(total / per_page))
+    page = min(max(1, int(page)), pages)
+    offset = (page - 1) * per_page
+    return {
+        "rows": rows[offset : offset + per_page],
+        "page": page,
+        "pages": pages,
+        "per_page": per_page,
+        "total": total,
+        "offset": offset,
+    }
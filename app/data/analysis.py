@@ -1,87 +1,154 @@
 from __future__ import annotations
 
+import math
+from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Any
 
+import numpy as np
 import pandas as pd
 
-import matplotlib
-matplotlib.use("Agg")  # ważne na Windows/Flask debug
-import matplotlib.pyplot as plt
-
-from matplotlib import cm
-from matplotlib.colors import Normalize
-
-FIGSIZE = (10, 5.5)
-
-# Kolory wykresów (jasne, czytelne, spójne z UI)
-COLOR_UNEMP = "#2563eb"   # blue-600
-COLOR_WAGE = "#f59e0b"    # amber-500
-COLOR_GRID = "#e2e8f0"    # slate-200
-
-
-def _apply_chart_style() -> None:
-    plt.rcParams.update(
-        {
-            "figure.facecolor": "white",
-            "axes.facecolor": "white",
-            "axes.edgecolor": "#cbd5e1",
-            "axes.labelcolor": "#0f172a",
-            "xtick.color": "#0f172a",
-            "ytick.color": "#0f172a",
-            "text.color": "#0f172a",
-            "grid.color": COLOR_GRID,
-            "grid.linewidth": 0.8,
-            "grid.alpha": 0.8,
-            "font.size": 11,
-        }
-    )
-
-
-def _auto_fix_scales(data: pd.DataFrame) -> pd.DataFrame:
-    
-    d = data.copy()
-
-    if "unemployment_rate" in d.columns and d["unemployment_rate"].notna().any():
-        med = float(d["unemployment_rate"].dropna().median())
-        if 0 < med <= 1.0:
-            d["unemployment_rate"] = d["unemployment_rate"] * 100.0
-
-    if "avg_wage" in d.columns and d["avg_wage"].notna().any():
-        med = float(d["avg_wage"].dropna().median())
-        # 95 -> 9500; 120 -> 12000 itp.
-        if 1.0 < med < 500.0:
-            d["avg_wage"] = d["avg_wage"] * 100.0
-
-    return d
+from .. import metrics
+from .charts import (
+    BAR_MAX_UNITS,
+    BAR_TOP_N,
+    HIST_BINS,
+    PENDING_CHART,
+    ChartJob,
+    ChartRenderer,
+    chart_path,
+    gc_charts,
+    get_renderer,
+)
+from .dataset import AGGREGATES_SCHEMA
+from .units import UnitLevel, unit_level_labels
+
+
+def numeric_column(df: pd.DataFrame, col: str) -> np.ndarray:
+    """Kolumna jako float64 – jedna konwersja na kolumnę; brak kolumny = same NaN."""
+    if col not in df.columns:
+        return np.full(len(df), np.nan)
+    s = df[col]
+    if not pd.api.types.is_numeric_dtype(s.dtype):
+        s = pd.to_numeric(s, errors="coerce")
+    return s.to_numpy(dtype="float64", na_value=np.nan)
+
+
+def _fix_scale(values: np.ndarray, lo: float, hi: float, inclusive_hi: bool) -> np.ndarray:
+    # BDL bywa niespójny w skalach: 0.05 zamiast 5%, 95 zamiast 9500 zł – mnożymy przez 100,
+    # gdy mediana wpada w podejrzany przedział
+    finite = values[~np.isnan(values)]
+    if finite.size:
+        med = float(np.median(finite))
+        if lo < med and (med <= hi if inclusive_hi else med < hi):
+            return values * 100.0
+    return values
+
+
+# BDL bywa niespójny w skalach wskaźników: (lo, hi, czy hi włącznie) – przedział mediany,
+# przy którym wartości są mnożone przez 100. Wspólne dla dashboardu i API (series_index).
+SCALE_FIXES: dict[str, tuple[float, float, bool]] = {
+    "unemployment_rate": (0.0, 1.0, True),  # 0.05 zamiast 5%
+    "avg_wage": (1.0, 500.0, False),  # 95 zamiast 9500 zł
+}
+
+
+def fixed_metric(df: pd.DataFrame, col: str) -> np.ndarray:
+    """Wskaźnik jako float64 z korektą skali z SCALE_FIXES (kolumny spoza tabeli bez zmian)."""
+    values = numeric_column(df, col)
+    if col in SCALE_FIXES:
+        lo, hi, inclusive_hi = SCALE_FIXES[col]
+        values = _fix_scale(values, lo, hi, inclusive_hi=inclusive_hi)
+    return values
+
+
+def _labels(df: pd.DataFrame, col: str, idx: np.ndarray) -> np.ndarray:
+    """Oczyszczone nazwy/ID tylko dla wybranych wierszy (cache trzyma je już czyste jako category)."""
+    if col not in df.columns:
+        return np.full(len(idx), "", dtype=object)
+    s = df[col]
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        # kategorie indeksowane kodami; kod -1 (brak wartości) trafia w dopisany ""
+        cats = np.append(s.cat.categories.astype(str).to_numpy(dtype=object), "")
+        return cats[s.cat.codes.to_numpy()[idx]]
+    s = s.iloc[idx].fillna("").astype(str).replace("nan", "").str.strip()
+    return s.to_numpy(dtype=object)
+
+
+def _group_means(inv: np.ndarray, n_groups: int, values: np.ndarray) -> np.ndarray:
+    ok = ~np.isnan(values)
+    sums = np.bincount(inv, weights=np.where(ok, values, 0.0), minlength=n_groups)
+    counts = np.bincount(inv, weights=ok, minlength=n_groups)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return sums / counts
+
+
+def _latest(years: np.ndarray, mask: np.ndarray) -> int | None:
+    return int(years[mask].max()) if mask.any() else None
+
+
+def _static_chart_paths(rendered: dict[str, str]) -> dict[str, str]:
+    # ścieżki względem /static; placeholder już jest względny
+    return {k: v if v == PENDING_CHART else f"charts/{Path(v).name}" for k, v in rendered.items()}
+
+
+@dataclass
+class AnalysisResult:
+    """Wynik analizy bez wykresów: summary, tabele i serie danych stojące za każdym wykresem."""
+
+    summary: dict[str, Any]
+    tables: dict[str, pd.DataFrame]
+    yearly: pd.DataFrame = field(default_factory=pd.DataFrame)
+    latest_unemp: pd.DataFrame = field(default_factory=pd.DataFrame)
+    both: pd.DataFrame = field(default_factory=pd.DataFrame)
+    unit_level: int = 2
+
+    @property
+    def is_empty(self) -> bool:
+        return self.summary.get("latest_unemp_year") is None and self.yearly.empty
+
+    @property
+    def is_aggregated(self) -> bool:
+        """Za dużo jednostek na słupek na każdą: top-N + histogram zamiast pełnego wykresu."""
+        return len(self.latest_unemp) > BAR_MAX_UNITS
+
+    @property
+    def unit_labels(self) -> UnitLevel:
+        return unit_level_labels(self.unit_level)
 
 
 def build_analysis_outputs(
-    df: pd.DataFrame, charts_dir: Path
+    df: pd.DataFrame, charts_dir: Path, renderer: ChartRenderer | None = None, unit_level: int = 2
 ) -> tuple[dict[str, Any], dict[str, pd.DataFrame], dict[str, str]]:
-    charts_dir.mkdir(parents=True, exist_ok=True)
+    result = analyze(df, unit_level=unit_level)
+    return result.summary, result.tables, render_charts(result, charts_dir, renderer)
+
 
-    data = df.copy()
+@metrics.timed("analyze")
+def analyze(df: pd.DataFrame, unit_level: int = 2) -> AnalysisResult:
+    """
+    Summary, ranking i serie wykresów w jednym przebiegu po tablicach NumPy.
 
-    # typy
-    data["year"] = pd.to_numeric(data.get("year"), errors="coerce").astype("Int64")
-    data["unemployment_rate"] = pd.to_numeric(data.get("unemployment_rate"), errors="coerce")
-    data["avg_wage"] = pd.to_numeric(data.get("avg_wage"), errors="coerce")
+    Kolumny liczbowe są konwertowane raz, maski dostępności (rok / bezrobocie / płace / oba)
+    liczone raz, a ramki wynikowe powstają tylko z wybranych wierszy – bez kopii całego zbioru.
+    """
+    unit_label = unit_level_labels(unit_level).label
 
-    # nazwy/ID (bez "nan")
-    if "unitId" not in data.columns:
-        data["unitId"] = ""
-    if "unitName" not in data.columns:
-        data["unitName"] = ""
+    year = numeric_column(df, "year")
+    unemp = fixed_metric(df, "unemployment_rate")
+    wage = fixed_metric(df, "avg_wage")
 
-    data["unitId"] = data["unitId"].fillna("").astype(str).replace("nan", "").str.strip()
-    data["unitName"] = data["unitName"].fillna("").astype(str).replace("nan", "").str.strip()
+    has_year = ~np.isnan(year)
+    has_unemp = has_year & ~np.isnan(unemp)
+    has_wage = has_year & ~np.isnan(wage)
+    has_both = has_unemp & has_wage
 
-    # skale
-    data = _auto_fix_scales(data)
+    latest_unemp_year = _latest(year, has_unemp)
+    latest_wage_year = _latest(year, has_wage)
+    latest_both_year = _latest(year, has_both)
 
-    # Guard: brak danych
-    if data.empty or data["year"].dropna().empty:
+    empty_rank = pd.DataFrame(columns=[unit_label, "Stopa bezrobocia (%)", "Przeciętne wynagrodzenie (zł)"])
+    if not has_year.any():
         summary = {
             "latest_unemp_year": None,
             "latest_wage_year": None,
@@ -90,73 +157,66 @@ def build_analysis_outputs(
             "avg_wage_latest": None,
             "corr_unemp_vs_wage_latest": None,
         }
-        empty_rank = pd.DataFrame(columns=["Województwo", "Stopa bezrobocia (%)", "Przeciętne wynagrodzenie (zł)"])
         tables = {"ranking": empty_rank, "top5": empty_rank, "bottom5": empty_rank}
-        chart_paths = {
-            "trend": f"charts/{Path(_plot_empty(charts_dir / 'trend.png', 'Brak danych')).name}",
-            "bar_unemp": f"charts/{Path(_plot_empty(charts_dir / 'bar_unemp.png', 'Brak danych')).name}",
-            "scatter": f"charts/{Path(_plot_empty(charts_dir / 'scatter.png', 'Brak danych')).name}",
-        }
-        return summary, tables, chart_paths
-
-    # lata dostępności osobno
-    unemp_years = data.dropna(subset=["unemployment_rate", "year"])["year"]
-    wage_years = data.dropna(subset=["avg_wage", "year"])["year"]
-    both_years = data.dropna(subset=["unemployment_rate", "avg_wage", "year"])["year"]
+        return AnalysisResult(summary=summary, tables=tables, unit_level=unit_level)
 
-    latest_unemp_year = int(unemp_years.max()) if not unemp_years.empty else None
-    latest_wage_year = int(wage_years.max()) if not wage_years.empty else None
-    latest_both_year = int(both_years.max()) if not both_years.empty else None
+    # pozycje wierszy dla najnowszych lat (None -> porównanie z NaN daje same False)
+    def at(mask: np.ndarray, y: int | None) -> np.ndarray:
+        return np.flatnonzero(mask & (year == (np.nan if y is None else y)))
 
-    latest_unemp = data[data["year"] == latest_unemp_year].copy() if latest_unemp_year else pd.DataFrame()
-    latest_wage = data[data["year"] == latest_wage_year].copy() if latest_wage_year else pd.DataFrame()
-    latest_both = data[data["year"] == latest_both_year].copy() if latest_both_year else pd.DataFrame()
+    idx_unemp = at(has_unemp, latest_unemp_year)
+    idx_wage = at(has_wage, latest_wage_year)
+    idx_wage_year = at(has_year, latest_wage_year)
+    idx_both = at(has_both, latest_both_year)
 
-    both = latest_both.dropna(subset=["unemployment_rate", "avg_wage"]).copy()
-
-    # korelacja tylko jeśli ma sens
     corr = None
-    if len(both) >= 3:
-        if both["avg_wage"].nunique(dropna=True) >= 2 and both["unemployment_rate"].nunique(dropna=True) >= 2:
-            c = both["unemployment_rate"].corr(both["avg_wage"])
-            if pd.notna(c):
+    if idx_both.size >= 3:
+        u, w = unemp[idx_both], wage[idx_both]
+        if np.unique(u).size >= 2 and np.unique(w).size >= 2:
+            c = np.corrcoef(u, w)[0, 1]
+            if np.isfinite(c):
                 corr = float(c)
 
     summary = {
         "latest_unemp_year": latest_unemp_year,
         "latest_wage_year": latest_wage_year,
         "latest_both_year": latest_both_year,
-        "avg_unemployment_latest": float(latest_unemp["unemployment_rate"].dropna().mean()) if not latest_unemp.empty else None,
-        "avg_wage_latest": float(latest_wage["avg_wage"].dropna().mean()) if not latest_wage.empty else None,
+        "avg_unemployment_latest": float(unemp[idx_unemp].mean()) if idx_unemp.size else None,
+        "avg_wage_latest": float(wage[idx_wage].mean()) if idx_wage.size else None,
         "corr_unemp_vs_wage_latest": corr,
     }
 
+    def frame(idx: np.ndarray) -> pd.DataFrame:
+        return pd.DataFrame(
+            {
+                "year": pd.array(year[idx].astype("int64"), dtype="Int64"),
+                "unitId": _labels(df, "unitId", idx),
+                "unitName": _labels(df, "unitName", idx),
+                "unemployment_rate": unemp[idx],
+                "avg_wage": wage[idx],
+            }
+        )
 
-    rank_src = latest_unemp.dropna(subset=["unemployment_rate"])[["unitId", "unitName", "unemployment_rate"]].copy()
-
-    if latest_wage_year is not None and not latest_wage.empty:
-        wage_for_ranking = latest_wage[["unitId", "avg_wage"]].copy()
-    else:
-        wage_for_ranking = pd.DataFrame(columns=["unitId", "avg_wage"])
+    latest_unemp = frame(idx_unemp)
+    both = frame(idx_both)
 
-    rank_src = rank_src.merge(wage_for_ranking, on="unitId", how="left")
+    # ranking: bezrobocie z najnowszego roku + płace z najnowszego roku płac (po unitId)
+    wage_by_unit = pd.Series(wage[idx_wage_year], index=_labels(df, "unitId", idx_wage_year))
+    wage_by_unit = wage_by_unit[~wage_by_unit.index.duplicated()]
+    rank_wage = wage_by_unit.reindex(latest_unemp["unitId"]).to_numpy()
 
     # displayName: unitName jeśli jest, inaczej "ID: <unitId>"
-    rank_src["displayName"] = rank_src["unitName"].where(
-        rank_src["unitName"].astype(str).str.len() > 0,
-        "ID: " + rank_src["unitId"].astype(str),
-    )
+    display = latest_unemp["unitName"].to_numpy(dtype=object).copy()
+    blank = np.array([len(n) == 0 for n in display], dtype=bool)
+    display[blank] = "ID: " + latest_unemp["unitId"].to_numpy(dtype=object)[blank]
+    order = np.argsort(-unemp[idx_unemp], kind="stable")
 
-    ranking = (
-        rank_src.sort_values("unemployment_rate", ascending=False)[["displayName", "unemployment_rate", "avg_wage"]]
-        .rename(
-            columns={
-                "displayName": "Województwo",
-                "unemployment_rate": "Stopa bezrobocia (%)",
-                "avg_wage": "Przeciętne wynagrodzenie (zł)",
-            }
-        )
-        .reset_index(drop=True)
+    ranking = pd.DataFrame(
+        {
+            unit_label: display[order],
+            "Stopa bezrobocia (%)": unemp[idx_unemp][order],
+            "Przeciętne wynagrodzenie (zł)": rank_wage[order],
+        }
     )
 
     tables = {
@@ -165,183 +225,233 @@ def build_analysis_outputs(
         "bottom5": ranking.tail(5).sort_values("Stopa bezrobocia (%)", ascending=True) if not ranking.empty else ranking,
     }
 
-    # Charts
-    chart_paths: dict[str, str] = {}
+    # lata to małe liczby całkowite: grupowanie przez przesunięcie + bincount, bez sortowania
+    y = year[has_year].astype("int64")
+    base = int(y.min())
+    inv = y - base
+    present = np.bincount(inv) > 0
+    yearly = pd.DataFrame(
+        {
+            "year": pd.array(np.flatnonzero(present) + base, dtype="Int64"),
+            "unemployment_rate": _group_means(inv, present.size, unemp[has_year])[present],
+            "avg_wage": _group_means(inv, present.size, wage[has_year])[present],
+        }
+    )
 
-    yearly = (
-        data.groupby("year", dropna=True)[["unemployment_rate", "avg_wage"]]
-        .mean(numeric_only=True)
-        .reset_index()
-        .dropna(subset=["year"])
-        .sort_values("year")
+    return AnalysisResult(
+        summary=summary,
+        tables=tables,
+        yearly=yearly,
+        latest_unemp=latest_unemp,
+        both=both,
+        unit_level=unit_level,
     )
 
-    chart_paths["trend"] = _plot_trend(yearly, charts_dir / "trend.png")
 
-    if latest_unemp.empty or latest_unemp_year is None:
-        chart_paths["bar_unemp"] = _plot_empty(
-            charts_dir / "bar_unemp.png",
-            "Brak danych bezrobocia dla najnowszego roku",
-        )
-    else:
-        chart_paths["bar_unemp"] = _plot_bar(
-            latest_unemp.dropna(subset=["unemployment_rate"]),
-            charts_dir / "bar_unemp.png",
-            latest_unemp_year,
-        )
+@metrics.timed("charts")
+def render_charts(
+    result: AnalysisResult, charts_dir: Path, renderer: ChartRenderer | None = None
+) -> dict[str, str]:
+    """Renderuje (albo bierze gotowe) PNG dla wyniku analizy; zwraca ścieżki względem /static."""
+    renderer = renderer or get_renderer()
+    charts_dir.mkdir(parents=True, exist_ok=True)
 
-    if both.empty or latest_both_year is None:
-        chart_paths["scatter"] = _plot_empty(
-            charts_dir / "scatter.png",
-            "Brak danych wspólnych (płace + bezrobocie) dla najnowszego wspólnego roku",
+    if result.is_empty:
+        empty = ChartJob("empty", chart_path(charts_dir, "empty", None, "Brak danych"), ("Brak danych",))
+        rendered = renderer.render({"empty": empty})
+        return _static_chart_paths({k: rendered["empty"] for k in ("trend", "bar_unemp", "scatter")})
+
+    latest_unemp_year = result.summary["latest_unemp_year"]
+    latest_both_year = result.summary["latest_both_year"]
+    titles = chart_titles(result)
+    jobs: dict[str, ChartJob] = {}
+
+    yearly = result.yearly
+    jobs["trend"] = ChartJob("trend", chart_path(charts_dir, "trend", yearly, titles["trend"]), (yearly, titles["trend"]))
+
+    if result.latest_unemp.empty or latest_unemp_year is None:
+        msg = "Brak danych bezrobocia dla najnowszego roku"
+        jobs["bar_unemp"] = ChartJob("empty", chart_path(charts_dir, "empty", None, msg), (msg,))
+    else:
+        bar_src = _bar_source(result)
+        jobs["bar_unemp"] = ChartJob(
+            "bar",
+            chart_path(charts_dir, "bar_unemp", bar_src, latest_unemp_year, titles["bar_unemp"]),
+            (bar_src, latest_unemp_year, titles["bar_unemp"]),
         )
+        if result.is_aggregated:
+            hist_src = result.latest_unemp[["unemployment_rate"]]
+            jobs["hist_unemp"] = ChartJob(
+                "hist",
+                chart_path(charts_dir, "hist_unemp", hist_src, latest_unemp_year, titles["hist_unemp"], HIST_BINS),
+                (hist_src, latest_unemp_year, titles["hist_unemp"], HIST_BINS),
+            )
+
+    if result.both.empty or latest_both_year is None:
+        msg = "Brak danych wspólnych (płace + bezrobocie) dla najnowszego wspólnego roku"
+        jobs["scatter"] = ChartJob("empty", chart_path(charts_dir, "empty", None, msg), (msg,))
     else:
-        chart_paths["scatter"] = _plot_scatter(
-            both,
-            charts_dir / "scatter.png",
-            latest_both_year,
+        scatter_src = result.both[["avg_wage", "unemployment_rate"]]
+        jobs["scatter"] = ChartJob(
+            "scatter",
+            chart_path(charts_dir, "scatter", scatter_src, latest_both_year),
+            (scatter_src, latest_both_year),
         )
 
-    # Return relative paths from /static
-    chart_paths = {k: f"charts/{Path(v).name}" for k, v in chart_paths.items()}
-    return summary, tables, chart_paths
-
-
-def _plot_trend(yearly: pd.DataFrame, out_path: Path) -> str:
-    if yearly.empty:
-        return _plot_empty(out_path, "Brak danych do trendu")
-
-    _apply_chart_style()
-
-    fig, ax1 = plt.subplots(figsize=FIGSIZE)
-    x = yearly["year"].astype(int)
-
-    # lewa oś: bezrobocie
-    line1 = None
-    if yearly["unemployment_rate"].notna().any():
-        line1 = ax1.plot(
-            x,
-            yearly["unemployment_rate"],
-            color=COLOR_UNEMP,
-            linewidth=2.6,
-            marker="o",
-            markersize=5,
-            label="Bezrobocie (%)",
-        )[0]
-        ax1.set_ylabel("Bezrobocie (%)")
-        ax1.grid(True, axis="y")
-
-    # prawa oś: płace
-    ax2 = ax1.twinx()
-    line2 = None
-    if yearly["avg_wage"].notna().any():
-        line2 = ax2.plot(
-            x,
-            yearly["avg_wage"],
-            color=COLOR_WAGE,
-            linewidth=2.6,
-            marker="s",
-            markersize=5,
-            label="Płace (zł)",
-        )[0]
-        ax2.set_ylabel("Płace (zł)")
-
-    ax1.set_xlabel("Rok")
-    ax1.set_title("Trend: bezrobocie i płace (średnia po województwach)")
-
-    # legenda wspólna
-    handles = [h for h in [line1, line2] if h is not None]
-    if handles:
-        labels = [h.get_label() for h in handles]
-        ax1.legend(handles, labels, loc="upper left", frameon=True, framealpha=0.95)
-
-    # lepsza czytelność osi X
-    ax1.set_xticks(list(x))
-    for tick in ax1.get_xticklabels():
-        tick.set_rotation(0)
-    fig.tight_layout()
-
-    out_path.parent.mkdir(parents=True, exist_ok=True)
-    fig.savefig(out_path, facecolor="white")
-    plt.close(fig)
-    return str(out_path)
-
-
-def _plot_bar(latest_unemp: pd.DataFrame, out_path: Path, year: int) -> str:
-    _apply_chart_style()
-    plt.figure(figsize=FIGSIZE)
-    if latest_unemp.empty:
-        return _plot_empty(out_path, "Brak danych do wykresu")
-
-    d = latest_unemp.sort_values("unemployment_rate", ascending=True).copy()
-    labels = d["unitName"].where(d["unitName"].astype(str).str.len() > 0, d["unitId"].astype(str))
-
-    # kolory per słupek (im wyższe bezrobocie, tym „cieplejszy” kolor)
-    vals = d["unemployment_rate"].astype(float)
-    norm = Normalize(vmin=float(vals.min()), vmax=float(vals.max())) if len(vals) else Normalize(vmin=0, vmax=1)
-    colors = cm.get_cmap("YlOrRd")(norm(vals))
-
-    bars = plt.barh(labels, vals, color=colors, edgecolor="white", linewidth=0.8)
-    plt.title(f"Stopa bezrobocia – województwa ({year})")
-    plt.xlabel("Stopa bezrobocia (%)")
-    plt.grid(True, axis="x")
-
-    # wartości na końcu słupków
-    for b in bars:
-        v = b.get_width()
-        plt.text(v + 0.05, b.get_y() + b.get_height() / 2, f"{v:.2f}%", va="center", fontsize=9)
-    plt.tight_layout()
-
-    out_path.parent.mkdir(parents=True, exist_ok=True)
-    plt.savefig(out_path, facecolor="white")
-    plt.close()
-    return str(out_path)
-
-
-def _plot_scatter(both: pd.DataFrame, out_path: Path, year: int) -> str:
-    _apply_chart_style()
-    plt.figure(figsize=FIGSIZE)
-    if both.empty:
-        return _plot_empty(out_path, "Brak danych do wykresu zależności")
-
-    x = both["avg_wage"].astype(float)
-    y = both["unemployment_rate"].astype(float)
-
-    # kolor punktu = bezrobocie (czytelniej widać „gorące” regiony)
-    norm = Normalize(vmin=float(y.min()), vmax=float(y.max())) if len(y) else Normalize(vmin=0, vmax=1)
-    sc = plt.scatter(
-        x,
-        y,
-        c=y,
-        cmap="viridis",
-        norm=norm,
-        s=90,
-        alpha=0.9,
-        edgecolors="white",
-        linewidth=0.7,
+    # wykresy renderują się równolegle (w puli) albo po kolei (inline)
+    rendered = renderer.render(jobs)
+    gc_charts(charts_dir, keep={job.out_path.name for job in jobs.values()})
+
+    return _static_chart_paths(rendered)
+
+
+def chart_titles(result: AnalysisResult) -> dict[str, str]:
+    """Tytuły wykresów zależne od poziomu jednostek – wspólne dla PNG i wykresów w przeglądarce."""
+    labels = result.unit_labels
+    u_year = result.summary.get("latest_unemp_year")
+    b_year = result.summary.get("latest_both_year")
+    bar = f"Stopa bezrobocia – {labels.plural} ({u_year})"
+    if result.is_aggregated:
+        bar = f"Top {BAR_TOP_N} – najwyższa stopa bezrobocia, {labels.plural} ({u_year})"
+    return {
+        "trend": f"Trend: bezrobocie i płace (średnia po {labels.locative})",
+        "bar_unemp": bar,
+        "scatter": f"Zależność: wynagrodzenie vs bezrobocie ({b_year})",
+        "hist_unemp": f"Rozkład stopy bezrobocia – {labels.plural} ({u_year})",
+    }
+
+
+def _bar_source(result: AnalysisResult) -> pd.DataFrame:
+    d = result.latest_unemp[["unitId", "unitName", "unemployment_rate"]]
+    return d.nlargest(BAR_TOP_N, "unemployment_rate") if result.is_aggregated else d
+
+
+def _histogram(values: pd.Series, bins: int = HIST_BINS) -> dict[str, list]:
+    v = values.dropna().astype(float).to_numpy()
+    if v.size == 0:
+        return {"edges": [], "counts": []}
+    counts, edges = np.histogram(v, bins=bins)
+    return {"edges": [_num(e) for e in edges], "counts": [int(c) for c in counts]}
+
+
+def _num(v: Any, digits: int = 2) -> float | None:
+    # JSON nie zna NaN; float32 z cache zaokrąglamy, żeby nie wysyłać 6.199999809265137
+    if v is None or pd.isna(v):
+        return None
+    f = float(v)
+    return None if math.isinf(f) else round(f, digits)
+
+
+def _unit_labels(frame: pd.DataFrame) -> list[str]:
+    names = frame["unitName"].astype(str)
+    return names.where(names.str.len() > 0, frame["unitId"].astype(str)).tolist()
+
+
+def chart_series(result: AnalysisResult) -> dict[str, dict[str, Any]]:
+    """
+    Serie stojące za wykresami trend/bar_unemp/scatter/hist_unemp w zwartej postaci JSON –
+    do rysowania po stronie przeglądarki zamiast PNG. Dla wielu jednostek bar_unemp
+    zawiera tylko top-N, a rozkład całości niesie hist_unemp.
+    """
+    titles = chart_titles(result)
+    yearly = result.yearly
+    trend = {
+        "title": titles["trend"],
+        "years": [int(y) for y in yearly["year"]] if not yearly.empty else [],
+        "unemployment_rate": [_num(v) for v in yearly["unemployment_rate"]] if not yearly.empty else [],
+        "avg_wage": [_num(v) for v in yearly["avg_wage"]] if not yearly.empty else [],
+    }
+
+    bar: dict[str, Any] = {
+        "title": titles["bar_unemp"],
+        "year": result.summary.get("latest_unemp_year"),
+        "labels": [],
+        "values": [],
+    }
+    if not result.latest_unemp.empty:
+        d = _bar_source(result).sort_values("unemployment_rate", ascending=True)
+        bar["labels"] = _unit_labels(d)
+        bar["values"] = [_num(v) for v in d["unemployment_rate"]]
+
+    scatter: dict[str, Any] = {
+        "title": titles["scatter"],
+        "year": result.summary.get("latest_both_year"),
+        "labels": [],
+        "points": [],
+    }
+    if not result.both.empty:
+        scatter["labels"] = _unit_labels(result.both)
+        scatter["points"] = [
+            [_num(w), _num(u)] for w, u in zip(result.both["avg_wage"], result.both["unemployment_rate"])
+        ]
+
+    values = result.latest_unemp["unemployment_rate"] if not result.latest_unemp.empty else pd.Series(dtype=float)
+    hist = {"title": titles["hist_unemp"], "year": result.summary.get("latest_unemp_year"), **_histogram(values)}
+
+    return {"trend": trend, "bar_unemp": bar, "scatter": scatter, "hist_unemp": hist}
+
+
+def _table(frame: pd.DataFrame) -> dict[str, list]:
+    """Ramka -> {"columns", "rows"} w typach JSON (NaN/NA -> None)."""
+    columns = []
+    for col in frame.columns:
+        s = frame[col]
+        if pd.api.types.is_integer_dtype(s.dtype):
+            columns.append([None if pd.isna(v) else int(v) for v in s])
+        elif pd.api.types.is_numeric_dtype(s.dtype):
+            columns.append([v if math.isfinite(v) else None for v in s.to_numpy("float64", na_value=np.nan).tolist()])
+        else:
+            columns.append(s.astype(str).tolist())
+    return {"columns": [str(c) for c in frame.columns], "rows": [list(r) for r in zip(*columns)]}
+
+
+def _frame(table: dict[str, list], text_columns: set[str]) -> pd.DataFrame:
+    frame = pd.DataFrame(table["rows"], columns=table["columns"])
+    for col in frame.columns:
+        if col == "year":
+            frame[col] = pd.array(frame[col], dtype="Int64")
+        elif col in text_columns:
+            frame[col] = frame[col].astype(object)
+        else:
+            frame[col] = frame[col].astype("float64")
+    return frame
+
+
+@metrics.timed("aggregates")
+def to_aggregates(result: AnalysisResult) -> dict[str, Any]:
+    """
+    Wynik analizy jako słownik JSON: to, co pokazuje dashboard (summary, tabele wierszami,
+    serie wykresów), plus ramki potrzebne do PNG. Zapisywany obok danych przy save_cache.
+    """
+    return {
+        "schema": AGGREGATES_SCHEMA,
+        "unit_level": result.unit_level,
+        "summary": result.summary,
+        "aggregated": result.is_aggregated,
+        "tables": {name: _table(t) for name, t in result.tables.items()},
+        "series": chart_series(result),
+        "frames": {
+            "yearly": _table(result.yearly),
+            "latest_unemp": _table(result.latest_unemp),
+            "both": _table(result.both),
+        },
+    }
+
+
+def build_aggregates(df: pd.DataFrame, unit_level: int = 2) -> dict[str, Any]:
+    return to_aggregates(analyze(df, unit_level=unit_level))
+
+
+def result_from_aggregates(payload: dict[str, Any]) -> AnalysisResult:
+    """Odtwarza AnalysisResult z agregatów (małe ramki, bez ponownej analizy) – np. do PNG."""
+    units = {"unitId", "unitName"}
+    frames = payload["frames"]
+    return AnalysisResult(
+        summary=payload["summary"],
+        tables={name: _frame(t, {t["columns"][0]} if t["columns"] else set()) for name, t in payload["tables"].items()},
+        yearly=_frame(frames["yearly"], units),
+        latest_unemp=_frame(frames["latest_unemp"], units),
+        both=_frame(frames["both"], units),
+        unit_level=int(payload["unit_level"]),
     )
-    plt.title(f"Zależność: wynagrodzenie vs bezrobocie ({year})")
-    plt.xlabel("Przeciętne wynagrodzenie (zł)")
-    plt.ylabel("Stopa bezrobocia (%)")
-    plt.grid(True)
-
-    cbar = plt.colorbar(sc)
-    cbar.set_label("Bezrobocie (%)")
-    plt.tight_layout()
-
-    out_path.parent.mkdir(parents=True, exist_ok=True)
-    plt.savefig(out_path, facecolor="white")
-    plt.close()
-    return str(out_path)
-
-
-def _plot_empty(out_path: Path, message: str) -> str:
-    _apply_chart_style()
-    plt.figure(figsize=FIGSIZE)
-    plt.text(0.5, 0.5, message, ha="center", va="center", wrap=True, fontsize=14, fontweight="bold")
-    plt.axis("off")
-    plt.tight_layout()
-    out_path.parent.mkdir(parents=True, exist_ok=True)
-    plt.savefig(out_path, facecolor="white")
-    plt.close()
-    return str(out_path)
+
@@ -0,0 +1,347 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable, TypeVar
+
+from .. import metrics
+from .bdl_client import (
+    RETRY_STATUSES,
+    SEARCH_PARAMS,
+    BDLClientError,
+    BDLVariable,
+    RateLimiter,
+    backoff_delay,
+    best_variable,
+    endpoint_label,
+    parse_seconds,
+    parse_variables,
+)
+
+T = TypeVar("T")
+
+
+async def _ordered(fetch: Callable[[Any], Awaitable[T]], items: Iterable[Any], window: int) -> AsyncIterator[T]:
+    """
+    Wyniki fetch(item) w kolejności `items` (jak executor.map). W locie jest najwyżej `window`
+    zadań, więc wolny konsument nie buforuje setek stron; przerwanie anuluje resztę.
+    """
+    it = iter(items)
+    pending: deque[asyncio.Future[T]] = deque()
+    try:
+        for item in it:
+            pending.append(asyncio.ensure_future(fetch(item)))
+            if len(pending) >= window:
+                break
+        while pending:
+            result = await pending.popleft()
+            for item in it:
+                pending.append(asyncio.ensure_future(fetch(item)))
+                break
+            yield result
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+
+class AsyncBDLClient:
+    """
+    Asynchroniczny odpowiednik BDLClient (httpx + asyncio) do odświeżeń z dużym fan-outem:
+    setki stron gmin idą z jednej pętli zdarzeń zamiast z puli wątków.
+
+    Liczbę zapytań w locie ogranicza semafor (`max_concurrency`, domyślnie `max_workers`),
+    tempo – ten sam RateLimiter co w kliencie synchronicznym (nagłówki limitów BDL, 429).
+    Powierzchnia jak w BDLClient: metody są korutynami, a `iter_*` – async generatorami;
+    przerwanie iteracji albo anulowanie zadania anuluje strony, które jeszcze się pobierają.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        client_id: str | None = None,
+        timeout_s: float = 20.0,
+        pool_size: int = 8,
+        max_retries: int = 4,
+        backoff_base_s: float = 0.5,
+        backoff_max_s: float = 30.0,
+        min_interval_s: float = 0.0,
+        max_workers: int = 4,
+        search_param: str | None = None,
+        max_concurrency: int | None = None,
+        transport: Any = None,
+    ) -> None:
+        try:
+            import httpx
+        except ImportError as e:  # pragma: no cover - zależy od środowiska
+            raise RuntimeError("AsyncBDLClient requires the 'httpx' package") from e
+        self._httpx = httpx
+        self.base_url = base_url.rstrip("/")
+        self.client_id = (client_id or "").strip() or None
+        self.timeout_s = timeout_s
+        self.max_retries = max(0, int(max_retries))
+        self.backoff_base_s = backoff_base_s
+        self.backoff_max_s = backoff_max_s
+        self.max_concurrency = max(1, int(max_concurrency or max_workers))
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        # ile stron/kawałków naraz zlecamy z wyprzedzeniem (resztę i tak dławi semafor)
+        self._window = 2 * self.max_concurrency
+        self.limiter = RateLimiter(min_interval_s=min_interval_s)
+        self.search_param = search_param if search_param in SEARCH_PARAMS else None
+        self._searches: dict[tuple[str, int], list[BDLVariable]] = {}
+
+        pool_size = max(int(pool_size), self.max_concurrency)
+        self.client = httpx.AsyncClient(
+            headers=self._headers(),
+            timeout=timeout_s,
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            transport=transport,
+        )
+
+    async def __aenter__(self) -> "AsyncBDLClient":
+        return self
+
+    async def __aexit__(self, *exc: object) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+    def _headers(self) -> dict[str, str]:
+        h = {"Accept": "application/json"}
+        if self.client_id:
+            h["X-ClientId"] = self.client_id
+        return h
+
+    def _backoff_s(self, attempt: int, retry_after: float | None) -> float:
+        return backoff_delay(attempt, retry_after, self.backoff_base_s, self.backoff_max_s)
+
+    async def _get_json(self, path: str, params: dict[str, Any] | None = None) -> dict[str, Any]:
+        url = f"{self.base_url}{path}"
+        endpoint = endpoint_label(path)
+        attempt = 0
+        while True:
+            error: Exception | None = None
+            async with self._semaphore:
+                wait = self.limiter.reserve()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                started = time.perf_counter()
+                try:
+                    r = await self.client.get(url, params=params)
+                except self._httpx.HTTPError as e:
+                    error = e
+                elapsed = time.perf_counter() - started
+
+            if error is not None:
+                metrics.observe("bdl_http_request_duration_seconds", elapsed, endpoint=endpoint, status="error")
+                if attempt >= self.max_retries:
+                    raise BDLClientError(f"BDL request failed: {url} params={params} err={error}") from error
+                metrics.inc("bdl_http_retries_total", endpoint=endpoint, reason="error")
+                await asyncio.sleep(self._backoff_s(attempt, None))
+                attempt += 1
+                continue
+
+            metrics.observe("bdl_http_request_duration_seconds", elapsed, endpoint=endpoint, status=r.status_code)
+            metrics.add_timing("bdl_http", elapsed)
+            self.limiter.update_from_headers(r.headers)
+
+            if r.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                metrics.inc("bdl_http_retries_total", endpoint=endpoint, reason=r.status_code)
+                delay = self._backoff_s(attempt, parse_seconds(r.headers.get("Retry-After")))
+                if r.status_code == 429:
+                    self.limiter.penalize(delay)
+                else:
+                    await asyncio.sleep(delay)
+                attempt += 1
+                continue
+
+            try:
+                r.raise_for_status()
+                return r.json()
+            except Exception as e:
+                raise BDLClientError(f"BDL request failed: {url} params={params} err={e}") from e
+
+    async def search_variables(self, phrase: str, page_size: int = 50) -> list[BDLVariable]:
+        cached = self._searches.get((phrase, page_size))
+        if cached is not None:
+            return list(cached)
+        last_err: Exception | None = None
+        order = sorted(SEARCH_PARAMS, key=lambda n: n != self.search_param)
+        for param_name in order:
+            try:
+                payload = await self._get_json(
+                    "/variables/search",
+                    params={param_name: phrase, "page-size": page_size, "page": 0, "lang": "pl"},
+                )
+                results = parse_variables(payload)
+                self.search_param = param_name
+                self._searches[(phrase, page_size)] = results
+                return list(results)
+            except Exception as e:
+                last_err = e
+                continue
+        raise BDLClientError(f"Could not search variables for '{phrase}'. Last error: {last_err}")
+
+    async def pick_best_variable(
+        self, phrase: str, prefer_unit_contains: str | None = None, page_size: int = 50
+    ) -> BDLVariable:
+        return best_variable(await self.search_variables(phrase, page_size=page_size), phrase, prefer_unit_contains)
+
+    async def _iter_pages(self, path: str, params: dict[str, Any], page_size: int) -> AsyncIterator[list[dict[str, Any]]]:
+        payload = await self._get_json(path, params={**params, "page": 0})
+        first: list[dict[str, Any]] = payload.get("results") or []
+        if first:
+            yield first
+        if not first or not payload.get("links", {}).get("next"):
+            return
+
+        total = payload.get("totalRecords")
+        if isinstance(total, int) and total > len(first):
+            n_pages = -(-total // page_size)
+
+            def fetch(page: int) -> Awaitable[dict[str, Any]]:
+                return self._get_json(path, params={**params, "page": page})
+
+            async with aclosing(_ordered(fetch, range(1, n_pages), self._window)) as payloads:
+                async for p in payloads:
+                    results = p.get("results") or []
+                    if results:
+                        yield results
+            return
+
+        page = 1
+        while True:
+            payload = await self._get_json(path, params={**params, "page": page})
+            results = payload.get("results") or []
+            if not results:
+                break
+            yield results
+            if not payload.get("links", {}).get("next"):
+                break
+            page += 1
+
+    async def _get_all(self, path: str, params: dict[str, Any], page_size: int) -> list[dict[str, Any]]:
+        return [row async for page in self._iter_pages(path, params, page_size) for row in page]
+
+    async def get_units(self, level: int, parent_id: str | None = None, page_size: int = 100) -> list[dict[str, Any]]:
+        params: dict[str, Any] = {"format": "json", "level": int(level), "page-size": page_size, "lang": "pl"}
+        if parent_id:
+            params["parent-id"] = parent_id
+        return await self._get_all("/units", params, page_size)
+
+    def iter_data_by_variable(
+        self,
+        var_id: int,
+        years: Iterable[int],
+        unit_level: int = 2,
+        unit_parent_id: str | None = None,
+        page_size: int = 100,
+    ) -> AsyncIterator[list[dict[str, Any]]]:
+        path = f"/data/by-variable/{int(var_id)}"
+        params: dict[str, Any] = {
+            "format": "json",
+            "unit-level": unit_level,
+            "page-size": page_size,
+            "lang": "pl",
+            "year": [int(y) for y in years],
+        }
+        if unit_parent_id:
+            params["unit-parent-id"] = unit_parent_id
+        return self._iter_pages(path, params, page_size)
+
+    async def get_data_by_variable(
+        self,
+        var_id: int,
+        years: Iterable[int],
+        unit_level: int = 2,
+        unit_parent_id: str | None = None,
+        page_size: int = 100,
+    ) -> list[dict[str, Any]]:
+        pages = self.iter_data_by_variable(var_id, years, unit_level, unit_parent_id, page_size)
+        return [row async for page in pages for row in page]
+
+    async def iter_data_by_variable_chunked(
+        self,
+        var_id: int,
+        years: Iterable[int],
+        unit_level: int,
+        parent_ids: Iterable[str],
+        page_size: int = 100,
+    ) -> AsyncIterator[list[dict[str, Any]]]:
+        """Kawałki po `unit-parent-id` (jak w BDLClient), w kolejności `parent_ids`, pobierane współbieżnie."""
+        years = [int(y) for y in years]
+        parent_ids = list(parent_ids)
+        if not parent_ids:
+            async with aclosing(self.iter_data_by_variable(var_id, years, unit_level, page_size=page_size)) as pages:
+                async for page in pages:
+                    yield page
+            return
+
+        def fetch(parent_id: str) -> Awaitable[list[dict[str, Any]]]:
+            return self.get_data_by_variable(
+                var_id, years, unit_level=unit_level, unit_parent_id=parent_id, page_size=page_size
+            )
+
+        async with aclosing(_ordered(fetch, parent_ids, self._window)) as chunks:
+            async for chunk in chunks:
+                yield chunk
+
+    async def get_data_by_variable_chunked(
+        self,
+        var_id: int,
+        years: Iterable[int],
+        unit_level: int,
+        parent_ids: Iterable[str],
+        page_size: int = 100,
+    ) -> list[dict[str, Any]]:
+        chunks = self.iter_data_by_variable_chunked(var_id, years, unit_level, parent_ids, page_size)
+        return [row async for chunk in chunks for row in chunk]
+
+    async def get_data_by_unit(
+        self, unit_id: str, var_ids: Iterable[int], years: Iterable[int], page_size: int = 100
+    ) -> list[dict[str, Any]]:
+        path = f"/data/by-unit/{unit_id}"
+        params: dict[str, Any] = {
+            "format": "json",
+            "var-id": [int(v) for v in var_ids],
+            "year": [int(y) for y in years],
+            "page-size": page_size,
+            "lang": "pl",
+        }
+        pages = []
+        page = 0
+        while True:
+            payload = await self._get_json(path, params={**params, "page": page})
+            results = payload.get("results") or []
+            if results:
+                unit_name = payload.get("unitName") or ""
+                pages.append({"unitId": payload.get("unitId") or unit_id, "unitName": unit_name, "results": results})
+            if not results or not payload.get("links", {}).get("next"):
+                return pages
+            page += 1
+
+    async def iter_data_by_unit(
+        self,
+        unit_ids: Iterable[str],
+        var_ids: Iterable[int],
+        years: Iterable[int],
+        max_vars_per_call: int = 20,
+        page_size: int = 100,
+    ) -> AsyncIterator[dict[str, Any]]:
+        """Jak BDLClient.iter_data_by_unit: po kilka zmiennych na zapytanie, strony w kolejności `unit_ids`."""
+        years = [int(y) for y in years]
+        var_ids = list(dict.fromkeys(int(v) for v in var_ids))
+        step = max(1, int(max_vars_per_call))
+        jobs = [(u, var_ids[i : i + step]) for u in unit_ids for i in range(0, len(var_ids), step)]
+
+        def fetch(job: tuple[str, list[int]]) -> Awaitable[list[dict[str, Any]]]:
+            return self.get_data_by_unit(job[0], job[1], years, page_size=page_size)
+
+        async with aclosing(_ordered(fetch, jobs, self._window)) as chunks:
+            async for pages in chunks:
+                for page in pages:
+                    yield page
@@ -1,10 +1,20 @@
 from __future__ import annotations
 
+import random
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import Any, Iterable
+from datetime import timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Iterable, Iterator, Mapping
+
+from .. import metrics
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+# nazwa parametru frazy w /variables/search – zależnie od bramki
+SEARCH_PARAMS = ("name", "search")
 
-import requests
 
 @dataclass(frozen=True)
 class BDLVariable:
@@ -16,11 +26,173 @@ class BDLVariable:
 class BDLClientError(RuntimeError):
     pass
 
+
+def endpoint_label(path: str) -> str:
+    # /data/by-variable/60270 -> /data/by-variable: etykieta metryki bez id (ograniczona liczność)
+    return "/".join(seg for seg in path.split("/") if not seg.isdigit()) or "/"
+
+
+def parse_seconds(value: str | None, now: float | None = None) -> float | None:
+    """
+    Nagłówki BDL/HTTP podają czas jako liczbę sekund, znacznik epoch albo datę HTTP.
+    Zwraca liczbę sekund do odczekania (>= 0) albo None, gdy nie da się sparsować.
+    """
+    if value is None:
+        return None
+    value = str(value).strip()
+    if not value:
+        return None
+    now = time.time() if now is None else now
+    try:
+        n = float(value)
+    except ValueError:
+        try:
+            dt = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=timezone.utc)
+        return max(0.0, dt.timestamp() - now)
+    # duże liczby traktujemy jako znacznik czasu (epoch), małe jako „za ile sekund”
+    if n > 1_000_000_000:
+        return max(0.0, n - now)
+    return max(0.0, n)
+
+
+def backoff_delay(attempt: int, retry_after: float | None, base_s: float, max_s: float) -> float:
+    # exponential backoff z „full jitter”; Retry-After z serwera ma pierwszeństwo jako minimum
+    delay = random.uniform(0.0, min(max_s, base_s * (2 ** attempt)))
+    if retry_after is not None:
+        delay = max(delay, min(retry_after, max_s))
+    return delay
+
+
+def parse_variables(payload: Mapping[str, Any]) -> list[BDLVariable]:
+    return [
+        BDLVariable(
+            id=int(item.get("id")),
+            name=str(item.get("name") or ""),
+            measure_unit=item.get("measureUnitName"),
+            level=item.get("level"),
+        )
+        for item in payload.get("results", [])
+    ]
+
+
+def best_variable(candidates: list[BDLVariable], phrase: str, prefer_unit_contains: str | None = None) -> BDLVariable:
+    if not candidates:
+        raise BDLClientError(f"No variables found for phrase: {phrase}")
+
+    def score(v: BDLVariable) -> tuple[int, int, int]:
+        unit_score = 1 if (prefer_unit_contains and v.measure_unit and prefer_unit_contains.lower() in v.measure_unit.lower()) else 0
+        name_score = 1 if phrase.lower() in v.name.lower() else 0
+        level_score = 0 if v.level is None else max(0, 10 - int(v.level))
+        return (unit_score, name_score, level_score)
+
+    return sorted(candidates, key=score, reverse=True)[0]
+
+
+class RateLimiter:
+    """
+    Adaptacyjny limiter współdzielony przez wszystkie zapytania klienta.
+
+    Tempo wynika z nagłówków limitów zwracanych przez BDL (X-Rate-Limit-Remaining /
+    X-Rate-Limit-Reset): pozostałe zapytania są rozkładane równomiernie do końca okna.
+    Dopóki serwer nie poda limitów, obowiązuje tylko `min_interval_s`.
+    """
+
+    def __init__(self, min_interval_s: float = 0.0) -> None:
+        self.min_interval_s = max(0.0, float(min_interval_s))
+        self._interval_s = self.min_interval_s
+        self._next_at = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Rezerwuje kolejny slot; zwraca, ile trzeba odczekać (klient async śpi przez asyncio.sleep)."""
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next_at - now
+            self._next_at = max(now, self._next_at) + self._interval_s
+        return max(0.0, wait)
+
+    def acquire(self) -> None:
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    def penalize(self, delay_s: float) -> None:
+        # po 429 wstrzymujemy wszystkich, nie tylko wątek, który dostał odmowę
+        with self._lock:
+            self._next_at = max(self._next_at, time.monotonic() + max(0.0, delay_s))
+
+    def update_from_headers(self, headers: Mapping[str, str]) -> None:
+        remaining_raw = headers.get("X-Rate-Limit-Remaining")
+        reset_in = parse_seconds(headers.get("X-Rate-Limit-Reset"))
+        if remaining_raw is None or reset_in is None:
+            return
+        try:
+            remaining = int(float(remaining_raw))
+        except ValueError:
+            return
+
+        with self._lock:
+            if remaining <= 0:
+                self._next_at = max(self._next_at, time.monotonic() + reset_in)
+                self._interval_s = self.min_interval_s
+            else:
+                self._interval_s = max(self.min_interval_s, reset_in / remaining)
+
+
 class BDLClient:
-    def __init__(self, base_url: str, client_id: str | None = None, timeout_s: float = 20.0) -> None:
+    def __init__(
+        self,
+        base_url: str,
+        client_id: str | None = None,
+        timeout_s: float = 20.0,
+        pool_size: int = 8,
+        max_retries: int = 4,
+        backoff_base_s: float = 0.5,
+        backoff_max_s: float = 30.0,
+        min_interval_s: float = 0.0,
+        max_workers: int = 4,
+        search_param: str | None = None,
+    ) -> None:
         self.base_url = base_url.rstrip("/")
         self.client_id = (client_id or "").strip() or None
         self.timeout_s = timeout_s
+        self.max_retries = max(0, int(max_retries))
+        self.backoff_base_s = backoff_base_s
+        self.backoff_max_s = backoff_max_s
+        self.max_workers = max(1, int(max_workers))
+        # globalny limit zapytań w locie (wspólny dla stron i zmiennych pobieranych równolegle)
+        self._inflight = threading.BoundedSemaphore(self.max_workers)
+        self.limiter = RateLimiter(min_interval_s=min_interval_s)
+        # nazwa parametru, którą bramka przyjęła ostatnio – próbujemy jej najpierw
+        self.search_param = search_param if search_param in SEARCH_PARAMS else None
+        self._searches: dict[tuple[str, int], list[BDLVariable]] = {}
+
+        # requests dopiero tutaj: moduł (BDLVariable, BDLClientError) importuje się przy starcie aplikacji
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self._request_errors = requests.RequestException
+        # jedna pula połączeń keep-alive zamiast nowego TCP+TLS na każdą stronę;
+        # pula nie mniejsza niż liczba wątków, żeby równoległe strony nie czekały na połączenie
+        self.session = requests.Session()
+        pool_size = max(int(pool_size), self.max_workers)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update(self._headers())
+
+    def __enter__(self) -> "BDLClient":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.session.close()
 
     def _headers(self) -> dict[str, str]:
         h = {"Accept": "application/json"}
@@ -28,52 +200,152 @@ class BDLClient:
             h["X-ClientId"] = self.client_id
         return h
 
+    def _backoff_s(self, attempt: int, retry_after: float | None) -> float:
+        return backoff_delay(attempt, retry_after, self.backoff_base_s, self.backoff_max_s)
+
     def _get_json(self, path: str, params: dict[str, Any] | None = None) -> dict[str, Any]:
         url = f"{self.base_url}{path}"
-        try:
-            r = requests.get(url, headers=self._headers(), params=params, timeout=self.timeout_s)
-            r.raise_for_status()
-            return r.json()
-        except Exception as e:
-            raise BDLClientError(f"BDL request failed: {url} params={params} err={e}") from e
+        endpoint = endpoint_label(path)
+        attempt = 0
+        while True:
+            try:
+                with self._inflight:
+                    self.limiter.acquire()
+                    started = time.perf_counter()
+                    try:
+                        r = self.session.get(url, params=params, timeout=self.timeout_s)
+                    finally:
+                        elapsed = time.perf_counter() - started
+            except self._request_errors as e:
+                metrics.observe("bdl_http_request_duration_seconds", elapsed, endpoint=endpoint, status="error")
+                if attempt >= self.max_retries:
+                    raise BDLClientError(f"BDL request failed: {url} params={params} err={e}") from e
+                metrics.inc("bdl_http_retries_total", endpoint=endpoint, reason="error")
+                time.sleep(self._backoff_s(attempt, None))
+                attempt += 1
+                continue
+
+            metrics.observe("bdl_http_request_duration_seconds", elapsed, endpoint=endpoint, status=r.status_code)
+            metrics.add_timing("bdl_http", elapsed)
+            self.limiter.update_from_headers(r.headers)
+
+            if r.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                metrics.inc("bdl_http_retries_total", endpoint=endpoint, reason=r.status_code)
+                delay = self._backoff_s(attempt, parse_seconds(r.headers.get("Retry-After")))
+                if r.status_code == 429:
+                    self.limiter.penalize(delay)
+                else:
+                    time.sleep(delay)
+                attempt += 1
+                continue
+
+            try:
+                r.raise_for_status()
+                return r.json()
+            except Exception as e:
+                raise BDLClientError(f"BDL request failed: {url} params={params} err={e}") from e
 
     def search_variables(self, phrase: str, page_size: int = 50) -> list[BDLVariable]:
         # BDL exposes /variables/search; depending on gateway it may accept name=... or search=...
+        cached = self._searches.get((phrase, page_size))
+        if cached is not None:
+            return list(cached)
         last_err: Exception | None = None
-        for param_name in ("name", "search"):
+        order = sorted(SEARCH_PARAMS, key=lambda n: n != self.search_param)
+        for param_name in order:
             try:
                 payload = self._get_json(
                     "/variables/search",
                     params={param_name: phrase, "page-size": page_size, "page": 0, "lang": "pl"},
                 )
-                results = []
-                for item in payload.get("results", []):
-                    results.append(
-                        BDLVariable(
-                            id=int(item.get("id")),
-                            name=str(item.get("name") or ""),
-                            measure_unit=item.get("measureUnitName"),
-                            level=item.get("level"),
-                        )
-                    )
-                return results
+                results = parse_variables(payload)
+                self.search_param = param_name
+                self._searches[(phrase, page_size)] = results
+                return list(results)
             except Exception as e:
                 last_err = e
                 continue
         raise BDLClientError(f"Could not search variables for '{phrase}'. Last error: {last_err}")
 
-    def pick_best_variable(self, phrase: str, prefer_unit_contains: str | None = None) -> BDLVariable:
-        candidates = self.search_variables(phrase)
-        if not candidates:
-            raise BDLClientError(f"No variables found for phrase: {phrase}")
+    def pick_best_variable(
+        self, phrase: str, prefer_unit_contains: str | None = None, page_size: int = 50
+    ) -> BDLVariable:
+        return best_variable(self.search_variables(phrase, page_size=page_size), phrase, prefer_unit_contains)
+
+    def _iter_page_payloads(self, path: str, params: dict[str, Any], pages: Iterable[int]) -> Iterator[dict[str, Any]]:
+        # executor.map zachowuje kolejność stron -> wynik deterministyczny niezależnie od tego, która skończy pierwsza
+        pages = list(pages)
+        if not pages:
+            return
+        workers = max(1, min(self.max_workers, len(pages)))
+        if workers == 1:
+            for p in pages:
+                yield self._get_json(path, params={**params, "page": p})
+            return
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bdl-page") as ex:
+            yield from ex.map(lambda p: self._get_json(path, params={**params, "page": p}), pages)
 
-        def score(v: BDLVariable) -> tuple[int, int, int]:
-            unit_score = 1 if (prefer_unit_contains and v.measure_unit and prefer_unit_contains.lower() in v.measure_unit.lower()) else 0
-            name_score = 1 if phrase.lower() in v.name.lower() else 0
-            level_score = 0 if v.level is None else max(0, 10 - int(v.level))
-            return (unit_score, name_score, level_score)
+    def _iter_pages(self, path: str, params: dict[str, Any], page_size: int) -> Iterator[list[dict[str, Any]]]:
+        """Kolejne strony `results` – konsument przetwarza stronę, zanim dostanie następną."""
+        # tempo kolejnych stron reguluje self.limiter (nagłówki limitów BDL)
+        payload = self._get_json(path, params={**params, "page": 0})
+        first: list[dict[str, Any]] = payload.get("results") or []
+        if first:
+            yield first
+        if not first or not payload.get("links", {}).get("next"):
+            return
 
-        return sorted(candidates, key=score, reverse=True)[0]
+        # pierwsza strona zna totalRecords -> pozostałe strony pobieramy równolegle
+        total = payload.get("totalRecords")
+        if isinstance(total, int) and total > len(first):
+            n_pages = -(-total // page_size)
+            for p in self._iter_page_payloads(path, params, range(1, n_pages)):
+                results = p.get("results") or []
+                if results:
+                    yield results
+            return
+
+        # brak totalRecords: idziemy po links.next jak wcześniej
+        page = 1
+        while True:
+            payload = self._get_json(path, params={**params, "page": page})
+            results = payload.get("results") or []
+            if not results:
+                break
+            yield results
+            if not payload.get("links", {}).get("next"):
+                break
+            page += 1
+
+    def _get_all(self, path: str, params: dict[str, Any], page_size: int) -> list[dict[str, Any]]:
+        return [row for page in self._iter_pages(path, params, page_size) for row in page]
+
+    def get_units(self, level: int, parent_id: str | None = None, page_size: int = 100) -> list[dict[str, Any]]:
+        params: dict[str, Any] = {"format": "json", "level": int(level), "page-size": page_size, "lang": "pl"}
+        if parent_id:
+            params["parent-id"] = parent_id
+        return self._get_all("/units", params, page_size)
+
+    def iter_data_by_variable(
+        self,
+        var_id: int,
+        years: Iterable[int],
+        unit_level: int = 2,
+        unit_parent_id: str | None = None,
+        page_size: int = 100,
+    ) -> Iterator[list[dict[str, Any]]]:
+        """Dane zmiennej strona po stronie (do strumieniowej normalizacji bez listy wszystkich wierszy)."""
+        path = f"/data/by-variable/{int(var_id)}"
+        params: dict[str, Any] = {
+            "format": "json",
+            "unit-level": unit_level,
+            "page-size": page_size,
+            "lang": "pl",
+        }
+        params["year"] = [int(y) for y in years]
+        if unit_parent_id:
+            params["unit-parent-id"] = unit_parent_id
+        return self._iter_pages(path, params, page_size)
 
     def get_data_by_variable(
         self,
@@ -82,34 +354,99 @@ class BDLClient:
         unit_level: int = 2,
         unit_parent_id: str | None = None,
         page_size: int = 100,
-        sleep_between_pages_s: float = 0.05,
     ) -> list[dict[str, Any]]:
-        rows: list[dict[str, Any]] = []
-        page = 0
-        years_list = list(years)
+        pages = self.iter_data_by_variable(var_id, years, unit_level, unit_parent_id, page_size)
+        return [row for page in pages for row in page]
 
+    def iter_data_by_variable_chunked(
+        self,
+        var_id: int,
+        years: Iterable[int],
+        unit_level: int,
+        parent_ids: Iterable[str],
+        page_size: int = 100,
+    ) -> Iterator[list[dict[str, Any]]]:
+        """
+        Dane dla drobnych jednostek (powiaty, gminy) pobierane kawałkami po `unit-parent-id`.
+
+        Każdy kawałek ma kilka stron zamiast setek stron jednego zapytania, kawałki idą
+        równolegle, a semafor klienta i tak pilnuje globalnego limitu zapytań w locie.
+        Kawałki (wiersze jednego rodzica) wychodzą w kolejności `parent_ids`.
+        """
+        years = [int(y) for y in years]
+        parent_ids = list(parent_ids)
+        if not parent_ids:
+            yield from self.iter_data_by_variable(var_id, years, unit_level=unit_level, page_size=page_size)
+            return
+
+        def fetch(parent_id: str) -> list[dict[str, Any]]:
+            return self.get_data_by_variable(
+                var_id, years, unit_level=unit_level, unit_parent_id=parent_id, page_size=page_size
+            )
+
+        workers = max(1, min(self.max_workers, len(parent_ids)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bdl-chunk") as ex:
+            yield from ex.map(fetch, parent_ids)
+
+    def get_data_by_variable_chunked(
+        self,
+        var_id: int,
+        years: Iterable[int],
+        unit_level: int,
+        parent_ids: Iterable[str],
+        page_size: int = 100,
+    ) -> list[dict[str, Any]]:
+        chunks = self.iter_data_by_variable_chunked(var_id, years, unit_level, parent_ids, page_size)
+        return [row for chunk in chunks for row in chunk]
+
+    def get_data_by_unit(
+        self, unit_id: str, var_ids: Iterable[int], years: Iterable[int], page_size: int = 100
+    ) -> list[dict[str, Any]]:
+        """Strony /data/by-unit/{unit_id} dla kilku zmiennych naraz (var-id powtórzone w zapytaniu)."""
+        path = f"/data/by-unit/{unit_id}"
+        params: dict[str, Any] = {
+            "format": "json",
+            "var-id": [int(v) for v in var_ids],
+            "year": [int(y) for y in years],
+            "page-size": page_size,
+            "lang": "pl",
+        }
+        pages = []
+        page = 0
         while True:
-            params: dict[str, Any] = {
-                "format": "json",
-                "unit-level": unit_level,
-                "page-size": page_size,
-                "page": page,
-                "lang": "pl",
-            }
-            params["year"] = [int(y) for y in years_list]
-            if unit_parent_id:
-                params["unit-parent-id"] = unit_parent_id
-
-            payload = self._get_json(f"/data/by-variable/{int(var_id)}", params=params)
+            payload = self._get_json(path, params={**params, "page": page})
             results = payload.get("results") or []
-            if not results:
-                break
-            rows.extend(results)
+            if results:
+                unit_name = payload.get("unitName") or ""
+                pages.append({"unitId": payload.get("unitId") or unit_id, "unitName": unit_name, "results": results})
+            if not results or not payload.get("links", {}).get("next"):
+                return pages
+            page += 1
 
-            if not payload.get("links", {}).get("next"):
-                break
+    def iter_data_by_unit(
+        self,
+        unit_ids: Iterable[str],
+        var_ids: Iterable[int],
+        years: Iterable[int],
+        max_vars_per_call: int = 20,
+        page_size: int = 100,
+    ) -> Iterator[dict[str, Any]]:
+        """
+        Dane wielu zmiennych po jednostkach: jedno zapytanie niesie do `max_vars_per_call` zmiennych,
+        więc koszt zależy od liczby jednostek, a nie zmiennych. Zapytania idą równolegle,
+        strony ({unitId, unitName, results}) wychodzą w kolejności `unit_ids`.
+        """
+        years = [int(y) for y in years]
+        var_ids = list(dict.fromkeys(int(v) for v in var_ids))
+        step = max(1, int(max_vars_per_call))
+        jobs = [(u, var_ids[i : i + step]) for u in unit_ids for i in range(0, len(var_ids), step)]
+        if not jobs:
+            return
 
-            page += 1
-            time.sleep(sleep_between_pages_s)
+        def fetch(job: tuple[str, list[int]]) -> list[dict[str, Any]]:
+            return self.get_data_by_unit(job[0], job[1], years, page_size=page_size)
 
-        return rows
+        workers = max(1, min(self.max_workers, len(jobs)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bdl-unit") as ex:
+            for pages in ex.map(fetch, jobs):
+                yield from pages
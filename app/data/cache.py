@@ -1,38 +1,850 @@
 from __future__ import annotations
 
+from abc import ABC, abstractmethod
+from contextlib import closing, contextmanager, nullcontext
 from dataclasses import dataclass
 from datetime import datetime, timezone, timedelta
 from pathlib import Path
+from importlib.util import find_spec
+from typing import TYPE_CHECKING, Callable, Iterator
+import hashlib
 import json
-import pandas as pd
+import logging
+import os
+import sqlite3
+import struct
+import threading
+import time
+import uuid
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+if os.name == "nt":  # pragma: no cover - zależy od platformy
+    import msvcrt
+else:
+    import fcntl
+
+# pyarrow jest opcjonalny – bez niego zostaje CSV.gz; sprawdzamy bez importu (pandas/pyarrow
+# ładują się dopiero przy pierwszym odczycie albo zapisie ramki, nie przy starcie aplikacji)
+HAS_PYARROW = find_spec("pyarrow") is not None
+
+log = logging.getLogger(__name__)
+
 
 @dataclass(frozen=True)
 class CacheMeta:
     created_at_iso: str
     source: str
+    format: str = "csv.gz"
+    data_sha256: str | None = None
+    # nazwa wersjonowanego pliku danych; None = stary układ <key>.<suffix>
+    data_file: str | None = None
+    # wersjonowany plik z gotowymi agregatami (summary, tabele, serie) dla tej wersji danych
+    aggregates_file: str | None = None
+
+
+@dataclass(frozen=True)
+class CacheFormat:
+    name: str
+    suffix: str
+    write: Callable[[pd.DataFrame, Path], None]
+    read: Callable[[Path], pd.DataFrame]
+    requires_pyarrow: bool = False
+
+
+def apply_schema(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Jawne typy kolumn cache: year -> Int16, unitId/unitName -> category, metryki -> float32.
+    Dzięki temu odczyt nie musi zgadywać typów, a analiza nie musi ich poprawiać.
+    """
+    import pandas as pd
+
+    out = {}
+    for col in df.columns:
+        s = df[col]
+        if col == "year":
+            out[col] = pd.to_numeric(s, errors="coerce").astype("Int16")
+        elif col in ("unitId", "unitName"):
+            if isinstance(s.dtype, pd.CategoricalDtype):
+                out[col] = s
+                continue
+            out[col] = s.astype(object).fillna("").astype(str).replace("nan", "").str.strip().astype("category")
+        else:
+            out[col] = pd.to_numeric(s, errors="coerce").astype("float32")
+    return pd.DataFrame(out, index=df.index)
+
+
+def _write_csv(df: pd.DataFrame, path: Path) -> None:
+    df.to_csv(path, index=False, compression="gzip")
+
+
+def _read_csv(path: Path) -> pd.DataFrame:
+    # unitId to kod TERYT z wiodącymi zerami – nie może zostać liczbą
+    import pandas as pd
+
+    return apply_schema(pd.read_csv(path, compression="gzip", dtype={"unitId": str, "unitName": str}))
+
+
+def _write_parquet(df: pd.DataFrame, path: Path) -> None:
+    df.to_parquet(path, index=False, engine="pyarrow", compression="zstd")
+
+
+def _read_parquet(path: Path) -> pd.DataFrame:
+    import pandas as pd
+
+    return pd.read_parquet(path, engine="pyarrow", memory_map=True)
+
+
+def _write_feather(df: pd.DataFrame, path: Path) -> None:
+    # bez kompresji: plik Arrow IPC da się zmapować do pamięci bez kopiowania buforów
+    df.reset_index(drop=True).to_feather(path, compression="uncompressed")
+
+
+def _read_feather(path: Path) -> pd.DataFrame:
+    from pyarrow import feather
+
+    return feather.read_table(path, memory_map=True).to_pandas()
+
+
+FORMATS: dict[str, CacheFormat] = {
+    "parquet": CacheFormat("parquet", "parquet", _write_parquet, _read_parquet, requires_pyarrow=True),
+    "feather": CacheFormat("feather", "arrow", _write_feather, _read_feather, requires_pyarrow=True),
+    "csv.gz": CacheFormat("csv.gz", "csv.gz", _write_csv, _read_csv),
+}
+
+DEFAULT_FORMAT = "parquet" if HAS_PYARROW else "csv.gz"
+
+
+def resolve_format(name: str | None) -> CacheFormat:
+    fmt = FORMATS.get((name or DEFAULT_FORMAT).lower())
+    if fmt is None:
+        raise ValueError(f"Unknown cache format: {name!r} (known: {', '.join(FORMATS)})")
+    if fmt.requires_pyarrow and not HAS_PYARROW:
+        return FORMATS["csv.gz"]
+    return fmt
+
 
 def _meta_path(cache_dir: Path, key: str) -> Path:
     return cache_dir / f"{key}.meta.json"
 
-def _data_path(cache_dir: Path, key: str) -> Path:
-    return cache_dir / f"{key}.csv.gz"
+def _data_path(cache_dir: Path, key: str, fmt: str = "csv.gz") -> Path:
+    return cache_dir / f"{key}.{FORMATS[fmt].suffix}"
 
-def is_cache_fresh(cache_dir: Path, key: str, max_age_hours: int) -> bool:
+def _lock_path(cache_dir: Path, key: str) -> Path:
+    return cache_dir / f"{key}.lock"
+
+def _new_data_path(cache_dir: Path, key: str, fmt: str) -> Path:
+    # każda wersja ma własny plik – czytelnik nigdy nie trafi na plik w trakcie zapisu
+    return cache_dir / f"{key}.{uuid.uuid4().hex[:12]}.{FORMATS[fmt].suffix}"
+
+def _new_aggregates_path(cache_dir: Path, key: str) -> Path:
+    return cache_dir / f"{key}.{uuid.uuid4().hex[:12]}.aggregates.json"
+
+def _stored_data_path(cache_dir: Path, key: str, meta: CacheMeta | None) -> Path:
+    fmt = meta.format if meta and meta.format in FORMATS else "csv.gz"
+    if meta is not None and meta.data_file:
+        return cache_dir / meta.data_file
+    return _data_path(cache_dir, key, fmt)
+
+def _tmp_path(path: Path) -> Path:
+    return path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+def atomic_write(path: Path, write: Callable[[Path], None]) -> None:
+    """Zapis do pliku tymczasowego w tym samym katalogu i os.replace – plik jest cały albo go nie ma."""
+    tmp = _tmp_path(path)
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+def read_meta(cache_dir: Path, key: str) -> CacheMeta | None:
     mp = _meta_path(cache_dir, key)
     if not mp.exists():
+        return None
+    try:
+        raw = json.loads(mp.read_text(encoding="utf-8"))
+        return CacheMeta(**{k: raw[k] for k in CacheMeta.__dataclass_fields__ if k in raw})
+    except Exception:
+        return None
+
+def _write_meta(cache_dir: Path, key: str, meta: CacheMeta) -> None:
+    # podmiana meta to moment „commitu” nowej wersji danych
+    payload = json.dumps(meta.__dict__, ensure_ascii=False, indent=2)
+    atomic_write(_meta_path(cache_dir, key), lambda p: p.write_text(payload, encoding="utf-8"))
+
+def _file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+# stare meta (bez data_sha256): hash liczymy raz na wersję pliku, nie na każde zapytanie
+_legacy_hashes: dict[tuple[str, int, int], str] = {}
+_legacy_lock = threading.Lock()
+
+def cache_fingerprint(cache_dir: Path, key: str) -> str | None:
+    """
+    Wersja danych w cache: created_at_iso + hash pliku danych. None, gdy cache nie istnieje.
+    Zmienia się przy każdym zapisie, więc nadaje się na klucz memoizacji wyników pochodnych.
+    """
+    meta = read_meta(cache_dir, key)
+    if meta is None:
+        return None
+    digest = meta.data_sha256
+    if not digest:
+        dp = _stored_data_path(cache_dir, key, meta)
+        try:
+            st = dp.stat()
+        except FileNotFoundError:
+            return None
+        stat_key = (str(dp), st.st_mtime_ns, st.st_size)
+        with _legacy_lock:
+            digest = _legacy_hashes.get(stat_key)
+        if digest is None:
+            digest = _file_sha256(dp)
+            with _legacy_lock:
+                _legacy_hashes[stat_key] = digest
+    return f"{meta.created_at_iso}|{digest[:16]}"
+
+_write_listeners: list[Callable[[Path, str], None]] = []
+
+def on_cache_write(callback: Callable[[Path, str], None]) -> Callable[[Path, str], None]:
+    """Rejestruje callback(cache_dir, key) wołany po każdym zapisie cache (np. unieważnienie memo)."""
+    if callback not in _write_listeners:
+        _write_listeners.append(callback)
+    return callback
+
+def _notify_write(cache_dir: Path, key: str) -> None:
+    for cb in list(_write_listeners):
+        cb(cache_dir, key)
+
+def is_cache_fresh(cache_dir: Path, key: str, max_age_hours: int) -> bool:
+    meta = read_meta(cache_dir, key)
+    if meta is None:
         return False
     try:
-        meta = json.loads(mp.read_text(encoding="utf-8"))
-        created = datetime.fromisoformat(meta["created_at_iso"]).astimezone(timezone.utc)
+        created = datetime.fromisoformat(meta.created_at_iso).astimezone(timezone.utc)
         return datetime.now(timezone.utc) - created <= timedelta(hours=max_age_hours)
     except Exception:
         return False
 
-def save_cache(cache_dir: Path, key: str, df: pd.DataFrame, source: str) -> None:
+class CacheLockTimeout(TimeoutError):
+    """Inny proces trzyma blokadę odświeżania dłużej niż pozwala timeout."""
+
+
+def _try_lock(f) -> bool:
+    try:
+        if os.name == "nt":  # pragma: no cover - zależy od platformy
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        return False
+    return True
+
+def _unlock(f) -> None:
+    if os.name == "nt":  # pragma: no cover - zależy od platformy
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+    else:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+@contextmanager
+def refresh_lock(cache_dir: Path, key: str, timeout_s: float = 300.0, poll_s: float = 0.1) -> Iterator[None]:
+    """
+    Blokada odświeżania danego klucza wspólna dla procesów (plik <key>.lock, flock/msvcrt).
+
+    Czeka najwyżej `timeout_s` (0 = tylko jedna próba) i rzuca CacheLockTimeout.
+    System zdejmuje blokadę razem z procesem, więc padnięty worker jej nie zostawi.
+    """
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    deadline = time.monotonic() + max(timeout_s, 0.0)
+    with _lock_path(cache_dir, key).open("a+b") as f:
+        while not _try_lock(f):
+            if time.monotonic() >= deadline:
+                raise CacheLockTimeout(f"Cache {key} is being refreshed by another process")
+            time.sleep(poll_s)
+        try:
+            yield
+        finally:
+            _unlock(f)
+
+def single_flight(
+    cache_dir: Path,
+    key: str,
+    produce: Callable[[], pd.DataFrame],
+    timeout_s: float = 300.0,
+) -> tuple[pd.DataFrame | None, bool]:
+    """
+    Jedno odświeżenie naraz we wszystkich procesach: `produce()` (pobranie + save_cache)
+    woła tylko właściciel blokady. Kto czekał, a w międzyczasie inny proces zapisał nową
+    wersję, nie pobiera drugi raz – dostaje (None, False) i czyta cache.
+    Zwraca (wynik produce, True), gdy odświeżenie wykonał ten proces.
+
+    Z włączonym wspólnym cache (configure_shared_cache) to samo dotyczy replik
+    w innych kontenerach: blokada w backendzie + pobranie nowszej wersji zamiast BDL.
+    """
+    seen = cache_fingerprint(cache_dir, key)
+    shared = _shared
+    with refresh_lock(cache_dir, key, timeout_s=timeout_s):
+        # przy wspólnym cache: jedna replika odświeża, pozostałe pobierają jej wynik
+        with shared.lock(key, timeout_s=timeout_s) if shared is not None else nullcontext():
+            pull_shared(cache_dir, key)
+            if cache_fingerprint(cache_dir, key) != seen:
+                return None, False
+            return produce(), True
+
+def _prune_data_files(cache_dir: Path, key: str, keep: set[str]) -> None:
+    # poprzednią wersję zostawiamy: czytelnik mógł właśnie odczytać stare meta
+    suffixes = [fmt.suffix for fmt in FORMATS.values()] + ["aggregates.json"]
+    for suffix in suffixes:
+        for p in cache_dir.glob(f"{key}.*{suffix}"):
+            if p.name not in keep and p.name != _meta_path(cache_dir, key).name:
+                p.unlink(missing_ok=True)
+
+def _write_aggregates(
+    cache_dir: Path, key: str, stored: pd.DataFrame, aggregates: Callable[[pd.DataFrame], dict]
+) -> str | None:
+    # agregaty liczone z danych dokładnie w postaci zapisanej (po apply_schema)
+    try:
+        payload = json.dumps(aggregates(stored), ensure_ascii=False, separators=(",", ":"), allow_nan=False)
+    except Exception:
+        log.exception("Cache %s: failed to build aggregates, saving data without them", key)
+        return None
+    ap = _new_aggregates_path(cache_dir, key)
+    atomic_write(ap, lambda p: p.write_text(payload, encoding="utf-8"))
+    return ap.name
+
+def _commit_data(
+    cache_dir: Path,
+    key: str,
+    df: pd.DataFrame,
+    cf: CacheFormat,
+    created_at_iso: str,
+    source: str,
+    aggregates: Callable[[pd.DataFrame], dict] | None = None,
+    aggregates_file: str | None = None,
+) -> None:
+    previous = read_meta(cache_dir, key)
+    stored = apply_schema(df)
+    dp = _new_data_path(cache_dir, key, cf.name)
+    atomic_write(dp, lambda p: cf.write(stored, p))
+    if aggregates is not None:
+        aggregates_file = _write_aggregates(cache_dir, key, stored, aggregates)
+    _write_meta(
+        cache_dir,
+        key,
+        CacheMeta(
+            created_at_iso=created_at_iso,
+            source=source,
+            format=cf.name,
+            data_sha256=_file_sha256(dp),
+            data_file=dp.name,
+            aggregates_file=aggregates_file,
+        ),
+    )
+    keep = {dp.name, aggregates_file}
+    if previous is not None:
+        keep |= {_stored_data_path(cache_dir, key, previous).name, previous.aggregates_file}
+    _prune_data_files(cache_dir, key, keep)
+    _notify_write(cache_dir, key)
+    _publish_shared(cache_dir, key)
+
+def _publish_shared(cache_dir: Path, key: str) -> None:
+    shared = _shared
+    if shared is None:
+        return
+    try:
+        shared.publish(cache_dir, key)
+    except Exception:
+        log.exception("Cache %s: shared cache publish failed", key)
+
+def save_cache(
+    cache_dir: Path,
+    key: str,
+    df: pd.DataFrame,
+    source: str,
+    fmt: str | None = None,
+    aggregates: Callable[[pd.DataFrame], dict] | None = None,
+) -> None:
+    """
+    Zapisuje nową wersję danych. `aggregates(df)` (opcjonalnie) buduje słownik JSON
+    zapisywany obok danych i wskazywany z tego samego meta – wersjonowany razem z nimi.
+    """
     cache_dir.mkdir(parents=True, exist_ok=True)
-    df.to_csv(_data_path(cache_dir, key), index=False, compression="gzip")
-    meta = CacheMeta(created_at_iso=datetime.now(timezone.utc).isoformat(), source=source)
-    _meta_path(cache_dir, key).write_text(json.dumps(meta.__dict__, ensure_ascii=False, indent=2), encoding="utf-8")
+    _commit_data(
+        cache_dir, key, df, resolve_format(fmt), datetime.now(timezone.utc).isoformat(), source, aggregates=aggregates
+    )
+
+def migrate_cache(cache_dir: Path, key: str, fmt: str | None = None) -> bool:
+    """
+    Przepisuje istniejący cache (np. stary CSV.gz) do formatu `fmt`, zachowując created_at_iso,
+    żeby migracja nie „odświeżała” danych. Zwraca True, jeśli coś przepisano.
+    """
+    target = resolve_format(fmt)
+    meta = read_meta(cache_dir, key)
+    src_name = meta.format if meta and meta.format in FORMATS else "csv.gz"
+    src_path = _stored_data_path(cache_dir, key, meta)
+    if src_name == target.name or not src_path.exists():
+        return False
+
+    df = FORMATS[src_name].read(src_path)
+    _commit_data(
+        cache_dir,
+        key,
+        df,
+        target,
+        created_at_iso=meta.created_at_iso if meta else datetime.now(timezone.utc).isoformat(),
+        source=meta.source if meta else "migrated",
+        # te same dane w innym formacie – agregaty zostają ważne
+        aggregates_file=meta.aggregates_file if meta else None,
+    )
+    src_path.unlink(missing_ok=True)
+    return True
+
+def load_cache(cache_dir: Path, key: str, fmt: str | None = None) -> pd.DataFrame:
+    target = resolve_format(fmt)
+    for attempt in range(3):
+        meta = read_meta(cache_dir, key)
+        stored = meta.format if meta and meta.format in FORMATS else "csv.gz"
 
-def load_cache(cache_dir: Path, key: str) -> pd.DataFrame:
-    return pd.read_csv(_data_path(cache_dir, key), compression="gzip")
+        if stored != target.name and _stored_data_path(cache_dir, key, meta).exists():
+            migrate_cache(cache_dir, key, target.name)
+            continue
+
+        cf = FORMATS[stored]
+        if cf.requires_pyarrow and not HAS_PYARROW:
+            raise RuntimeError(f"Cache {key} is stored as {cf.name}, which requires pyarrow")
+        try:
+            return cf.read(_stored_data_path(cache_dir, key, meta))
+        except FileNotFoundError:
+            # meta wskazało wersję, którą równoległy zapis zdążył już usunąć – czytamy nowe meta
+            if attempt == 2:
+                raise
+    raise RuntimeError(f"Cache {key} keeps changing format while being read")
+
+def load_aggregates(cache_dir: Path, key: str) -> dict | None:
+    """Gotowe agregaty bieżącej wersji danych albo None (brak pliku, stary cache)."""
+    for _ in range(3):
+        meta = read_meta(cache_dir, key)
+        if meta is None or not meta.aggregates_file:
+            return None
+        try:
+            raw = json.loads((cache_dir / meta.aggregates_file).read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            # jak w load_cache: wersja właśnie podmieniona – czytamy nowe meta
+            continue
+        except ValueError:
+            return None
+        return raw if isinstance(raw, dict) else None
+    return None
+
+
+# ------- wspólny cache dla wielu replik (dysk / SQLite / Redis) -------
+
+class CacheBackend(ABC):
+    """
+    Magazyn bajtów pod nazwami, z TTL. `add` zapisuje tylko, gdy nazwy nie ma (lub wygasła) –
+    na tym opiera się blokada odświeżania wspólna dla replik.
+    """
+
+    @abstractmethod
+    def get(self, name: str) -> bytes | None: ...
+
+    @abstractmethod
+    def set(self, name: str, value: bytes, ttl_s: float | None = None) -> None: ...
+
+    @abstractmethod
+    def add(self, name: str, value: bytes, ttl_s: float | None = None) -> bool: ...
+
+    @abstractmethod
+    def delete(self, name: str) -> None: ...
+
+    @abstractmethod
+    def delete_if(self, name: str, value: bytes) -> bool:
+        """Usuwa wpis tylko, gdy nadal ma tę wartość (sprawdzenie i usunięcie w jednym kroku)."""
+
+    @abstractmethod
+    def renew(self, name: str, value: bytes, ttl_s: float) -> bool:
+        """Przedłuża TTL wpisu, który nadal ma tę wartość i nie wygasł; False = wpis należy do kogoś innego."""
+
+
+def _expires_at(ttl_s: float | None) -> float:
+    return time.time() + ttl_s if ttl_s else 0.0  # 0 = bez wygaśnięcia
+
+
+class LocalDiskBackend(CacheBackend):
+    """Katalog (np. wolumen NFS montowany we wszystkich kontenerach); plik = 8 B wygaśnięcia + treść."""
+
+    def __init__(self, root: Path) -> None:
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, name: str) -> Path:
+        return self.root / (hashlib.sha256(name.encode("utf-8")).hexdigest()[:32] + ".bin")
+
+    @contextmanager
+    def _guard(self, path: Path) -> Iterator[None]:
+        # sprawdzenie + zmiana wpisu pod blokadą pliku obok (flock/msvcrt), jak refresh_lock
+        with path.with_suffix(".guard").open("a+b") as f:
+            while not _try_lock(f):
+                time.sleep(0.01)
+            try:
+                yield
+            finally:
+                _unlock(f)
+
+    def _read(self, path: Path) -> bytes | None:
+        try:
+            raw = path.read_bytes()
+        except FileNotFoundError:
+            return None
+        expires = struct.unpack("<d", raw[:8])[0] if len(raw) >= 8 else -1.0
+        if expires < 0 or (expires and expires < time.time()):
+            return None
+        return raw[8:]
+
+    def get(self, name: str) -> bytes | None:
+        return self._read(self._path(name))
+
+    def set(self, name: str, value: bytes, ttl_s: float | None = None) -> None:
+        payload = struct.pack("<d", _expires_at(ttl_s)) + value
+        atomic_write(self._path(name), lambda p: p.write_bytes(payload))
+
+    def _held(self, path: Path, ttl_s: float | None) -> bool:
+        try:
+            raw = path.read_bytes()
+            mtime = path.stat().st_mtime
+        except FileNotFoundError:
+            return False
+        if len(raw) < 8:
+            # niepełny plik (np. cudzy zapis w toku) to zajęta nazwa; za porzucony uznajemy go po ttl_s
+            return not (ttl_s and mtime + ttl_s < time.time())
+        return self._read(path) is not None
+
+    def add(self, name: str, value: bytes, ttl_s: float | None = None) -> bool:
+        path = self._path(name)
+        payload = struct.pack("<d", _expires_at(ttl_s)) + value
+        # sprawdzenie i zapis pod jedną blokadą – inna replika nie zobaczy pliku bez treści
+        with self._guard(path):
+            if self._held(path, ttl_s):
+                return False
+            atomic_write(path, lambda p: p.write_bytes(payload))
+        return True
+
+    def delete(self, name: str) -> None:
+        self._path(name).unlink(missing_ok=True)
+
+    def delete_if(self, name: str, value: bytes) -> bool:
+        path = self._path(name)
+        with self._guard(path):
+            if self._read(path) != value:
+                return False
+            path.unlink(missing_ok=True)
+        return True
+
+    def renew(self, name: str, value: bytes, ttl_s: float) -> bool:
+        path = self._path(name)
+        with self._guard(path):
+            if self._read(path) != value:
+                return False
+            payload = struct.pack("<d", _expires_at(ttl_s)) + value
+            atomic_write(path, lambda p: p.write_bytes(payload))
+        return True
+
+
+class SQLiteBackend(CacheBackend):
+    """Jeden plik SQLite (tabela entries) – wystarcza dla replik na jednym hoście / wspólnym wolumenie."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries (name TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL)"
+            )
+
+    def _connect(self) -> closing[sqlite3.Connection]:
+        # połączenie na operację: bezpieczne między wątkami i procesami
+        return closing(sqlite3.connect(self.path, timeout=30, isolation_level=None))
+
+    def get(self, name: str) -> bytes | None:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT value FROM entries WHERE name = ? AND (expires_at = 0 OR expires_at > ?)", (name, time.time())
+            ).fetchone()
+        return bytes(row[0]) if row else None
+
+    def set(self, name: str, value: bytes, ttl_s: float | None = None) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (name, value, expires_at) VALUES (?, ?, ?)",
+                (name, sqlite3.Binary(value), _expires_at(ttl_s)),
+            )
+
+    def add(self, name: str, value: bytes, ttl_s: float | None = None) -> bool:
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("DELETE FROM entries WHERE name = ? AND expires_at != 0 AND expires_at <= ?", (name, time.time()))
+                cur = conn.execute(
+                    "INSERT OR IGNORE INTO entries (name, value, expires_at) VALUES (?, ?, ?)",
+                    (name, sqlite3.Binary(value), _expires_at(ttl_s)),
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return cur.rowcount == 1
+
+    def delete(self, name: str) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM entries WHERE name = ?", (name,))
+
+    def delete_if(self, name: str, value: bytes) -> bool:
+        with self._connect() as conn:
+            cur = conn.execute(
+                "DELETE FROM entries WHERE name = ? AND value = ? AND (expires_at = 0 OR expires_at > ?)",
+                (name, sqlite3.Binary(value), time.time()),
+            )
+        return cur.rowcount == 1
+
+    def renew(self, name: str, value: bytes, ttl_s: float) -> bool:
+        with self._connect() as conn:
+            cur = conn.execute(
+                "UPDATE entries SET expires_at = ? WHERE name = ? AND value = ? AND (expires_at = 0 OR expires_at > ?)",
+                (_expires_at(ttl_s), name, sqlite3.Binary(value), time.time()),
+            )
+        return cur.rowcount == 1
+
+
+class RedisBackend(CacheBackend):
+    """Redis (albo zgodny serwer); `client` pozwala podać np. fakeredis w testach."""
+
+    def __init__(self, url: str | None = None, client=None) -> None:
+        if client is None:
+            try:
+                import redis
+            except ImportError as e:  # pragma: no cover - zależy od środowiska
+                raise RuntimeError("SHARED_CACHE_URL=redis://... requires the 'redis' package") from e
+            client = redis.Redis.from_url(url)
+        self.client = client
+
+    @staticmethod
+    def _px(ttl_s: float | None) -> int | None:
+        return max(1, int(ttl_s * 1000)) if ttl_s else None
+
+    def get(self, name: str) -> bytes | None:
+        return self.client.get(name)
+
+    def set(self, name: str, value: bytes, ttl_s: float | None = None) -> None:
+        self.client.set(name, value, px=self._px(ttl_s))
+
+    def add(self, name: str, value: bytes, ttl_s: float | None = None) -> bool:
+        return bool(self.client.set(name, value, px=self._px(ttl_s), nx=True))
+
+    def delete(self, name: str) -> None:
+        self.client.delete(name)
+
+    def _if_value(self, name: str, value: bytes, change: Callable) -> bool:
+        # WATCH + MULTI: zmiana przechodzi tylko, gdy nikt nie ruszył klucza od odczytu
+        import redis
+
+        with self.client.pipeline() as pipe:
+            try:
+                pipe.watch(name)
+                if pipe.get(name) != value:
+                    return False
+                pipe.multi()
+                change(pipe)
+                pipe.execute()
+            except redis.WatchError:
+                return False
+        return True
+
+    def delete_if(self, name: str, value: bytes) -> bool:
+        return self._if_value(name, value, lambda pipe: pipe.delete(name))
+
+    def renew(self, name: str, value: bytes, ttl_s: float) -> bool:
+        return self._if_value(name, value, lambda pipe: pipe.pexpire(name, self._px(ttl_s)))
+
+
+def backend_from_url(url: str | None) -> CacheBackend | None:
+    """`sqlite:///ścieżka.db`, `redis://host:6379/0`, `disk:///katalog`; pusty = brak wspólnego cache."""
+    if not url:
+        return None
+    scheme, sep, rest = url.partition("://")
+    if not sep:
+        raise ValueError(f"Unknown shared cache URL: {url!r}")
+    if scheme in ("redis", "rediss", "unix"):
+        return RedisBackend(url)
+    if scheme == "sqlite":
+        return SQLiteBackend(Path(rest))
+    if scheme in ("disk", "file"):
+        return LocalDiskBackend(Path(rest))
+    raise ValueError(f"Unknown shared cache URL: {url!r} (known: sqlite://, redis://, disk://)")
+
+
+class SharedCache:
+    """
+    Druga warstwa cache nad katalogiem lokalnym: wersje danych (meta + plik danych + agregaty)
+    i PNG wykresów trafiają do backendu, a repliki pobierają je zamiast pytać BDL i renderować.
+    Meta jest zapisywane na końcu, więc widoczna wersja ma już komplet plików.
+    """
+
+    def __init__(self, backend: CacheBackend, ttl_s: float = 7 * 24 * 3600, prefix: str = "bdl:", lock_ttl_s: float = 900.0) -> None:
+        self.backend = backend
+        self.ttl_s = ttl_s
+        self.prefix = prefix
+        self.lock_ttl_s = lock_ttl_s
+        self._published_charts: set[str] = set()
+
+    def _name(self, *parts: str) -> str:
+        return self.prefix + ":".join(parts)
+
+    def publish(self, cache_dir: Path, key: str) -> None:
+        meta = read_meta(cache_dir, key)
+        if meta is None or not meta.data_file:
+            return
+        self.backend.set(self._name("data", key, meta.data_file), (cache_dir / meta.data_file).read_bytes(), self.ttl_s)
+        if meta.aggregates_file:
+            agg = (cache_dir / meta.aggregates_file).read_bytes()
+            self.backend.set(self._name("data", key, meta.aggregates_file), agg, self.ttl_s)
+        self.backend.set(self._name("meta", key), json.dumps(meta.__dict__).encode("utf-8"), self.ttl_s)
+
+    def pull(self, cache_dir: Path, key: str) -> bool:
+        """Pobiera wersję z backendu, jeśli jest nowsza niż lokalna. True = lokalny cache się zmienił."""
+        raw = self.backend.get(self._name("meta", key))
+        if raw is None:
+            return False
+        try:
+            remote = CacheMeta(**{k: v for k, v in json.loads(raw).items() if k in CacheMeta.__dataclass_fields__})
+            remote_at = datetime.fromisoformat(remote.created_at_iso)
+        except Exception:
+            return False
+        local = read_meta(cache_dir, key)
+        if local is not None:
+            if local.data_sha256 == remote.data_sha256:
+                return False
+            try:
+                if datetime.fromisoformat(local.created_at_iso) >= remote_at:
+                    return False
+            except ValueError:
+                pass
+        if not remote.data_file or remote.format not in FORMATS:
+            return False
+
+        data = self.backend.get(self._name("data", key, remote.data_file))
+        if data is None or (remote.data_sha256 and hashlib.sha256(data).hexdigest() != remote.data_sha256):
+            return False
+        agg = self.backend.get(self._name("data", key, remote.aggregates_file)) if remote.aggregates_file else None
+
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        atomic_write(cache_dir / remote.data_file, lambda p: p.write_bytes(data))
+        if agg is not None:
+            atomic_write(cache_dir / remote.aggregates_file, lambda p: p.write_bytes(agg))
+        else:
+            remote = CacheMeta(**{**remote.__dict__, "aggregates_file": None})
+        _write_meta(cache_dir, key, remote)
+        keep = {remote.data_file, remote.aggregates_file}
+        if local is not None:
+            keep |= {_stored_data_path(cache_dir, key, local).name, local.aggregates_file}
+        _prune_data_files(cache_dir, key, keep)
+        _notify_write(cache_dir, key)
+        log.info("Cache %s: pulled version %s from shared cache", key, remote.created_at_iso)
+        return True
+
+    @contextmanager
+    def lock(self, key: str, timeout_s: float = 300.0, poll_s: float = 0.5) -> Iterator[None]:
+        """Blokada odświeżania wspólna dla replik; TTL chroni przed blokadą padniętej repliki."""
+        name = self._name("lock", key)
+        token = uuid.uuid4().hex.encode("ascii")
+        deadline = time.monotonic() + max(timeout_s, 0.0)
+        try:
+            while not self.backend.add(name, token, self.lock_ttl_s):
+                if time.monotonic() >= deadline:
+                    raise CacheLockTimeout(f"Cache {key} is being refreshed by another replica")
+                time.sleep(poll_s)
+        except CacheLockTimeout:
+            raise
+        except Exception:
+            # backend niedostępny: odświeżamy bez blokady między replikami (lokalna nadal działa)
+            log.exception("Cache %s: shared refresh lock unavailable", key)
+            yield
+            return
+        stop = threading.Event()
+        heartbeat = threading.Thread(
+            target=self._heartbeat, args=(key, name, token, stop), name=f"shared-lock-{key}", daemon=True
+        )
+        heartbeat.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            heartbeat.join(timeout=5)
+            try:
+                self.backend.delete_if(name, token)
+            except Exception:
+                log.exception("Cache %s: failed to release shared refresh lock", key)
+
+    def _heartbeat(self, key: str, name: str, token: bytes, stop: threading.Event) -> None:
+        # odświeżenie dłuższe niż lock_ttl_s (wolne pobieranie gmin) nie może oddać blokady innej replice
+        while not stop.wait(self.lock_ttl_s / 3):
+            try:
+                if not self.backend.renew(name, token, self.lock_ttl_s):
+                    log.warning("Cache %s: shared refresh lock expired or was taken over", key)
+                    return
+            except Exception:
+                log.exception("Cache %s: failed to renew shared refresh lock", key)
+
+    def fetch_chart(self, path: Path) -> bool:
+        data = self.backend.get(self._name("chart", path.name))
+        if data is None:
+            return False
+        path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write(path, lambda p: p.write_bytes(data))
+        self._published_charts.add(path.name)
+        return True
+
+    def publish_chart(self, path: Path) -> None:
+        if path.name in self._published_charts or not path.exists():
+            return
+        self.backend.set(self._name("chart", path.name), path.read_bytes(), self.ttl_s)
+        self._published_charts.add(path.name)
+
+
+_shared: SharedCache | None = None
+
+
+def configure_shared_cache(
+    url: str | None,
+    ttl_s: float = 7 * 24 * 3600,
+    backend: CacheBackend | None = None,
+    lock_ttl_s: float = 900.0,
+) -> SharedCache | None:
+    """Włącza (albo wyłącza, gdy url pusty) wspólny cache dla całego procesu."""
+    global _shared
+    backend = backend or backend_from_url(url)
+    _shared = SharedCache(backend, ttl_s=ttl_s, lock_ttl_s=lock_ttl_s) if backend is not None else None
+    return _shared
+
+
+def shared_cache() -> SharedCache | None:
+    return _shared
+
+
+def pull_shared(cache_dir: Path, key: str) -> bool:
+    shared = _shared
+    if shared is None:
+        return False
+    try:
+        return shared.pull(cache_dir, key)
+    except Exception:
+        # wspólny cache to optymalizacja – jego awaria nie może zatrzymać dashboardu
+        log.exception("Cache %s: shared cache pull failed", key)
+        return False
@@ -0,0 +1,454 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import multiprocessing
+import os
+import re
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from importlib.metadata import version
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from .. import metrics
+from .cache import SharedCache, shared_cache
+
+# matplotlib i pandas ładują się przy pierwszym wykresie, nie przy imporcie modułu
+# (importują go trasy dashboardu, więc płaciłby za nie każdy start workera)
+if TYPE_CHECKING:
+    import pandas as pd
+    from matplotlib.figure import Figure
+
+log = logging.getLogger(__name__)
+
+FIGSIZE = (10, 5.5)
+
+# Kolory wykresów (jasne, czytelne, spójne z UI)
+COLOR_UNEMP = "#2563eb"   # blue-600
+COLOR_WAGE = "#f59e0b"    # amber-500
+COLOR_GRID = "#e2e8f0"    # slate-200
+COLOR_EDGE = "#cbd5e1"    # slate-300
+COLOR_TEXT = "#0f172a"    # slate-900
+FONT_SIZE = 11
+
+# Styl ustawiany jawnie na obiektach Figure/Axes – bez plt.rcParams i bez stanu pyplot,
+# więc renderowanie jest bezpieczne w wątkach i w procesach puli.
+GRID_KW = {"color": COLOR_GRID, "linewidth": 0.8, "alpha": 0.8}
+TEXT_KW = {"color": COLOR_TEXT, "fontsize": FONT_SIZE}
+
+# Wykresy są adresowane treścią: nazwa = rodzaj + hash(dane wejściowe + styl).
+# Zmiana stylu (kolory, rozmiar, wersja matplotlib) musi dawać nowe nazwy plików.
+_STYLE_KEY = repr(
+    (FIGSIZE, COLOR_UNEMP, COLOR_WAGE, COLOR_GRID, COLOR_EDGE, COLOR_TEXT, FONT_SIZE, GRID_KW, version("matplotlib"))
+)
+CHART_NAME_RE = re.compile(r"^[a-z_]+-[0-9a-f]{16}\.png$")
+
+# obrazek pokazywany, dopóki wykres renderuje się w tle (ścieżka względem /static)
+PENDING_CHART = "img/chart-pending.svg"
+
+# powyżej BAR_MAX_UNITS jednostek (powiaty, gminy) zamiast słupka na jednostkę:
+# BAR_TOP_N najwyższych wartości + histogram rozkładu w HIST_BINS przedziałach
+BAR_MAX_UNITS = 30
+BAR_TOP_N = 20
+HIST_BINS = 20
+
+# limity sprzątania katalogu z wykresami (najdawniej używane idą pierwsze)
+CHARTS_MAX_FILES = 64
+CHARTS_MAX_BYTES = 64 * 1024 * 1024
+
+
+def chart_path(charts_dir: Path, kind: str, frame: pd.DataFrame | None, *params: Any) -> Path:
+    h = hashlib.sha256()
+    h.update(kind.encode("utf-8"))
+    h.update(_STYLE_KEY.encode("utf-8"))
+    h.update(repr(params).encode("utf-8"))
+    if frame is not None:
+        h.update(repr(list(frame.columns)).encode("utf-8"))
+        if not frame.empty:
+            import pandas as pd
+
+            h.update(pd.util.hash_pandas_object(frame, index=False).to_numpy().tobytes())
+    return charts_dir / f"{kind}-{h.hexdigest()[:16]}.png"
+
+
+def _reuse(out_path: Path) -> bool:
+    # gotowy plik = ten sam wykres; odświeżamy mtime, bo po nim działa LRU w gc_charts
+    try:
+        os.utime(out_path)
+        return True
+    except FileNotFoundError:
+        return False
+
+
+def _save_png(fig: Figure, out_path: Path) -> None:
+    # zapis do pliku tymczasowego + rename: równoległe workery nigdy nie widzą połowy PNG
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out_path.with_name(f".{out_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    fig.savefig(tmp, format="png", facecolor="white")
+    os.replace(tmp, out_path)
+
+
+def gc_charts(
+    charts_dir: Path,
+    keep: set[str] | frozenset[str] = frozenset(),
+    max_files: int = CHARTS_MAX_FILES,
+    max_bytes: int = CHARTS_MAX_BYTES,
+) -> int:
+    """Usuwa najdawniej używane wykresy ponad limit liczby plików/rozmiaru. Zwraca liczbę usuniętych."""
+    files = []
+    for p in charts_dir.glob("*.png"):
+        if not CHART_NAME_RE.match(p.name):
+            continue
+        try:
+            st = p.stat()
+        except FileNotFoundError:
+            continue
+        files.append((st.st_mtime, st.st_size, p))
+    files.sort(reverse=True)
+
+    removed = 0
+    count = total = 0
+    for _, size, p in files:
+        count += 1
+        total += size
+        if p.name in keep or (count <= max_files and total <= max_bytes):
+            continue
+        p.unlink(missing_ok=True)
+        removed += 1
+    return removed
+
+
+def _new_figure() -> tuple[Figure, Any]:
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=FIGSIZE, facecolor="white")
+    ax = fig.add_subplot()
+    _style_axes(ax)
+    return fig, ax
+
+
+def _style_axes(ax: Any) -> None:
+    ax.set_facecolor("white")
+    for spine in ax.spines.values():
+        spine.set_edgecolor(COLOR_EDGE)
+    ax.tick_params(colors=COLOR_TEXT, labelsize=FONT_SIZE)
+
+
+def _plot_trend(
+    yearly: pd.DataFrame, out_path: Path, title: str = "Trend: bezrobocie i płace (średnia po województwach)"
+) -> str:
+    if _reuse(out_path):
+        return str(out_path)
+    if yearly.empty:
+        return _plot_empty(out_path, "Brak danych do trendu")
+
+    fig, ax1 = _new_figure()
+    x = yearly["year"].astype(int)
+
+    # lewa oś: bezrobocie
+    line1 = None
+    if yearly["unemployment_rate"].notna().any():
+        line1 = ax1.plot(
+            x,
+            yearly["unemployment_rate"],
+            color=COLOR_UNEMP,
+            linewidth=2.6,
+            marker="o",
+            markersize=5,
+            label="Bezrobocie (%)",
+        )[0]
+        ax1.set_ylabel("Bezrobocie (%)", **TEXT_KW)
+        ax1.grid(True, axis="y", **GRID_KW)
+
+    # prawa oś: płace
+    ax2 = ax1.twinx()
+    _style_axes(ax2)
+    line2 = None
+    if yearly["avg_wage"].notna().any():
+        line2 = ax2.plot(
+            x,
+            yearly["avg_wage"],
+            color=COLOR_WAGE,
+            linewidth=2.6,
+            marker="s",
+            markersize=5,
+            label="Płace (zł)",
+        )[0]
+        ax2.set_ylabel("Płace (zł)", **TEXT_KW)
+
+    ax1.set_xlabel("Rok", **TEXT_KW)
+    ax1.set_title(title, **TEXT_KW)
+
+    # legenda wspólna
+    handles = [h for h in [line1, line2] if h is not None]
+    if handles:
+        labels = [h.get_label() for h in handles]
+        ax1.legend(handles, labels, loc="upper left", frameon=True, framealpha=0.95, fontsize=FONT_SIZE)
+
+    # lepsza czytelność osi X
+    ax1.set_xticks(list(x))
+    for tick in ax1.get_xticklabels():
+        tick.set_rotation(0)
+    fig.tight_layout()
+
+    _save_png(fig, out_path)
+    return str(out_path)
+
+
+def _plot_bar(latest_unemp: pd.DataFrame, out_path: Path, year: int, title: str | None = None) -> str:
+    if _reuse(out_path):
+        return str(out_path)
+    if latest_unemp.empty:
+        return _plot_empty(out_path, "Brak danych do wykresu")
+
+    fig, ax = _new_figure()
+    d = latest_unemp.sort_values("unemployment_rate", ascending=True)
+    names = d["unitName"].astype(str)
+    labels = names.where(names.str.len() > 0, d["unitId"].astype(str))
+
+    # kolory per słupek (im wyższe bezrobocie, tym „cieplejszy” kolor)
+    import matplotlib
+    from matplotlib.colors import Normalize
+
+    vals = d["unemployment_rate"].astype(float)
+    norm = Normalize(vmin=float(vals.min()), vmax=float(vals.max())) if len(vals) else Normalize(vmin=0, vmax=1)
+    colors = matplotlib.colormaps["YlOrRd"](norm(vals))
+
+    bars = ax.barh(labels, vals, color=colors, edgecolor="white", linewidth=0.8)
+    ax.set_title(title or f"Stopa bezrobocia – województwa ({year})", **TEXT_KW)
+    ax.set_xlabel("Stopa bezrobocia (%)", **TEXT_KW)
+    ax.grid(True, axis="x", **GRID_KW)
+
+    # wartości na końcu słupków
+    for b in bars:
+        v = b.get_width()
+        ax.text(v + 0.05, b.get_y() + b.get_height() / 2, f"{v:.2f}%", va="center", fontsize=9, color=COLOR_TEXT)
+    fig.tight_layout()
+
+    _save_png(fig, out_path)
+    return str(out_path)
+
+
+def _plot_scatter(both: pd.DataFrame, out_path: Path, year: int) -> str:
+    if _reuse(out_path):
+        return str(out_path)
+    if both.empty:
+        return _plot_empty(out_path, "Brak danych do wykresu zależności")
+
+    fig, ax = _new_figure()
+    x = both["avg_wage"].astype(float)
+    y = both["unemployment_rate"].astype(float)
+
+    # kolor punktu = bezrobocie (czytelniej widać „gorące” regiony)
+    from matplotlib.colors import Normalize
+
+    norm = Normalize(vmin=float(y.min()), vmax=float(y.max())) if len(y) else Normalize(vmin=0, vmax=1)
+    # setki/tysiące punktów (powiaty, gminy) rysujemy mniejsze i półprzezroczyste
+    dense = len(both) > BAR_MAX_UNITS
+    sc = ax.scatter(
+        x,
+        y,
+        c=y,
+        cmap="viridis",
+        norm=norm,
+        s=14 if dense else 90,
+        alpha=0.6 if dense else 0.9,
+        edgecolors="none" if dense else "white",
+        linewidth=0.7,
+    )
+    ax.set_title(f"Zależność: wynagrodzenie vs bezrobocie ({year})", **TEXT_KW)
+    ax.set_xlabel("Przeciętne wynagrodzenie (zł)", **TEXT_KW)
+    ax.set_ylabel("Stopa bezrobocia (%)", **TEXT_KW)
+    ax.grid(True, **GRID_KW)
+
+    cbar = fig.colorbar(sc, ax=ax)
+    cbar.set_label("Bezrobocie (%)", **TEXT_KW)
+    cbar.ax.tick_params(colors=COLOR_TEXT, labelsize=FONT_SIZE)
+    fig.tight_layout()
+
+    _save_png(fig, out_path)
+    return str(out_path)
+
+
+def _plot_hist(values: pd.DataFrame, out_path: Path, year: int, title: str, bins: int = HIST_BINS) -> str:
+    if _reuse(out_path):
+        return str(out_path)
+    v = values["unemployment_rate"].dropna().astype(float)
+    if v.empty:
+        return _plot_empty(out_path, "Brak danych do histogramu")
+
+    fig, ax = _new_figure()
+    ax.hist(v, bins=bins, color=COLOR_UNEMP, edgecolor="white", linewidth=0.8)
+    ax.axvline(float(v.mean()), color=COLOR_WAGE, linewidth=2, label=f"średnia {v.mean():.2f}%")
+    ax.set_title(title, **TEXT_KW)
+    ax.set_xlabel("Stopa bezrobocia (%)", **TEXT_KW)
+    ax.set_ylabel("Liczba jednostek", **TEXT_KW)
+    ax.grid(True, axis="y", **GRID_KW)
+    ax.legend(loc="upper right", frameon=True, framealpha=0.95, fontsize=FONT_SIZE)
+    fig.tight_layout()
+
+    _save_png(fig, out_path)
+    return str(out_path)
+
+
+def _plot_empty(out_path: Path, message: str) -> str:
+    if _reuse(out_path):
+        return str(out_path)
+    fig, ax = _new_figure()
+    ax.text(0.5, 0.5, message, ha="center", va="center", wrap=True, fontsize=14, fontweight="bold", color=COLOR_TEXT)
+    ax.axis("off")
+    fig.tight_layout()
+    _save_png(fig, out_path)
+    return str(out_path)
+
+
+_PLOTTERS = {
+    "trend": _plot_trend,
+    "bar": _plot_bar,
+    "scatter": _plot_scatter,
+    "hist": _plot_hist,
+    "empty": _plot_empty,
+}
+
+
+def _render_job(plotter: str, args: tuple[Any, ...]) -> str:
+    # wołane w procesie puli – musi być funkcją modułu (pickle po nazwie);
+    # tam metryki są wyłączone, czas wykresu z puli mierzy _submit w procesie Flask
+    with metrics.stage(f"chart_{plotter}"):
+        return _PLOTTERS[plotter](*args)
+
+
+@dataclass(frozen=True)
+class ChartJob:
+    plotter: str
+    out_path: Path
+    args: tuple[Any, ...] = field(default=())
+
+    def call_args(self) -> tuple[Any, ...]:
+        # ścieżka wyjściowa jest zawsze pierwszym (empty) albo drugim argumentem plottera
+        if self.plotter == "empty":
+            return (self.out_path, *self.args)
+        return (self.args[0], self.out_path, *self.args[1:])
+
+
+def _fetch_shared(shared: SharedCache, out_path: Path) -> bool:
+    try:
+        return shared.fetch_chart(out_path)
+    except Exception:
+        log.exception("Shared cache chart fetch failed: %s", out_path.name)
+        return False
+
+
+def _publish_shared(shared: SharedCache | None, rendered: dict[str, str]) -> None:
+    if shared is None:
+        return
+    for path in rendered.values():
+        if path != PENDING_CHART:
+            try:
+                shared.publish_chart(Path(path))
+            except Exception:
+                log.exception("Shared cache chart publish failed: %s", path)
+
+
+class ChartRenderer:
+    """
+    Renderuje wykresy w puli procesów (mode="pool") albo w bieżącym wątku (mode="inline").
+
+    `render` czeka na wyniki najwyżej `wait_s` sekund; wykresy, które nie zdążyły,
+    dostają ścieżkę PENDING_CHART i dalej renderują się w tle (ten sam plik nie jest
+    zlecany dwa razy). Pula tworzona jest leniwie, już po forku workera gunicorna.
+    """
+
+    def __init__(self, mode: str = "inline", max_workers: int = 3, wait_s: float = 1.0) -> None:
+        self.mode = mode
+        self.max_workers = max(1, int(max_workers))
+        self.wait_s = wait_s
+        self._pool: ProcessPoolExecutor | None = None
+        self._pool_pid: int | None = None
+        self._pending: dict[Path, Future] = {}
+        self._lock = threading.Lock()
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None or self._pool_pid != os.getpid():
+            # spawn: bez dziedziczenia wątków/locków procesu Flask
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn")
+            )
+            self._pool_pid = os.getpid()
+            self._pending.clear()
+        return self._pool
+
+    def _submit(self, job: ChartJob) -> Future:
+        with self._lock:
+            fut = self._pending.get(job.out_path)
+            if fut is None:
+                fut = self._executor().submit(_render_job, job.plotter, job.call_args())
+                self._pending[job.out_path] = fut
+                fut.add_done_callback(
+                    lambda f, p=job.out_path, name=job.plotter, t=time.perf_counter(): self._forget(p, f, name, t)
+                )
+            return fut
+
+    def _forget(self, out_path: Path, fut: Future, plotter: str, submitted: float) -> None:
+        # z kolejką puli włącznie; callback nie biegnie w wątku zapytania, więc bez Server-Timing
+        metrics.observe(metrics.STAGE_METRIC, time.perf_counter() - submitted, stage=f"chart_{plotter}")
+        with self._lock:
+            if self._pending.get(out_path) is fut:
+                del self._pending[out_path]
+
+    def render(self, jobs: dict[str, ChartJob], wait_s: float | None = None) -> dict[str, str]:
+        """Zwraca {nazwa: ścieżka pliku PNG albo PENDING_CHART}."""
+        shared = shared_cache()
+        out: dict[str, str] = {}
+        todo: dict[str, ChartJob] = {}
+        for name, job in jobs.items():
+            # PNG wyrenderowany już przez inną replikę: pobieramy zamiast rysować
+            if _reuse(job.out_path) or (shared is not None and _fetch_shared(shared, job.out_path)):
+                out[name] = str(job.out_path)
+            else:
+                todo[name] = job
+
+        if self.mode != "pool":
+            for name, job in todo.items():
+                out[name] = _render_job(job.plotter, job.call_args())
+            _publish_shared(shared, out)
+            return out
+
+        futures = {name: self._submit(job) for name, job in todo.items()}
+        wait(futures.values(), timeout=self.wait_s if wait_s is None else wait_s)
+        for name, fut in futures.items():
+            if not fut.done():
+                out[name] = PENDING_CHART
+                continue
+            try:
+                out[name] = fut.result()
+            except Exception:
+                # awaria w puli (np. zabity proces) nie może zostawić dziury w dashboardzie
+                log.exception("Chart rendering in pool failed, rendering inline: %s", todo[name].out_path)
+                out[name] = _render_job(todo[name].plotter, todo[name].call_args())
+        _publish_shared(shared, out)
+        return out
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._pool is not None and self._pool_pid == os.getpid():
+                self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+            self._pending.clear()
+
+
+_renderer = ChartRenderer()
+
+
+def get_renderer() -> ChartRenderer:
+    return _renderer
+
+
+def configure_renderer(mode: str = "inline", max_workers: int = 3, wait_s: float = 1.0) -> ChartRenderer:
+    global _renderer
+    _renderer.shutdown()
+    _renderer = ChartRenderer(mode=mode, max_workers=max_workers, wait_s=wait_s)
+    return _renderer
@@ -0,0 +1,44 @@
+"""
+Opis zbioru bez ciężkich zależności (pandas, klient BDL): klucz cache, domyślne opcje
+i wersja układu agregatów. Czytają go dashboard i /health, zanim cokolwiek trzeba liczyć.
+"""
+from __future__ import annotations
+
+import hashlib
+from typing import Any
+
+from .indicators import CORE_INDICATORS, select_indicators
+
+# wersja układu pliku agregatów; zmiana = stare pliki są ignorowane i liczone od nowa
+AGGREGATES_SCHEMA = 1
+
+CACHE_KEY = "bdl_labour_market_v2"  # nowy klucz -> nie miesza się ze starym cache
+
+# zakres lat i polityka odświeżania partycji (nadpisywane przez dataset_options)
+DEFAULT_DATASET_OPTIONS: dict[str, Any] = {
+    "unit_level": 2,
+    # poniżej tego poziomu dane idą kawałkami po unit-parent-id (jednostki tego poziomu)
+    "chunk_parent_level": 2,
+    "start_year": 2015,
+    "mutable_years": 2,  # ostatnie lata z danymi, które BDL jeszcze koryguje
+    "partition_max_age_days": 0,  # 0 = historyczne partycje nie wygasają
+    "variable_ttl_days": 30,  # jak długo ufamy zapamiętanemu id zmiennej
+    "variable_overrides": {},  # {metryka: id zmiennej} – pomija wyszukiwanie
+    "indicators": CORE_INDICATORS,  # nazwy z rejestru (indicators.py) albo obiekty Indicator
+    "batch_strategy": "auto",  # auto | by-variable | by-unit
+    "max_vars_per_call": 20,  # ile var-id niesie jedno zapytanie /data/by-unit
+}
+
+
+def dataset_key(dataset_options: dict[str, Any] | None = None) -> str:
+    """
+    Klucz cache dla poziomu jednostek; województwa zostają pod dotychczasowym CACHE_KEY.
+    Zestaw wskaźników inny niż podstawowy dostaje własny klucz (inne kolumny zbioru).
+    """
+    options = dataset_options or {}
+    level = int(options.get("unit_level", DEFAULT_DATASET_OPTIONS["unit_level"]))
+    key = CACHE_KEY if level == 2 else f"{CACHE_KEY}_level{level}"
+    columns = tuple(ind.column for ind in select_indicators(options.get("indicators")))
+    if columns != CORE_INDICATORS:
+        key += "_" + hashlib.sha1(",".join(columns).encode("utf-8")).hexdigest()[:8]
+    return key
@@ -0,0 +1,109 @@
+"""
+Rejestr wskaźników zbioru: każdy wpis to fraza wyszukiwania BDL, filtry wyboru zmiennej
+(jednostka miary, nazwa) i kolumna, do której trafiają wartości.
+
+    BDL_INDICATORS=unemployment_rate,avg_wage,job_offers
+    BDL_INDICATOR_DEFS='[{"column": "firms", "phrase": "podmioty gospodarki narodowej", "name": ["podmioty"]}]'
+
+Dashboard liczy się z dwóch wskaźników podstawowych (CORE_INDICATORS) – są w zbiorze
+zawsze; pozostałe są dokładane jako kolejne kolumny cache i eksportów.
+"""
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+from typing import Any, Iterable, Mapping
+
+# warianty zmiennych, których nie chcemy: indeksy i dynamiki zamiast wartości
+REJECT_DERIVED = ("dynamika", "indeks", "rok poprzedni", "2015=100", "100=rok")
+
+
+@dataclass(frozen=True)
+class Indicator:
+    column: str
+    phrase: str
+    must_unit_contains_any: tuple[str, ...] = ()
+    must_name_contains_any: tuple[str, ...] = ()
+    reject_name_contains_any: tuple[str, ...] = REJECT_DERIVED
+
+    def query(self) -> dict[str, Any]:
+        """Argumenty wyboru zmiennej (fraza + filtry), jak w _pick_variable_strict."""
+        return {
+            "phrase": self.phrase,
+            "must_unit_contains_any": list(self.must_unit_contains_any),
+            "must_name_contains_any": list(self.must_name_contains_any),
+            "reject_name_contains_any": list(self.reject_name_contains_any),
+        }
+
+
+INDICATORS: dict[str, Indicator] = {
+    # bezrobocie – chcemy % i „stopa bezrobocia”
+    "unemployment_rate": Indicator(
+        "unemployment_rate", "stopa bezrobocia rejestrowanego", ("%",), ("bezrobocia", "stopa")
+    ),
+    # płace – chcemy zł/PLN i „wynagrodzenie”
+    "avg_wage": Indicator(
+        "avg_wage", "przeciętne miesięczne wynagrodzenia brutto", ("zł", "pln"), ("wynagrod", "miesięcz")
+    ),
+    "job_offers": Indicator("job_offers", "oferty pracy", (), ("oferty",)),
+    "employed_per_1000": Indicator("employed_per_1000", "pracujący na 1000 ludności", (), ("pracujący",)),
+}
+
+CORE_INDICATORS = ("unemployment_rate", "avg_wage")
+
+
+def _strings(v: Any) -> tuple[str, ...]:
+    if v is None:
+        return ()
+    if isinstance(v, str):
+        return (v,)
+    return tuple(str(x) for x in v)
+
+
+def parse_indicator_defs(raw: str | Iterable[Mapping[str, Any]] | None) -> dict[str, Indicator]:
+    """
+    Własne wskaźniki z JSON: lista obiektów {column, phrase, unit?, name?, reject?}
+    (filtry jako napis albo lista napisów) -> {kolumna: Indicator}.
+    """
+    if not raw:
+        return {}
+    items = json.loads(raw) if isinstance(raw, str) else raw
+    out = {}
+    for item in items:
+        try:
+            column, phrase = str(item["column"]).strip(), str(item["phrase"]).strip()
+        except (KeyError, TypeError) as e:
+            raise ValueError(f"Indicator definition needs 'column' and 'phrase': {item!r}") from e
+        if not column or not phrase:
+            raise ValueError(f"Indicator definition needs 'column' and 'phrase': {item!r}")
+        out[column] = Indicator(
+            column,
+            phrase,
+            _strings(item.get("unit")),
+            _strings(item.get("name")),
+            _strings(item["reject"]) if "reject" in item else REJECT_DERIVED,
+        )
+    return out
+
+
+def select_indicators(
+    names: str | Iterable[str | Indicator] | None = None,
+    defs: str | Iterable[Mapping[str, Any]] | None = None,
+) -> tuple[Indicator, ...]:
+    """
+    Wskaźniki zbioru w kolejności kolumn: podstawowe, potem wybrane (`names` – nazwy z rejestru,
+    z `defs` albo gotowe obiekty Indicator). Duplikaty kolumn są pomijane.
+    """
+    registry = {**INDICATORS, **parse_indicator_defs(defs)}
+    if isinstance(names, str):
+        names = [n.strip() for n in names.split(",") if n.strip()]
+    out: dict[str, Indicator] = {}
+    for item in (*CORE_INDICATORS, *(names or ())):
+        if isinstance(item, Indicator):
+            out.setdefault(item.column, item)
+            continue
+        indicator = registry.get(item)
+        if indicator is None:
+            raise ValueError(f"Unknown indicator '{item}' (known: {', '.join(sorted(registry))})")
+        out.setdefault(indicator.column, indicator)
+    return tuple(out.values())
@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+import math
+import time
+from array import array
+from typing import Any, AsyncIterable, Iterable, Mapping
+
+import numpy as np
+import pandas as pd
+
+from .. import metrics
+
+# nazwy pól jednostki w obu formatach BDL (pierwsza obecna wygrywa)
+_ID_KEYS = ("unitId", "unit_id", "id")
+_NAME_KEYS = ("unitName", "unit_name", "name")
+
+
+def _empty(metric: str) -> pd.DataFrame:
+    return pd.DataFrame(columns=["year", "unitId", "unitName", metric])
+
+
+def _number(v: Any) -> float:
+    """Liczba z wartości BDL: int/float wprost, tekst po usunięciu spacji i z przecinkiem dziesiętnym."""
+    if isinstance(v, bool) or v is None:
+        return math.nan
+    if isinstance(v, (int, float)):
+        return float(v)
+    if isinstance(v, str):
+        try:
+            return float(v.replace(" ", "").replace(",", "."))
+        except ValueError:
+            return math.nan
+    return math.nan
+
+
+def _text(row: Mapping[str, Any], keys: tuple[str, ...]) -> str:
+    for k in keys:
+        if k in row:
+            v = row[k]
+            if v is None:
+                return ""
+            s = v if isinstance(v, str) else str(v)
+            return "" if s == "nan" else s.strip()
+    return ""
+
+
+class _Columns:
+    """Typowane bufory kolumn (array: int64/float64) + słownik jednostek zamiast napisu na wiersz."""
+
+    def __init__(self) -> None:
+        self.year = array("q")
+        self.value = array("d")
+        self.unit = array("q")
+        self.units: dict[tuple[str, str], int] = {}
+
+    def unit_code(self, unit_id: str, unit_name: str) -> int:
+        key = (unit_id, unit_name)
+        code = self.units.get(key)
+        if code is None:
+            code = self.units[key] = len(self.units)
+        return code
+
+    def append(self, unit: int, entry: Mapping[str, Any]) -> None:
+        year = _number(entry.get("year"))
+        if math.isnan(year) or not year.is_integer():
+            return  # wiersz bez roku nie ma sensu (jak dropna(subset=["year"]))
+        self.year.append(int(year))
+        self.value.append(_number(entry.get("val")))
+        self.unit.append(unit)
+
+    def feed(self, page: Iterable[Mapping[str, Any]]) -> float:
+        """Dopisuje wiersze strony; zwraca czas własnej pracy (do metryki „normalize”)."""
+        started = time.perf_counter()
+        for row in page:
+            if not isinstance(row, Mapping):
+                continue
+            if "year" in row and "val" in row:
+                entries: Iterable[Any] = (row,)
+            else:
+                entries = row.get("values") or ()
+            unit = None
+            for entry in entries:
+                if not isinstance(entry, Mapping):
+                    continue
+                if unit is None:
+                    unit = self.unit_code(_text(row, _ID_KEYS), _text(row, _NAME_KEYS))
+                self.append(unit, entry)
+        return time.perf_counter() - started
+
+    def finish(self, metric: str, busy_s: float) -> pd.DataFrame:
+        started = time.perf_counter()
+        frame = self.frame(metric)
+        metrics.record_stage("normalize", busy_s + time.perf_counter() - started)
+        return frame
+
+    def frame(self, metric: str) -> pd.DataFrame:
+        if not self.year:
+            return _empty(metric)
+        ids = np.empty(len(self.units), dtype=object)
+        names = np.empty(len(self.units), dtype=object)
+        for (unit_id, unit_name), code in self.units.items():
+            ids[code], names[code] = unit_id, unit_name
+        codes = np.frombuffer(self.unit, dtype=np.int64)
+        return pd.DataFrame(
+            {
+                "year": pd.array(np.frombuffer(self.year, dtype=np.int64), dtype="Int64"),
+                "unitId": ids[codes],
+                "unitName": names[codes],
+                metric: np.frombuffer(self.value, dtype=np.float64),
+            }
+        )
+
+
+def normalize_pages(pages: Iterable[Iterable[Mapping[str, Any]]], metric: str) -> pd.DataFrame:
+    """
+    Strony wyników BDL -> ramka (year Int64, unitId, unitName, metric float64).
+
+    Obsługuje dwa formaty, które realnie pojawiają się w BDL:
+    A) płaski: { unitId, unitName, year, val }
+    B) zagnieżdżony: { id/unitId, name/unitName, values: [{year,val}, ...] }
+
+    Strony są konsumowane po kolei (np. prosto z generatora klienta), a wiersze trafiają
+    od razu do typowanych buforów – w pamięci nie ma naraz surowego JSON wszystkich stron,
+    ramki pośredniej ani kolumn tekstowych z wartościami.
+
+    Etap „normalize” w metrykach liczy tylko własną pracę, bez czekania na kolejne strony z BDL.
+    """
+    cols = _Columns()
+    busy = 0.0
+    for page in pages:
+        busy += cols.feed(page)
+    return cols.finish(metric, busy)
+
+
+async def normalize_pages_async(pages: AsyncIterable[Iterable[Mapping[str, Any]]], metric: str) -> pd.DataFrame:
+    """normalize_pages dla async generatora stron (AsyncBDLClient) – te same bufory i wynik."""
+    cols = _Columns()
+    busy = 0.0
+    async for page in pages:
+        busy += cols.feed(page)
+    return cols.finish(metric, busy)
+
+
+class _UnitColumns:
+    """Bufory per zmienna dla stron /data/by-unit: {unitId, unitName, results: [{id: zmienna, values}]}."""
+
+    def __init__(self, var_ids: Iterable[int]) -> None:
+        self.columns = {int(v): _Columns() for v in var_ids}
+
+    def feed(self, page: Mapping[str, Any]) -> float:
+        started = time.perf_counter()
+        unit_id, unit_name = _text(page, _ID_KEYS), _text(page, _NAME_KEYS)
+        for row in page.get("results") or ():
+            if not isinstance(row, Mapping):
+                continue
+            var_id = _number(row.get("id"))
+            cols = self.columns.get(int(var_id)) if var_id.is_integer() else None
+            if cols is None:
+                continue
+            unit = None
+            for entry in row.get("values") or ():
+                if not isinstance(entry, Mapping):
+                    continue
+                if unit is None:
+                    unit = cols.unit_code(unit_id, unit_name)
+                cols.append(unit, entry)
+        return time.perf_counter() - started
+
+    def finish(self, metric: str, busy_s: float) -> dict[int, pd.DataFrame]:
+        started = time.perf_counter()
+        frames = {var_id: cols.frame(metric) for var_id, cols in self.columns.items()}
+        metrics.record_stage("normalize", busy_s + time.perf_counter() - started)
+        return frames
+
+
+def normalize_unit_pages(
+    pages: Iterable[Mapping[str, Any]], var_ids: Iterable[int], metric: str = "value"
+) -> dict[int, pd.DataFrame]:
+    """
+    Strony /data/by-unit (kilka zmiennych w jednej odpowiedzi) -> {id zmiennej: ramka jak
+    z normalize_pages}. Zmienne spoza `var_ids` są pomijane; brak danych daje pustą ramkę.
+    """
+    cols = _UnitColumns(var_ids)
+    busy = 0.0
+    for page in pages:
+        busy += cols.feed(page)
+    return cols.finish(metric, busy)
+
+
+async def normalize_unit_pages_async(
+    pages: AsyncIterable[Mapping[str, Any]], var_ids: Iterable[int], metric: str = "value"
+) -> dict[int, pd.DataFrame]:
+    cols = _UnitColumns(var_ids)
+    busy = 0.0
+    async for page in pages:
+        busy += cols.feed(page)
+    return cols.finish(metric, busy)
@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import json
+import threading
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Iterable
+
+import pandas as pd
+
+from .cache import FORMATS, HAS_PYARROW, atomic_write, apply_schema, resolve_format
+
+
+@dataclass(frozen=True)
+class PartitionInfo:
+    fetched_at_iso: str
+    rows: int
+    format: str = "csv.gz"
+
+
+class PartitionStore:
+    """
+    Dane BDL podzielone na partycje (zmienna, rok) z czasem pobrania każdej z nich.
+
+    Historyczne lata w BDL praktycznie się nie zmieniają, więc odświeżenie pobiera tylko
+    lata brakujące i te z „okna zmienności” (ostatnie `mutable_years` lat z danymi
+    oraz wszystko później), a zbiór składa z partycji zapisanych wcześniej.
+
+    Układ: <root>/<metric>/<var_id>/<rok>.<suffix> + manifest.json.
+    """
+
+    def __init__(self, root: Path, fmt: str | None = None) -> None:
+        self.root = root
+        self.fmt = resolve_format(fmt)
+        self._lock = threading.Lock()
+
+    def _dir(self, metric: str, var_id: int | str) -> Path:
+        return self.root / metric / str(var_id)
+
+    def _manifest_path(self, metric: str, var_id: int | str) -> Path:
+        return self._dir(metric, var_id) / "manifest.json"
+
+    def manifest(self, metric: str, var_id: int | str) -> dict[int, PartitionInfo]:
+        mp = self._manifest_path(metric, var_id)
+        if not mp.exists():
+            return {}
+        try:
+            raw = json.loads(mp.read_text(encoding="utf-8"))
+            return {int(y): PartitionInfo(**info) for y, info in raw.items()}
+        except Exception:
+            return {}
+
+    def _readable(self, metric: str, var_id: int | str, year: int, info: PartitionInfo) -> bool:
+        if info.rows == 0:
+            return True
+        fmt = FORMATS.get(info.format)
+        if fmt is None or (fmt.requires_pyarrow and not HAS_PYARROW):
+            return False
+        return (self._dir(metric, var_id) / f"{year}.{fmt.suffix}").exists()
+
+    def plan(
+        self,
+        metric: str,
+        var_id: int | str,
+        years: Iterable[int],
+        mutable_years: int = 2,
+        max_age_days: float = 0,
+        now: datetime | None = None,
+    ) -> list[int]:
+        """
+        Lata do pobrania: brakujące, nieczytelne, z okna zmienności oraz – gdy max_age_days > 0 –
+        partycje pobrane dawniej niż max_age_days temu.
+        """
+        years = sorted(set(int(y) for y in years))
+        known = self.manifest(metric, var_id)
+        with_data = [y for y, info in known.items() if info.rows > 0 and y in years]
+        # okno liczymy od ostatniego roku z danymi: bieżący rok zwykle jest jeszcze pusty
+        cutoff = (max(with_data) - max(mutable_years, 0) + 1) if with_data else min(years, default=0)
+        now = now or datetime.now(timezone.utc)
+
+        todo = []
+        for y in years:
+            info = known.get(y)
+            if info is None or y >= cutoff or not self._readable(metric, var_id, y, info):
+                todo.append(y)
+            elif max_age_days > 0:
+                fetched = datetime.fromisoformat(info.fetched_at_iso).astimezone(timezone.utc)
+                if now - fetched > timedelta(days=max_age_days):
+                    todo.append(y)
+        return todo
+
+    def write(self, metric: str, var_id: int | str, years: Iterable[int], df: pd.DataFrame) -> None:
+        """Zapisuje pobrane lata (także puste – żeby nie pytać o nie ponownie) i aktualizuje manifest."""
+        d = self._dir(metric, var_id)
+        d.mkdir(parents=True, exist_ok=True)
+        fetched_at = datetime.now(timezone.utc).isoformat()
+        year_col = pd.to_numeric(df["year"], errors="coerce") if "year" in df.columns else pd.Series(dtype=float)
+
+        with self._lock:
+            known = self.manifest(metric, var_id)
+            for y in years:
+                part = df[year_col == y]
+                path = d / f"{y}.{self.fmt.suffix}"
+                if part.empty:
+                    path.unlink(missing_ok=True)
+                else:
+                    atomic_write(path, lambda p, part=part: self.fmt.write(apply_schema(part.reset_index(drop=True)), p))
+                known[int(y)] = PartitionInfo(fetched_at_iso=fetched_at, rows=len(part), format=self.fmt.name)
+
+            payload = json.dumps({str(y): asdict(info) for y, info in sorted(known.items())}, indent=2)
+            atomic_write(self._manifest_path(metric, var_id), lambda p: p.write_text(payload, encoding="utf-8"))
+
+    def assemble(self, metric: str, var_id: int | str, years: Iterable[int]) -> pd.DataFrame:
+        """Skleja partycje wybranych lat w jedną ramkę w układzie _normalize (year, unitId, unitName, metric)."""
+        known = self.manifest(metric, var_id)
+        frames = []
+        for y in sorted(set(int(y) for y in years)):
+            info = known.get(y)
+            if info is None or info.rows == 0:
+                continue
+            fmt = FORMATS[info.format]
+            frames.append(fmt.read(self._dir(metric, var_id) / f"{y}.{fmt.suffix}"))
+
+        if not frames:
+            return pd.DataFrame(columns=["year", "unitId", "unitName", metric])
+
+        out = pd.concat(frames, ignore_index=True)
+        out["year"] = out["year"].astype("Int64")
+        # kategorie z różnych partycji się nie zgadzają – do złączenia wracamy do str
+        for col in ("unitId", "unitName"):
+            out[col] = out[col].astype(str)
+        return out[["year", "unitId", "unitName", metric]]
@@ -1,15 +1,48 @@
 from __future__ import annotations
 
+import asyncio
+import concurrent.futures
+import functools
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import aclosing
+from dataclasses import dataclass
 from datetime import date
 from pathlib import Path
-from typing import Any, Iterable
+from typing import Any, Awaitable, Callable, Iterable
 
 import pandas as pd
 
-from .bdl_client import BDLClient, BDLVariable
-from .cache import is_cache_fresh, save_cache, load_cache
-
-CACHE_KEY = "bdl_labour_market_v2"  # nowy klucz -> nie miesza się ze starym cache
+from .. import metrics
+from .analysis import build_aggregates
+from .bdl_async import AsyncBDLClient
+from .bdl_client import BDLClient, BDLClientError, BDLVariable, best_variable
+from .dataset import CACHE_KEY, DEFAULT_DATASET_OPTIONS, dataset_key  # noqa: F401 (re-eksport)
+from .indicators import Indicator, select_indicators
+from .normalize import normalize_pages, normalize_pages_async, normalize_unit_pages, normalize_unit_pages_async
+from .partitions import PartitionStore
+from .variables import VariableStore, parse_overrides, resolution_key
+from .units import UNIT_LEVELS, UnitLevel, unit_level_labels  # noqa: F401 (re-eksport)
+from .cache import (
+    CacheLockTimeout,
+    cache_fingerprint,
+    is_cache_fresh,
+    load_cache,
+    pull_shared,
+    save_cache,
+    single_flight,
+)
+
+log = logging.getLogger(__name__)
+
+DATASET_KEYS = ["year", "unitId", "unitName"]
+
+# przybliżona liczba jednostek na poziomie w BDL – tylko do wyboru sposobu pobierania
+APPROX_UNITS = {2: 16, 5: 380, 6: 2477}
+PAGE_SIZE = 100
+# ile zmiennych pobieramy naraz w trybie by-variable (każda ma jeszcze własne strony w locie)
+MAX_PARALLEL_VARIABLES = 8
 
 
 def _years_range(start: int = 2015, end: int | None = None) -> list[int]:
@@ -17,15 +50,13 @@ def _years_range(start: int = 2015, end: int | None = None) -> list[int]:
     return list(range(start, end_year + 1))
 
 
-def _pick_variable_strict(
-    client: BDLClient,
+def _strict_candidate(
+    candidates: list[BDLVariable],
     phrase: str,
     must_unit_contains_any: list[str],
     must_name_contains_any: list[str],
     reject_name_contains_any: list[str],
-) -> BDLVariable:
-    candidates = client.search_variables(phrase, page_size=100)
-
+) -> BDLVariable | None:
     def ok(v: BDLVariable) -> bool:
         name = (v.name or "").lower()
         unit = (v.measure_unit or "").lower()
@@ -45,17 +76,66 @@ def _pick_variable_strict(
         return True
 
     filtered = [v for v in candidates if ok(v)]
-    if filtered:
-        # prefer niższy level (woj/typ danych), a potem „ładniejsze” dopasowanie nazwy
-        def score(v: BDLVariable) -> tuple[int, int]:
-            level_score = 0 if v.level is None else max(0, 10 - int(v.level))
-            name_score = 1 if phrase.lower() in (v.name or "").lower() else 0
-            return (level_score, name_score)
+    if not filtered:
+        return None
+
+    # prefer niższy level (woj/typ danych), a potem „ładniejsze” dopasowanie nazwy
+    def score(v: BDLVariable) -> tuple[int, int]:
+        level_score = 0 if v.level is None else max(0, 10 - int(v.level))
+        name_score = 1 if phrase.lower() in (v.name or "").lower() else 0
+        return (level_score, name_score)
+
+    return sorted(filtered, key=score, reverse=True)[0]
+
+
+def _pick_variable_strict(
+    search: Callable[[str], list[BDLVariable]],
+    phrase: str,
+    must_unit_contains_any: list[str],
+    must_name_contains_any: list[str],
+    reject_name_contains_any: list[str],
+) -> BDLVariable:
+    candidates = search(phrase)
+    best = _strict_candidate(
+        candidates, phrase, must_unit_contains_any, must_name_contains_any, reject_name_contains_any
+    )
+    if best is not None:
+        return best
+
+    # fallback: stara logika (jak nic nie spełni filtrów) – na tych samych kandydatach
+    return best_variable(
+        candidates, phrase, prefer_unit_contains=must_unit_contains_any[0] if must_unit_contains_any else None
+    )
 
-        return sorted(filtered, key=score, reverse=True)[0]
 
-    # fallback: stara logika (jak nic nie spełni filtrów)
-    return client.pick_best_variable(phrase, prefer_unit_contains=must_unit_contains_any[0] if must_unit_contains_any else None)
+def _lookup_cached(
+    cache_dir: Path, key: str, max_age_hours: int, cache_format: str | None
+) -> tuple[pd.DataFrame | None, pd.DataFrame | None]:
+    """(świeży cache, nieświeży cache) – najwyżej jedno z nich nie jest None."""
+    if is_cache_fresh(cache_dir, key, max_age_hours):
+        cached = _load_cached(cache_dir, cache_format, key)
+        if cached is not None:
+            metrics.inc("dataset_cache_lookups_total", result="hit")
+            return cached, None
+
+    # inna replika mogła już odświeżyć – nowsza wersja ze wspólnego cache zamiast BDL
+    if pull_shared(cache_dir, key) and is_cache_fresh(cache_dir, key, max_age_hours):
+        cached = _load_cached(cache_dir, cache_format, key)
+        if cached is not None:
+            metrics.inc("dataset_cache_lookups_total", result="shared")
+            return cached, None
+
+    return None, _load_cached(cache_dir, cache_format, key)
+
+
+def _can_serve_stale(stale: pd.DataFrame | None, cache_dir: Path, error: Exception) -> bool:
+    if stale is None:
+        return False
+    if isinstance(error, CacheLockTimeout):
+        log.info("BDL refresh already running in another process, serving stale cache")
+    else:
+        log.warning("BDL refresh failed, serving stale cache from %s", cache_dir, exc_info=error)
+    return True
 
 
 def load_or_refresh_dataset(
@@ -63,116 +143,521 @@ def load_or_refresh_dataset(
     max_age_hours: int,
     bdl_client_id: str | None,
     bdl_base_url: str,
+    bdl_options: dict[str, Any] | None = None,
+    cache_format: str | None = None,
+    revalidate: Callable[[], Any] | None = None,
+    lock_timeout_s: float = 300.0,
+    dataset_options: dict[str, Any] | None = None,
+) -> pd.DataFrame:
+    """
+    Dane z cache albo (gdy cache nieświeży) z BDL.
+
+    Z `revalidate` działa jak stale-while-revalidate: nieświeży, ale istniejący cache
+    jest zwracany od razu, a `revalidate()` zleca odświeżenie w tle. Bez niego odświeżamy
+    synchronicznie, a gdy BDL nie odpowiada – i tak oddajemy stary cache, jeśli jest.
+
+    Odświeża naraz tylko jeden proces (blokada plikowa). Pozostali dostają stary cache,
+    a gdy go nie ma – czekają na blokadę do `lock_timeout_s` i czytają świeży zapis.
+    """
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    key = dataset_key(dataset_options)
+
+    fresh, stale = _lookup_cached(cache_dir, key, max_age_hours, cache_format)
+    if fresh is not None:
+        return fresh
+    if stale is not None and revalidate is not None:
+        metrics.inc("dataset_cache_lookups_total", result="stale")
+        revalidate()
+        return stale
+
+    metrics.inc("dataset_cache_lookups_total", result="refresh")
+    try:
+        return refresh_dataset(
+            cache_dir,
+            bdl_client_id,
+            bdl_base_url,
+            bdl_options,
+            cache_format,
+            lock_timeout_s=0.0 if stale is not None else lock_timeout_s,
+            dataset_options=dataset_options,
+        )
+    except (CacheLockTimeout, BDLClientError) as e:
+        if _can_serve_stale(stale, cache_dir, e):
+            return stale
+        raise
+
+
+async def load_or_refresh_dataset_async(
+    cache_dir: Path,
+    max_age_hours: int,
+    bdl_client_id: str | None,
+    bdl_base_url: str,
+    bdl_options: dict[str, Any] | None = None,
+    cache_format: str | None = None,
+    lock_timeout_s: float = 300.0,
+    dataset_options: dict[str, Any] | None = None,
+    timeout_s: float | None = None,
+    max_concurrency: int | None = None,
 ) -> pd.DataFrame:
+    """
+    load_or_refresh_dataset dla asyncio: odczyty cache idą w wątku, odświeżenie przez
+    AsyncBDLClient (refresh_dataset_async). `timeout_s` ogranicza całe pobieranie z BDL –
+    po jego przekroczeniu, jak przy błędzie BDL, dostajemy stary cache, jeśli jest.
+    """
     cache_dir.mkdir(parents=True, exist_ok=True)
+    key = dataset_key(dataset_options)
+
+    fresh, stale = await asyncio.to_thread(_lookup_cached, cache_dir, key, max_age_hours, cache_format)
+    if fresh is not None:
+        return fresh
+
+    metrics.inc("dataset_cache_lookups_total", result="refresh")
+    try:
+        return await refresh_dataset_async(
+            cache_dir,
+            bdl_client_id,
+            bdl_base_url,
+            bdl_options,
+            cache_format,
+            lock_timeout_s=0.0 if stale is not None else lock_timeout_s,
+            dataset_options=dataset_options,
+            timeout_s=timeout_s,
+            max_concurrency=max_concurrency,
+        )
+    except (CacheLockTimeout, BDLClientError) as e:
+        if _can_serve_stale(stale, cache_dir, e):
+            return stale
+        raise
 
-    if is_cache_fresh(cache_dir, CACHE_KEY, max_age_hours):
-        cached = load_cache(cache_dir, CACHE_KEY)
-        if isinstance(cached, pd.DataFrame) and not cached.empty:
-            return cached
 
-    client = BDLClient(base_url=bdl_base_url, client_id=bdl_client_id)
+def _load_cached(cache_dir: Path, cache_format: str | None, key: str = CACHE_KEY) -> pd.DataFrame | None:
+    if cache_fingerprint(cache_dir, key) is None:
+        return None
+    try:
+        cached = load_cache(cache_dir, key, fmt=cache_format)
+    except Exception:
+        log.warning("Unreadable cache in %s, ignoring it", cache_dir, exc_info=True)
+        return None
+    return cached if isinstance(cached, pd.DataFrame) and not cached.empty else None
 
-    # 1) Bezrobocie – chcemy % i „stopa bezrobocia”
-    v_unemp = _pick_variable_strict(
-        client=client,
-        phrase="stopa bezrobocia rejestrowanego",
-        must_unit_contains_any=["%"],
-        must_name_contains_any=["bezrobocia", "stopa"],
-        reject_name_contains_any=["dynamika", "indeks", "rok poprzedni", "2015=100", "100=rok"],
-    )
 
-    # 2) Płace – chcemy zł/PLN i „wynagrodzenie”
-    v_wages = _pick_variable_strict(
-        client=client,
-        phrase="przeciętne miesięczne wynagrodzenia brutto",
-        must_unit_contains_any=["zł", "pln"],
-        must_name_contains_any=["wynagrod", "miesięcz"],
-        reject_name_contains_any=["dynamika", "indeks", "rok poprzedni", "2015=100", "100=rok"],
+def refresh_dataset(
+    cache_dir: Path,
+    bdl_client_id: str | None,
+    bdl_base_url: str,
+    bdl_options: dict[str, Any] | None = None,
+    cache_format: str | None = None,
+    lock_timeout_s: float = 300.0,
+    dataset_options: dict[str, Any] | None = None,
+) -> pd.DataFrame:
+    """
+    Odświeża zbiór z BDL i zapisuje go do cache (niezależnie od świeżości).
+    Z BDL idą tylko lata brakujące i z okna zmienności – reszta pochodzi z partycji.
+
+    Pod blokadą międzyprocesową: jeśli w czasie oczekiwania inny proces zapisał nową
+    wersję, nie pobieramy drugi raz, tylko czytamy jego wynik. Gdy blokady nie da się
+    wziąć w `lock_timeout_s`, leci CacheLockTimeout.
+    """
+    cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def produce() -> pd.DataFrame:
+        with metrics.stage("bdl_refresh"), BDLClient(base_url=bdl_base_url, client_id=bdl_client_id, **(bdl_options or {})) as client:
+            return _refresh_dataset(client, cache_dir, cache_format, dataset_options)
+
+    key = dataset_key(dataset_options)
+    df, refreshed = single_flight(cache_dir, key, produce, timeout_s=lock_timeout_s)
+    if refreshed:
+        return df
+    return load_cache(cache_dir, key, fmt=cache_format)
+
+
+async def refresh_dataset_async(
+    cache_dir: Path,
+    bdl_client_id: str | None,
+    bdl_base_url: str,
+    bdl_options: dict[str, Any] | None = None,
+    cache_format: str | None = None,
+    lock_timeout_s: float = 300.0,
+    dataset_options: dict[str, Any] | None = None,
+    timeout_s: float | None = None,
+    max_concurrency: int | None = None,
+) -> pd.DataFrame:
+    """
+    refresh_dataset z pobieraniem przez AsyncBDLClient: strony wszystkich zmiennych (i kawałki
+    po rodzicach) idą współbieżnie z bieżącej pętli, ograniczone semaforem `max_concurrency`.
+
+    Blokady (plikowa, wspólnego cache) i zapis cache z agregatami działają w wątku, jak
+    w wersji synchronicznej – pętla zdarzeń zajmuje się tylko I/O i normalizacją stron.
+    Po `timeout_s` pobieranie jest anulowane i leci BDLClientError; anulowanie zadania,
+    które czeka na ten coroutine, też przerywa pobieranie i zwalnia blokady.
+    """
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    loop = asyncio.get_running_loop()
+    running: list[concurrent.futures.Future] = []
+    cancelled = threading.Event()
+
+    async def fetch() -> dict[str, tuple[BDLVariable, pd.DataFrame]]:
+        client = AsyncBDLClient(
+            base_url=bdl_base_url, client_id=bdl_client_id, max_concurrency=max_concurrency, **(bdl_options or {})
+        )
+        async with client:
+            try:
+                return await asyncio.wait_for(_fetch_dataset_async(client, cache_dir, cache_format, dataset_options), timeout_s)
+            except asyncio.TimeoutError as e:
+                raise BDLClientError(f"BDL refresh timed out after {timeout_s:g} s") from e
+
+    def produce() -> pd.DataFrame:
+        # w wątku single_flight, pod blokadami; pobieranie wraca na pętlę wywołującego
+        with metrics.stage("bdl_refresh"):
+            if cancelled.is_set():
+                # anulowano, zanim doczekaliśmy się blokady – nie pobieramy na darmo
+                raise BDLClientError("BDL refresh cancelled")
+            future = asyncio.run_coroutine_threadsafe(fetch(), loop)
+            running.append(future)
+            if cancelled.is_set():
+                future.cancel()
+            fetched = future.result()
+            return _save_dataset(cache_dir, cache_format, dataset_options, fetched)
+
+    key = dataset_key(dataset_options)
+    try:
+        df, refreshed = await asyncio.to_thread(single_flight, cache_dir, key, produce, lock_timeout_s)
+    except asyncio.CancelledError:
+        cancelled.set()
+        for future in running:
+            future.cancel()
+        raise
+    if refreshed:
+        return df
+    return await asyncio.to_thread(load_cache, cache_dir, key, fmt=cache_format)
+
+
+def _known_variable(
+    variables: VariableStore, metric: str, options: dict[str, Any], pick_kwargs: dict[str, Any]
+) -> tuple[BDLVariable | None, str]:
+    """Nadpisanie z konfiguracji albo zapamiętane rozstrzygnięcie; drugi element to klucz rozstrzygnięcia."""
+    key = resolution_key(
+        pick_kwargs["phrase"],
+        unit=pick_kwargs.get("must_unit_contains_any"),
+        name=pick_kwargs.get("must_name_contains_any"),
+        reject=pick_kwargs.get("reject_name_contains_any"),
+    )
+    override = parse_overrides(options.get("variable_overrides")).get(metric)
+    if override is not None:
+        return BDLVariable(id=override, name=metric), key
+    return variables.get(key), key
+
+
+def _expired_variable(variables: VariableStore, key: str, metric: str) -> BDLVariable | None:
+    # wyszukiwarka nie działa, ale przeterminowane id jest prawie na pewno dalej dobre
+    var = variables.get(key, allow_expired=True)
+    if var is not None:
+        log.warning("BDL variable search failed, reusing expired resolution for %s", metric)
+    return var
+
+
+def _resolve_variable(
+    search: Callable[[str], list[BDLVariable]],
+    variables: VariableStore,
+    metric: str,
+    options: dict[str, Any],
+    **pick_kwargs: Any,
+) -> BDLVariable:
+    """Id zmiennej: nadpisanie z konfiguracji, zapamiętane rozstrzygnięcie albo wyszukiwanie w BDL."""
+    var, key = _known_variable(variables, metric, options, pick_kwargs)
+    if var is not None:
+        return var
+    try:
+        var = _pick_variable_strict(search, **pick_kwargs)
+    except BDLClientError:
+        var = _expired_variable(variables, key, metric)
+        if var is None:
+            raise
+        return var
+    variables.put(key, var)
+    return var
+
+
+def _unknown_phrases(variables: VariableStore, indicators: Iterable[Indicator], options: dict[str, Any]) -> list[str]:
+    """Frazy, których nie rozstrzyga ani nadpisanie, ani zapamiętany wynik – każda raz."""
+    phrases = (
+        ind.phrase for ind in indicators if _known_variable(variables, ind.column, options, ind.query())[0] is None
     )
+    return list(dict.fromkeys(phrases))
+
+
+def _searched(results: dict[str, Any]) -> Callable[[str], list[BDLVariable]]:
+    """Wyniki wyszukiwań zebrane z góry (lista kandydatów albo błąd) jako funkcja frazy."""
+
+    def search(phrase: str) -> list[BDLVariable]:
+        result = results[phrase]
+        if isinstance(result, BaseException):
+            raise result
+        return result
+
+    return search
+
+
+def _resolve_indicators(
+    client: BDLClient, variables: VariableStore, indicators: tuple[Indicator, ...], options: dict[str, Any]
+) -> dict[str, BDLVariable]:
+    # każda fraza idzie do wyszukiwarki raz (choćby korzystało z niej kilka wskaźników), frazy – równolegle
+    phrases = _unknown_phrases(variables, indicators, options)
+    results: dict[str, Any] = {}
+    if phrases:
+        workers = min(len(phrases), MAX_PARALLEL_VARIABLES)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bdl-search") as ex:
+            futures = {phrase: ex.submit(client.search_variables, phrase, page_size=100) for phrase in phrases}
+        results = {phrase: f.exception() or f.result() for phrase, f in futures.items()}
+    search = _searched(results)
+    return {ind.column: _resolve_variable(search, variables, ind.column, options, **ind.query()) for ind in indicators}
+
+
+def _plan_years(
+    store: PartitionStore, metric: str, var: BDLVariable, years: list[int], options: dict[str, Any]
+) -> list[int]:
+    return store.plan(
+        metric,
+        var.id,
+        years,
+        mutable_years=int(options["mutable_years"]),
+        max_age_days=float(options["partition_max_age_days"]),
+    )
+
+
+@dataclass
+class _Fetch:
+    """Zmienna BDL do pobrania: lata do odświeżenia i wskaźniki, które z niej korzystają."""
 
-    years = _years_range(2015)
+    var_id: int
+    years: list[int]
+    indicators: list[Indicator]
 
-    rows_unemp = client.get_data_by_variable(var_id=v_unemp.id, years=years, unit_level=2)
-    rows_wages = client.get_data_by_variable(var_id=v_wages.id, years=years, unit_level=2)
 
-    df_unemp = _normalize(rows_unemp, metric="unemployment_rate")
-    df_wages = _normalize(rows_wages, metric="avg_wage")
+def _plan_fetches(
+    store: PartitionStore,
+    indicators: tuple[Indicator, ...],
+    resolved: dict[str, BDLVariable],
+    years: list[int],
+    options: dict[str, Any],
+) -> list[_Fetch]:
+    """Wskaźniki na tej samej zmiennej dzielą jedno pobranie (suma ich lat); zmienne bez brakujących lat odpadają."""
+    todo: dict[int, set[int]] = {}
+    users: dict[int, list[Indicator]] = {}
+    for ind in indicators:
+        var = resolved[ind.column]
+        users.setdefault(var.id, []).append(ind)
+        todo.setdefault(var.id, set()).update(_plan_years(store, ind.column, var, years, options))
+    return [_Fetch(var_id, sorted(todo[var_id]), users[var_id]) for var_id in users if todo[var_id]]
 
+
+def _batches(fetches: list[_Fetch]) -> list[list[_Fetch]]:
+    """Zmienne z tym samym zestawem lat mogą iść wspólnymi zapytaniami."""
+    groups: dict[tuple[int, ...], list[_Fetch]] = {}
+    for f in fetches:
+        groups.setdefault(tuple(f.years), []).append(f)
+    return list(groups.values())
+
+
+def _use_by_unit(n_vars: int, options: dict[str, Any]) -> bool:
+    """
+    Czy paczkę zmiennych pobrać przez /data/by-unit (wiele var-id w zapytaniu), czy zmienna
+    po zmiennej. Rozstrzyga szacowana liczba zapytań: by-variable rośnie liniowo z liczbą
+    zmiennych, by-unit – z liczbą jednostek i tylko co `max_vars_per_call` zmiennych.
+    """
+    strategy = options["batch_strategy"]
+    if strategy != "auto":
+        return strategy == "by-unit"
+    level, parent_level = int(options["unit_level"]), int(options["chunk_parent_level"])
+    units = APPROX_UNITS.get(level)
+    if units is None or n_vars < 2:
+        return False
+    pages = -(-units // PAGE_SIZE)
+    per_var = max(pages, APPROX_UNITS.get(parent_level, 1)) if level > parent_level else pages
+    by_unit = pages + units * -(-n_vars // max(1, int(options["max_vars_per_call"])))
+    return by_unit < n_vars * per_var
+
+
+def _variable_pages(
+    client: BDLClient, fetch: _Fetch, options: dict[str, Any], parent_ids: Callable[[], list[str]]
+) -> Iterable[list[dict[str, Any]]]:
+    level = int(options["unit_level"])
+    if level > int(options["chunk_parent_level"]):
+        return client.iter_data_by_variable_chunked(
+            var_id=fetch.var_id, years=fetch.years, unit_level=level, parent_ids=parent_ids()
+        )
+    return client.iter_data_by_variable(var_id=fetch.var_id, years=fetch.years, unit_level=level)
+
+
+def _write_fetched(store: PartitionStore, batch: list[_Fetch], frames: dict[int, pd.DataFrame], n_years: int) -> None:
+    for fetch in batch:
+        for ind in fetch.indicators:
+            store.write(ind.column, fetch.var_id, fetch.years, frames[fetch.var_id].rename(columns={"value": ind.column}))
+            log.info("BDL %s (var %s): fetched %d of %d years", ind.column, fetch.var_id, len(fetch.years), n_years)
+
+
+def _assembled(
+    store: PartitionStore, indicators: tuple[Indicator, ...], resolved: dict[str, BDLVariable], years: list[int]
+) -> dict[str, tuple[BDLVariable, pd.DataFrame]]:
+    return {ind.column: (resolved[ind.column], store.assemble(ind.column, resolved[ind.column].id, years)) for ind in indicators}
+
+
+def _stores(cache_dir: Path, cache_format: str | None, options: dict[str, Any]) -> tuple[PartitionStore, VariableStore]:
+    level = int(options["unit_level"])
+    store = PartitionStore(cache_dir / "partitions" / f"level-{level}", fmt=cache_format)
+    variables = VariableStore(cache_dir / "variables.json", ttl_days=float(options["variable_ttl_days"]))
+    return store, variables
+
+
+def _refresh_dataset(
+    client: BDLClient,
+    cache_dir: Path,
+    cache_format: str | None = None,
+    dataset_options: dict[str, Any] | None = None,
+) -> pd.DataFrame:
+    options = {**DEFAULT_DATASET_OPTIONS, **(dataset_options or {})}
+    indicators = select_indicators(options["indicators"])
+    years = _years_range(int(options["start_year"]))
+    level = int(options["unit_level"])
+    store, variables = _stores(cache_dir, cache_format, options)
+    if client.search_param is None:
+        client.search_param = variables.search_param
+
+    @functools.cache
+    def parent_ids() -> list[str]:
+        # jedno zapytanie o listę rodziców na odświeżenie, tylko gdy coś trzeba pobrać
+        units = client.get_units(level=int(options["chunk_parent_level"]))
+        return [str(u["id"]) for u in units if u.get("id")]
+
+    @functools.cache
+    def unit_ids() -> list[str]:
+        return [str(u["id"]) for u in client.get_units(level=level) if u.get("id")]
+
+    resolved = _resolve_indicators(client, variables, indicators, options)
+    for batch in _batches(_plan_fetches(store, indicators, resolved, years, options)):
+        var_ids = [f.var_id for f in batch]
+        if _use_by_unit(len(batch), options):
+            pages = client.iter_data_by_unit(
+                unit_ids(), var_ids, batch[0].years, max_vars_per_call=int(options["max_vars_per_call"])
+            )
+            frames = normalize_unit_pages(pages, var_ids)
+        else:
+            # zmienne idą równolegle; wspólny klient pilnuje globalnego limitu zapytań w locie
+            # i tempa z nagłówków BDL, a strony trafiają prosto do buforów normalizacji
+            workers = min(len(batch), MAX_PARALLEL_VARIABLES)
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bdl-var") as ex:
+                normalized = ex.map(
+                    lambda f: normalize_pages(_variable_pages(client, f, options, parent_ids), metric="value"), batch
+                )
+                frames = dict(zip(var_ids, normalized))
+        _write_fetched(store, batch, frames, len(years))
+    variables.remember_search_param(client.search_param)
+    return _save_dataset(cache_dir, cache_format, options, _assembled(store, indicators, resolved, years))
+
+
+def _keyed(df: pd.DataFrame, column: str) -> pd.Series:
+    s = df.set_index(DATASET_KEYS)[column]
+    return s[~s.index.duplicated(keep="last")]
+
+
+def _save_dataset(
+    cache_dir: Path,
+    cache_format: str | None,
+    dataset_options: dict[str, Any] | None,
+    fetched: dict[str, tuple[BDLVariable, pd.DataFrame]],
+) -> pd.DataFrame:
+    options = {**DEFAULT_DATASET_OPTIONS, **(dataset_options or {})}
+    # jedno złączenie wszystkich wskaźników po kluczu (rok, jednostka) zamiast łańcucha merge
     df = (
-        pd.merge(df_unemp, df_wages, on=["year", "unitId", "unitName"], how="outer")
+        pd.concat([_keyed(frame, column) for column, (_, frame) in fetched.items()], axis=1, join="outer")
+        .reset_index()
         .sort_values(["year", "unitName"])
         .reset_index(drop=True)
     )
 
-    save_cache(cache_dir, CACHE_KEY, df, source=f"BDL vars: unemp={v_unemp.id}, wage={v_wages.id}")
+    # agregaty dashboardu liczone raz, przy zapisie – zapytania tylko je czytają
+    save_cache(
+        cache_dir,
+        dataset_key(options),
+        df,
+        source="BDL vars: " + ", ".join(f"{column}={var.id}" for column, (var, _) in fetched.items()),
+        fmt=cache_format,
+        aggregates=functools.partial(build_aggregates, unit_level=int(options["unit_level"])),
+    )
     return df
 
 
-def _normalize(rows: list[dict[str, Any]], metric: str) -> pd.DataFrame:
-    """
-    Obsługuje dwa formaty, które realnie pojawiają się w BDL:
-    A) płaski: { unitId, unitName, year, val }
-    B) zagnieżdżony: { id/unitId, name/unitName, values: [{year,val}, ...] }
-    """
-    df = pd.DataFrame(rows)
-    if df.empty:
-        return pd.DataFrame(columns=["year", "unitId", "unitName", metric])
-
-    # ------- helpers: unitId/unitName mogą się nazywać różnie -------
-    def series_or_empty(colnames: list[str]) -> pd.Series:
-        for c in colnames:
-            if c in df.columns:
-                s = df[c]
-                if isinstance(s, pd.Series):
-                    return s
-        return pd.Series([""] * len(df), index=df.index)
-
-    unit_id_raw = series_or_empty(["unitId", "unit_id", "id"])
-    unit_name_raw = series_or_empty(["unitName", "unit_name", "name"])
-
-    unit_id = unit_id_raw.fillna("").astype(str).replace("nan", "").str.strip()
-    unit_name = unit_name_raw.fillna("").astype(str).replace("nan", "").str.strip()
-
-    # ------- CASE A: płaski -------
-    if "year" in df.columns and "val" in df.columns:
-        val_s = df["val"].fillna("").astype(str).str.replace(" ", "", regex=False).str.replace(",", ".", regex=False)
-        out = pd.DataFrame(
-            {
-                "year": pd.to_numeric(df["year"], errors="coerce").astype("Int64"),
-                "unitId": unit_id,
-                "unitName": unit_name,
-                metric: pd.to_numeric(val_s, errors="coerce"),
-            }
-        )
-        return out.dropna(subset=["year"]).reset_index(drop=True)
-
-    # ------- CASE B: values list -------
-    if "values" in df.columns:
-        base = df.copy()
-        base["unitId"] = unit_id
-        base["unitName"] = unit_name
-
-        exploded = base.explode("values", ignore_index=True)
-        exploded = exploded[exploded["values"].notna()].copy()
-        if exploded.empty:
-            return pd.DataFrame(columns=["year", "unitId", "unitName", metric])
-
-        vals = pd.json_normalize(exploded["values"])
-        if "year" not in vals.columns or "val" not in vals.columns:
-            return pd.DataFrame(columns=["year", "unitId", "unitName", metric])
-
-        val_s = vals["val"].fillna("").astype(str).str.replace(" ", "", regex=False).str.replace(",", ".", regex=False)
-
-        out = pd.DataFrame(
-            {
-                "year": pd.to_numeric(vals["year"], errors="coerce").astype("Int64"),
-                "unitId": exploded["unitId"].reset_index(drop=True),
-                "unitName": exploded["unitName"].reset_index(drop=True),
-                metric: pd.to_numeric(val_s, errors="coerce"),
-            }
+# ------- asyncio (AsyncBDLClient) -------
+
+async def _resolve_indicators_async(
+    client: AsyncBDLClient, variables: VariableStore, indicators: tuple[Indicator, ...], options: dict[str, Any]
+) -> dict[str, BDLVariable]:
+    phrases = _unknown_phrases(variables, indicators, options)
+    found = await asyncio.gather(*(client.search_variables(p, page_size=100) for p in phrases), return_exceptions=True)
+    search = _searched(dict(zip(phrases, found)))
+    return {ind.column: _resolve_variable(search, variables, ind.column, options, **ind.query()) for ind in indicators}
+
+
+async def _normalize_variable_async(
+    client: AsyncBDLClient, fetch: _Fetch, options: dict[str, Any], parent_ids: Callable[[], Awaitable[list[str]]]
+) -> pd.DataFrame:
+    level = int(options["unit_level"])
+    if level > int(options["chunk_parent_level"]):
+        pages = client.iter_data_by_variable_chunked(
+            var_id=fetch.var_id, years=fetch.years, unit_level=level, parent_ids=await parent_ids()
         )
-        return out.dropna(subset=["year"]).reset_index(drop=True)
+    else:
+        pages = client.iter_data_by_variable(var_id=fetch.var_id, years=fetch.years, unit_level=level)
+    async with aclosing(pages):
+        return await normalize_pages_async(pages, metric="value")
 
-    # nieznany format
-    return pd.DataFrame(columns=["year", "unitId", "unitName", metric])
+
+async def _fetch_dataset_async(
+    client: AsyncBDLClient,
+    cache_dir: Path,
+    cache_format: str | None = None,
+    dataset_options: dict[str, Any] | None = None,
+) -> dict[str, tuple[BDLVariable, pd.DataFrame]]:
+    options = {**DEFAULT_DATASET_OPTIONS, **(dataset_options or {})}
+    indicators = select_indicators(options["indicators"])
+    years = _years_range(int(options["start_year"]))
+    level = int(options["unit_level"])
+    store, variables = _stores(cache_dir, cache_format, options)
+    if client.search_param is None:
+        client.search_param = variables.search_param
+
+    parents: asyncio.Future[list[dict[str, Any]]] | None = None
+    tasks: list[asyncio.Future[pd.DataFrame]] = []
+
+    async def parent_ids() -> list[str]:
+        # jedno zapytanie o listę rodziców, współdzielone przez zmienne
+        nonlocal parents
+        if parents is None:
+            parents = asyncio.ensure_future(client.get_units(level=int(options["chunk_parent_level"])))
+        return [str(u["id"]) for u in await asyncio.shield(parents) if u.get("id")]
+
+    resolved = await _resolve_indicators_async(client, variables, indicators, options)
+    try:
+        for batch in _batches(_plan_fetches(store, indicators, resolved, years, options)):
+            var_ids = [f.var_id for f in batch]
+            if _use_by_unit(len(batch), options):
+                units = [str(u["id"]) for u in await client.get_units(level=level) if u.get("id")]
+                pages = client.iter_data_by_unit(
+                    units, var_ids, batch[0].years, max_vars_per_call=int(options["max_vars_per_call"])
+                )
+                async with aclosing(pages):
+                    frames = await normalize_unit_pages_async(pages, var_ids)
+            else:
+                tasks = [asyncio.ensure_future(_normalize_variable_async(client, f, options, parent_ids)) for f in batch]
+                frames = dict(zip(var_ids, await asyncio.gather(*tasks)))
+            # zapis partycji (parquet) poza pętlą zdarzeń
+            await asyncio.to_thread(_write_fetched, store, batch, frames, len(years))
+    finally:
+        # błąd albo anulowanie jednej zmiennej przerywa pozostałe (gather sam ich nie anuluje)
+        pending = [t for t in (*tasks, parents) if t is not None and not t.done()]
+        for t in pending:
+            t.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+    variables.remember_search_param(client.search_param)
+    return await asyncio.to_thread(_assembled, store, indicators, resolved, years)
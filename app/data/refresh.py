@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+from ..lazy import lazy_function
+from .cache import CacheLockTimeout, read_meta
+from .dataset import dataset_key
+
+# pipeline (pandas, klienci BDL) ładuje się dopiero przy pierwszym odświeżeniu
+refresh_dataset = lazy_function("app.data.pipeline", "refresh_dataset")
+refresh_dataset_async = lazy_function("app.data.pipeline", "refresh_dataset_async")
+
+log = logging.getLogger(__name__)
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+@dataclass
+class RefreshStatus:
+    running: bool = False
+    last_started_at: str | None = None
+    last_finished_at: str | None = None
+    last_success_at: str | None = None
+    last_duration_s: float | None = None
+    last_error: str | None = None
+    refresh_count: int = 0
+    failure_count: int = 0
+
+
+class BackgroundRefresher:
+    """
+    Odświeżanie cache BDL poza wątkiem zapytania.
+
+    `trigger()` uruchamia co najwyżej jedno odświeżenie naraz (kolejne wywołania w trakcie
+    są ignorowane). Opcjonalny harmonogram (`start_scheduler`) odświeża cache zawczasu –
+    gdy jego wiek przekroczy `lead_fraction * max_age_hours` – więc zapytania praktycznie
+    nie trafiają na nieświeże dane.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Path,
+        max_age_hours: int,
+        bdl_client_id: str | None,
+        bdl_base_url: str,
+        bdl_options: dict[str, Any] | None = None,
+        cache_format: str | None = None,
+        lead_fraction: float = 0.9,
+        retry_after_s: float = 900.0,
+        dataset_options: dict[str, Any] | None = None,
+        use_async: bool = False,
+        async_concurrency: int | None = None,
+        refresh_timeout_s: float | None = None,
+    ) -> None:
+        self.cache_dir = cache_dir
+        self.max_age_hours = max_age_hours
+        self.bdl_client_id = bdl_client_id
+        self.bdl_base_url = bdl_base_url
+        self.bdl_options = bdl_options
+        self.cache_format = cache_format
+        self.dataset_options = dataset_options
+        self.lead_fraction = min(max(lead_fraction, 0.0), 1.0)
+        self.retry_after_s = retry_after_s
+        # use_async: pobieranie przez AsyncBDLClient we własnej pętli asyncio wątku odświeżania
+        self.use_async = use_async
+        self.async_concurrency = async_concurrency
+        self.refresh_timeout_s = refresh_timeout_s or None
+
+        self.status = RefreshStatus()
+        self._lock = threading.Lock()
+        self._worker: threading.Thread | None = None
+        self._scheduler: threading.Thread | None = None
+        self._stop = threading.Event()
+
+    # ------- pojedyncze odświeżenie -------
+    def trigger(self) -> bool:
+        """Zleca odświeżenie w tle; False, jeśli jakieś już trwa."""
+        with self._lock:
+            if self.status.running:
+                return False
+            self.status.running = True
+            self._worker = threading.Thread(target=self._run, name="bdl-refresh", daemon=True)
+            self._worker.start()
+            return True
+
+    def refresh_now(self) -> bool:
+        """Odświeża synchronicznie w bieżącym wątku (CLI/harmonogram). False, jeśli inne trwa."""
+        with self._lock:
+            if self.status.running:
+                return False
+            self.status.running = True
+        self._run()
+        return self.status.last_error is None
+
+    def _run(self) -> None:
+        started = time.monotonic()
+        self.status.last_started_at = _now_iso()
+        kwargs = dict(
+            cache_dir=self.cache_dir,
+            bdl_client_id=self.bdl_client_id,
+            bdl_base_url=self.bdl_base_url,
+            bdl_options=self.bdl_options,
+            cache_format=self.cache_format,
+            lock_timeout_s=0.0,
+            dataset_options=self.dataset_options,
+        )
+        try:
+            if self.use_async:
+                asyncio.run(
+                    refresh_dataset_async(
+                        **kwargs, timeout_s=self.refresh_timeout_s, max_concurrency=self.async_concurrency
+                    )
+                )
+            else:
+                refresh_dataset(**kwargs)
+        except CacheLockTimeout:
+            # odświeża inny proces (np. drugi worker gunicorna) – to nie jest błąd
+            log.info("BDL refresh skipped, another process holds the refresh lock")
+            self.status.last_error = None
+        except Exception as e:
+            log.exception("Background BDL refresh failed")
+            self.status.last_error = f"{type(e).__name__}: {e}"
+            self.status.failure_count += 1
+        else:
+            self.status.last_error = None
+            self.status.last_success_at = _now_iso()
+            self.status.refresh_count += 1
+        finally:
+            self.status.last_duration_s = round(time.monotonic() - started, 3)
+            self.status.last_finished_at = _now_iso()
+            with self._lock:
+                self.status.running = False
+
+    def wait(self, timeout: float | None = None) -> None:
+        worker = self._worker
+        if worker is not None:
+            worker.join(timeout)
+
+    # ------- harmonogram -------
+    def cache_age_s(self) -> float | None:
+        meta = read_meta(self.cache_dir, dataset_key(self.dataset_options))
+        if meta is None:
+            return None
+        try:
+            created = datetime.fromisoformat(meta.created_at_iso).astimezone(timezone.utc)
+        except ValueError:
+            return None
+        return max(0.0, (datetime.now(timezone.utc) - created).total_seconds())
+
+    def seconds_until_due(self) -> float:
+        age = self.cache_age_s()
+        if age is None:
+            return 0.0
+        due_at = self.lead_fraction * self.max_age_hours * 3600
+        return max(0.0, due_at - age)
+
+    def start_scheduler(self, check_interval_s: float = 300.0) -> None:
+        if self.max_age_hours <= 0:
+            return  # cache nigdy nie jest świeży – harmonogram kręciłby się w kółko
+        if self._scheduler is not None and self._scheduler.is_alive():
+            return
+        self._stop.clear()
+        self._scheduler = threading.Thread(
+            target=self._schedule_loop, args=(check_interval_s,), name="bdl-refresh-scheduler", daemon=True
+        )
+        self._scheduler.start()
+
+    def stop_scheduler(self) -> None:
+        self._stop.set()
+
+    def _schedule_loop(self, check_interval_s: float) -> None:
+        while not self._stop.is_set():
+            due = self.seconds_until_due()
+            if due <= 0 and not self.status.running:
+                self.refresh_now()
+                due = self.seconds_until_due()
+                # po nieudanym odświeżeniu nie zasypujemy BDL – ponowna próba po retry_after_s
+                if self.status.last_error is not None:
+                    due = self.retry_after_s
+            elif due <= 0:
+                due = 5.0  # trwa odświeżenie zlecone przez trigger()
+            self._stop.wait(min(max(due, 1.0), check_interval_s))
+
+    # ------- /health -------
+    def health(self) -> dict[str, Any]:
+        age = self.cache_age_s()
+        return {
+            "cache_age_s": None if age is None else round(age, 1),
+            "cache_max_age_s": self.max_age_hours * 3600,
+            "cache_fresh": age is not None and age <= self.max_age_hours * 3600,
+            "next_refresh_in_s": round(self.seconds_until_due(), 1),
+            "scheduler": self._scheduler is not None and self._scheduler.is_alive(),
+            "refresh": asdict(self.status),
+        }
@@ -0,0 +1,128 @@
+"""
+Indeks zbioru do zapytań API (/api/series, /api/ranking), budowany raz na wersję danych.
+
+Ramka (rok × jednostka) jest rozkładana na krotki: dla każdej jednostki posortowane lata
+i wartości wskaźników, dla każdej pary (rok, wskaźnik) gotowy ranking. Zapytanie to słownik
+po unitId + bisect po latach albo wycinek rankingu – bez przeglądania DataFrame.
+Indeks jest niezmienny po zbudowaniu, więc wątki zapytań czytają go bez blokad.
+"""
+from __future__ import annotations
+
+import math
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from .analysis import fixed_metric, numeric_column
+
+KEY_COLUMNS = ("year", "unitId", "unitName")
+
+
+@dataclass(frozen=True)
+class UnitSeries:
+    unit_id: str
+    unit_name: str
+    years: tuple[int, ...]
+    values: dict[str, tuple[float | None, ...]]
+
+    def points(self, metrics: tuple[str, ...], start: int | None, end: int | None) -> list[dict[str, Any]]:
+        lo = 0 if start is None else bisect_left(self.years, start)
+        hi = len(self.years) if end is None else bisect_right(self.years, end)
+        return [
+            {"year": self.years[i], **{m: self.values[m][i] for m in metrics}}
+            for i in range(lo, hi)
+        ]
+
+
+@dataclass(frozen=True)
+class SeriesIndex:
+    metrics: tuple[str, ...]
+    years: tuple[int, ...]
+    unit_ids: tuple[str, ...]
+    units: dict[str, UnitSeries]
+    # (rok, wskaźnik) -> jednostki malejąco po wartości (bez braków danych)
+    rankings: dict[tuple[int, str], tuple[tuple[str, float], ...]]
+
+    def latest_year(self, metric: str) -> int | None:
+        years = [y for y in self.years if self.rankings.get((y, metric))]
+        return years[-1] if years else None
+
+    def series(
+        self, unit_ids: list[str], metrics: tuple[str, ...], start: int | None = None, end: int | None = None
+    ) -> list[dict[str, Any]]:
+        return [
+            {"unitId": u.unit_id, "unitName": u.unit_name, "points": u.points(metrics, start, end)}
+            for u in (self.units[uid] for uid in unit_ids)
+        ]
+
+    def ranking(
+        self, year: int, metric: str, descending: bool = True, offset: int = 0, limit: int = 50
+    ) -> tuple[int, list[dict[str, Any]]]:
+        """(liczba jednostek z wartością, wiersze offset..offset+limit) – rank liczony od 1."""
+        ordered = self.rankings.get((year, metric), ())
+        total = len(ordered)
+        if descending:
+            window = ordered[offset : offset + limit]
+        else:
+            lo, hi = max(0, total - offset - limit), max(0, total - offset)
+            window = ordered[lo:hi][::-1]
+        return total, [
+            {"rank": offset + i + 1, "unitId": uid, "unitName": self.units[uid].unit_name, "value": value}
+            for i, (uid, value) in enumerate(window)
+        ]
+
+
+def _json_values(values: np.ndarray, digits: int = 2) -> list[float | None]:
+    # jak analysis._num, ale dla całej tablicy naraz: NaN/inf -> None, zaokrąglenie
+    rounded = np.round(values.astype("float64"), digits)
+    return [v if math.isfinite(v) else None for v in rounded.tolist()]
+
+
+def build_series_index(df: pd.DataFrame) -> SeriesIndex:
+    metrics = tuple(c for c in df.columns if c not in KEY_COLUMNS)
+    year = numeric_column(df, "year")
+    keep = ~np.isnan(year)
+    df = df.loc[keep]
+    years = year[keep].astype("int64")
+    unit_ids = df["unitId"].astype(str).to_numpy(dtype=str)
+    names = df["unitName"].astype(str).to_numpy(dtype=str) if "unitName" in df.columns else unit_ids
+    # ta sama korekta skali co w analyze(), żeby API zgadzało się z dashboardem
+    values = {m: fixed_metric(df, m) for m in metrics}
+
+    # jednostka, potem rok: wiersze jednej jednostki leżą obok siebie, lata rosnąco
+    order = np.lexsort((years, unit_ids))
+    json_values = {m: _json_values(values[m]) for m in metrics}
+    ids = unit_ids.tolist()
+    units: dict[str, UnitSeries] = {}
+    sorted_ids = unit_ids[order]
+    bounds = np.flatnonzero(np.r_[True, sorted_ids[1:] != sorted_ids[:-1], True]) if order.size else []
+    for lo, hi in zip(bounds[:-1], bounds[1:]):
+        rows = order[lo:hi].tolist()
+        uid = ids[rows[0]]
+        units[uid] = UnitSeries(
+            unit_id=uid,
+            unit_name=str(names[rows[0]]) or f"ID: {uid}",
+            years=tuple(int(years[i]) for i in rows),
+            values={m: tuple(json_values[m][i] for i in rows) for m in metrics},
+        )
+
+    rankings: dict[tuple[int, str], tuple[tuple[str, float], ...]] = {}
+    for y in np.unique(years):
+        at_year = np.flatnonzero(years == y)
+        for m in metrics:
+            v = values[m][at_year]
+            rows = at_year[np.isfinite(v)]
+            # malejąco po wartości, przy remisie po unitId – stabilna kolejność między wersjami
+            ranked = rows[np.lexsort((unit_ids[rows], -values[m][rows]))].tolist()
+            rankings[(int(y), m)] = tuple((ids[i], json_values[m][i]) for i in ranked)
+
+    return SeriesIndex(
+        metrics=metrics,
+        years=tuple(int(y) for y in np.unique(years)),
+        unit_ids=tuple(units),
+        units=units,
+        rankings=rankings,
+    )
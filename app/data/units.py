@@ -0,0 +1,22 @@
+from __future__ import annotations
+
+from typing import NamedTuple
+
+
+class UnitLevel(NamedTuple):
+    label: str  # nagłówek kolumny: „Województwo”
+    plural: str  # „województwa”
+    locative: str  # „średnia po województwach”
+    genitive: str  # „ranking województw”
+
+
+# poziomy jednostek BDL obsługiwane przez dashboard
+UNIT_LEVELS: dict[int, UnitLevel] = {
+    2: UnitLevel("Województwo", "województwa", "województwach", "województw"),
+    5: UnitLevel("Powiat", "powiaty", "powiatach", "powiatów"),
+    6: UnitLevel("Gmina", "gminy", "gminach", "gmin"),
+}
+
+
+def unit_level_labels(level: int) -> UnitLevel:
+    return UNIT_LEVELS.get(int(level), UnitLevel("Jednostka", "jednostki", "jednostkach", "jednostek"))
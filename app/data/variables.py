@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import json
+import threading
+from dataclasses import asdict
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable, Mapping
+
+from .bdl_client import BDLVariable
+from .cache import atomic_write
+
+
+def resolution_key(phrase: str, **filters: list[str]) -> str:
+    """Klucz rozstrzygnięcia: fraza + zestaw filtrów (kolejność elementów bez znaczenia)."""
+    norm = {k: sorted(x.lower() for x in v or []) for k, v in sorted(filters.items())}
+    return json.dumps({"phrase": phrase.lower(), **norm}, ensure_ascii=False, sort_keys=True)
+
+
+def parse_overrides(raw: str | Mapping[str, Any] | None) -> dict[str, int]:
+    """`unemployment_rate=60270,avg_wage=64428` (albo gotowy słownik) -> {metryka: id zmiennej}."""
+    if not raw:
+        return {}
+    if isinstance(raw, Mapping):
+        return {str(k): int(v) for k, v in raw.items()}
+    out = {}
+    for part in str(raw).split(","):
+        metric, sep, var_id = part.partition("=")
+        if sep and metric.strip() and var_id.strip():
+            out[metric.strip()] = int(var_id)
+    return out
+
+
+class VariableStore:
+    """
+    Trwały zapis rozstrzygniętych zmiennych BDL (fraza + filtry -> BDLVariable) z TTL
+    oraz nazwy parametru wyszukiwania, którą przyjmuje bramka (`name` albo `search`).
+
+    Id zmiennych praktycznie się nie zmieniają, więc odświeżenie nie musi co raz
+    przeszukiwać /variables/search. Po upływie TTL szukamy ponownie, ale gdy BDL
+    nie odpowiada, przeterminowany wpis jest lepszy niż błąd.
+    """
+
+    def __init__(self, path: Path, ttl_days: float = 30.0) -> None:
+        self.path = path
+        self.ttl = timedelta(days=ttl_days)
+        self._lock = threading.Lock()
+
+    def _read(self) -> dict[str, Any]:
+        if not self.path.exists():
+            return {}
+        try:
+            raw = json.loads(self.path.read_text(encoding="utf-8"))
+            return raw if isinstance(raw, dict) else {}
+        except Exception:
+            return {}
+
+    def _update(self, change: Callable[[dict[str, Any]], None]) -> None:
+        with self._lock:
+            data = self._read()
+            change(data)
+            payload = json.dumps(data, ensure_ascii=False, indent=2)
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            atomic_write(self.path, lambda p: p.write_text(payload, encoding="utf-8"))
+
+    @property
+    def search_param(self) -> str | None:
+        return self._read().get("search_param")
+
+    def remember_search_param(self, name: str | None) -> None:
+        if name and name != self.search_param:
+            self._update(lambda d: d.__setitem__("search_param", name))
+
+    def get(self, key: str, allow_expired: bool = False) -> BDLVariable | None:
+        entry = self._read().get("resolved", {}).get(key)
+        if not entry:
+            return None
+        try:
+            var = BDLVariable(**entry["variable"])
+            resolved_at = datetime.fromisoformat(entry["resolved_at_iso"]).astimezone(timezone.utc)
+        except Exception:
+            return None
+        if not allow_expired and datetime.now(timezone.utc) - resolved_at > self.ttl:
+            return None
+        return var
+
+    def put(self, key: str, var: BDLVariable) -> None:
+        entry = {"variable": asdict(var), "resolved_at_iso": datetime.now(timezone.utc).isoformat()}
+        self._update(lambda d: d.setdefault("resolved", {}).__setitem__(key, entry))
@@ -1,6 +1,9 @@
+import re
+
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_login import LoginManager
+from sqlalchemy import event
 
 db = SQLAlchemy()
 migrate = Migrate()
@@ -9,8 +12,38 @@ login_manager = LoginManager()
 login_manager.login_view = "auth.login"
 login_manager.login_message_category = "warning"
 
-from .models import User  # noqa: E402
+_PRAGMA = re.compile(r"^\s*([a-z_]+)\s*=\s*([A-Za-z0-9_]+)\s*$")
+
+
+def parse_pragmas(raw: str) -> list[tuple[str, str]]:
+    """"journal_mode=WAL,busy_timeout=5000" -> [(nazwa, wartość)]."""
+    out = []
+    for item in (raw or "").split(","):
+        if not item.strip():
+            continue
+        m = _PRAGMA.match(item)
+        if m is None:
+            raise ValueError(f"Invalid SQLite pragma '{item.strip()}' (expected name=value)")
+        out.append((m.group(1), m.group(2)))
+    return out
+
+
+def configure_sqlite(engine, pragmas: str) -> None:
+    """Ustawia PRAGMA na każdym nowym połączeniu z puli (tylko SQLite)."""
+    parsed = parse_pragmas(pragmas)
+    if engine.dialect.name != "sqlite" or not parsed:
+        return
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_conn, _record):
+        cursor = dbapi_conn.cursor()
+        try:
+            for name, value in parsed:
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+
+from .auth.identity import load_user  # noqa: E402
 
-@login_manager.user_loader
-def load_user(user_id: str):
-    return User.query.get(int(user_id))
+login_manager.user_loader(load_user)
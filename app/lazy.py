@@ -0,0 +1,20 @@
+"""
+Leniwe importy ciężkich modułów (pandas, matplotlib, klient BDL). create_app i /health
+ich nie potrzebują, więc start kontenera i każdego workera gunicorna za nie nie płaci –
+moduł ładuje się przy pierwszym wywołaniu funkcji.
+"""
+from __future__ import annotations
+
+import importlib
+from typing import Any, Callable
+
+
+def lazy_function(module: str, name: str) -> Callable[..., Any]:
+    """Zastępca `module.name`, który importuje moduł dopiero przy pierwszym wywołaniu."""
+
+    def call(*args: Any, **kwargs: Any) -> Any:
+        return getattr(importlib.import_module(module), name)(*args, **kwargs)
+
+    call.__name__ = call.__qualname__ = name
+    call.__doc__ = f"{module}.{name} (import przy pierwszym wywołaniu)"
+    return call
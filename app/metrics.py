@@ -0,0 +1,269 @@
+"""
+Lekka instrumentacja: liczniki i histogramy w pamięci procesu, eksport w formacie tekstowym
+Prometheusa (/metrics) oraz rozkład czasu etapów zapytania w nagłówku Server-Timing.
+
+    with metrics.stage("normalize"):          # histogram stage_duration_seconds{stage=...}
+        ...
+    metrics.inc("dataset_cache_lookups_total", result="hit")
+
+Wyłączone (configure(False)) wszystkie wywołania kończą się na sprawdzeniu flagi – stage()
+oddaje współdzielony, pusty context manager. Pod gunicornem każdy worker ma własny rejestr;
+Prometheus zbiera je osobno (etykieta instance/pod), jak przy /health.
+"""
+from __future__ import annotations
+
+import functools
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Any, Callable, TypeVar
+
+from flask import Flask, g, request
+
+# sekundy; od pojedynczego zapytania HTTP do pełnego odświeżenia gmin
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+STAGE_METRIC = "stage_duration_seconds"
+
+HELP = {
+    STAGE_METRIC: "Duration of pipeline and request stages",
+    "http_request_duration_seconds": "Duration of HTTP requests handled by the app",
+    "bdl_http_request_duration_seconds": "Duration of single HTTP calls to the BDL API",
+    "bdl_http_retries_total": "BDL calls retried after an error or a retryable status",
+    "dataset_cache_lookups_total": "Dataset lookups by outcome (hit, shared, stale, refresh)",
+    "dashboard_memo_lookups_total": "In-process dashboard memo lookups (hit, miss)",
+    "series_index_lookups_total": "In-process API series index lookups (hit, miss)",
+    "user_cache_lookups_total": "Session user loads served from the identity cache (hit, miss)",
+}
+
+_LabelKey = tuple[tuple[str, str], ...]
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # ostatni kubełek = +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _label_key(labels: dict[str, Any]) -> _LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: _LabelKey, extra: tuple[tuple[str, str], ...] = ()) -> str:
+    pairs = key + extra
+    if not pairs:
+        return ""
+    escaped = (v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _format_value(v: float) -> str:
+    return str(int(v)) if float(v).is_integer() else repr(float(v))
+
+
+class Registry:
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._counters: dict[str, dict[_LabelKey, float]] = {}
+        self._histograms: dict[str, dict[_LabelKey, _Histogram]] = {}
+
+    def inc(self, name: str, value: float = 1.0, **labels: Any) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            hist = series.get(key)
+            if hist is None:
+                hist = series[key] = _Histogram(self.buckets)
+            hist.observe(value)
+
+    def counter_value(self, name: str, **labels: Any) -> float:
+        with self._lock:
+            return self._counters.get(name, {}).get(_label_key(labels), 0.0)
+
+    def histogram_count(self, name: str, **labels: Any) -> int:
+        with self._lock:
+            hist = self._histograms.get(name, {}).get(_label_key(labels))
+            return hist.count if hist else 0
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def render(self) -> str:
+        """Format tekstowy Prometheusa (text/plain; version=0.0.4)."""
+        lines: list[str] = []
+        with self._lock:
+            for name in sorted(self._counters):
+                lines.append(f"# HELP {name} {HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} counter")
+                for key, value in sorted(self._counters[name].items()):
+                    lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+            for name in sorted(self._histograms):
+                lines.append(f"# HELP {name} {HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} histogram")
+                for key, hist in sorted(self._histograms[name].items()):
+                    cumulative = 0
+                    for bound, n in zip((*hist.buckets, float("inf")), hist.counts):
+                        cumulative += n
+                        le = "+Inf" if bound == float("inf") else _format_value(bound)
+                        lines.append(f"{name}_bucket{_format_labels(key, (('le', le),))} {cumulative}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {_format_value(hist.sum)}")
+                    lines.append(f"{name}_count{_format_labels(key)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+_enabled = False
+# etapy bieżącego zapytania (nazwa -> sekundy) do Server-Timing; None = poza zapytaniem
+_stages: ContextVar[dict[str, float] | None] = ContextVar("metrics_stages", default=None)
+
+
+def configure(enabled: bool) -> None:
+    global _enabled
+    _enabled = bool(enabled)
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def inc(name: str, value: float = 1.0, **labels: Any) -> None:
+    if _enabled:
+        registry.inc(name, value, **labels)
+
+
+def observe(name: str, value: float, **labels: Any) -> None:
+    if _enabled:
+        registry.observe(name, value, **labels)
+
+
+def add_timing(name: str, seconds: float) -> None:
+    """Dolicza czas do Server-Timing bieżącego zapytania (bez histogramu)."""
+    stages = _stages.get()
+    if stages is not None:
+        stages[name] = stages.get(name, 0.0) + seconds
+
+
+def record_stage(name: str, seconds: float) -> None:
+    """Czas etapu zmierzony samodzielnie (np. suma kawałków pracy w pętli)."""
+    if not _enabled:
+        return
+    registry.observe(STAGE_METRIC, seconds, stage=name)
+    add_timing(name, seconds)
+
+
+class _Stage:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def __enter__(self) -> _Stage:
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        record_stage(self.name, time.perf_counter() - self.start)
+
+
+class _NoopStage:
+    __slots__ = ()
+
+    def __enter__(self) -> _NoopStage:
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        return None
+
+
+_NOOP = _NoopStage()
+
+
+def stage(name: str) -> _Stage | _NoopStage:
+    return _Stage(name) if _enabled else _NOOP
+
+
+def timed(name: str) -> Callable[[F], F]:
+    """Dekorator: całe wywołanie funkcji jako etap `name`."""
+
+    def decorator(fn: F) -> F:
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with _Stage(name):
+                return fn(*args, **kwargs)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+# ------- zapytanie HTTP -------
+
+def begin_request() -> None:
+    _stages.set({} if _enabled else None)
+
+
+def end_request() -> dict[str, float]:
+    stages = _stages.get() or {}
+    _stages.set(None)
+    return stages
+
+
+def server_timing(stages: dict[str, float], total_s: float | None = None) -> str:
+    """Wartość nagłówka Server-Timing, np. `dataset;dur=12.4, analyze;dur=3.1, app;dur=18.0`."""
+    parts = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in stages.items()]
+    if total_s is not None:
+        parts.append(f"app;dur={total_s * 1000:.1f}")
+    return ", ".join(parts)
+
+
+def init_app(app: Flask) -> None:
+    """Hooki Flask: czas każdego zapytania + Server-Timing z etapami, które wykonały się w jego wątku."""
+    configure(app.config.get("METRICS_ENABLED", False))
+    if not _enabled:
+        return
+    send_timing = bool(app.config.get("SERVER_TIMING", True))
+
+    @app.before_request
+    def _start_timer() -> None:
+        g.metrics_started = time.perf_counter()
+        begin_request()
+
+    @app.after_request
+    def _finish_timer(response: Any) -> Any:
+        started = g.pop("metrics_started", None)
+        stages = end_request()
+        if started is None:
+            return response
+        elapsed = time.perf_counter() - started
+        registry.observe(
+            "http_request_duration_seconds",
+            elapsed,
+            endpoint=request.endpoint or "unknown",
+            method=request.method,
+            status=response.status_code,
+        )
+        if send_timing:
+            response.headers["Server-Timing"] = server_timing(stages, elapsed)
+        return response
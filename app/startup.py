@@ -0,0 +1,113 @@
+"""
+Pomiar zimnego startu: `python -X importtime` + create_app() w osobnym, świeżym procesie
+(jak start kontenera albo workera gunicorna). Raport pokazuje czas importów i create_app,
+pakiety, które kosztują najwięcej, oraz ciężkie moduły załadowane już przy starcie.
+
+    flask startup-report --top 10 --budget-ms 800
+"""
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Mapping
+
+# moduły, które powinny ładować się dopiero przy pierwszym użyciu (lazy.py, importy w funkcjach)
+HEAVY_MODULES = ("pandas", "numpy", "matplotlib", "openpyxl", "pyarrow", "requests", "httpx")
+
+_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+create_app()
+done = time.perf_counter()
+heavy = [m for m in json.loads(sys.argv[1]) if m in sys.modules]
+print(json.dumps({"import_s": imported - started, "create_app_s": done - imported, "heavy": heavy}))
+"""
+
+
+@dataclass(frozen=True)
+class ImportTiming:
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+@dataclass
+class StartupReport:
+    import_s: float
+    create_app_s: float
+    heavy_loaded: list[str]
+    imports: list[ImportTiming] = field(default_factory=list)
+
+    @property
+    def total_s(self) -> float:
+        return self.import_s + self.create_app_s
+
+    def packages(self, top: int = 15) -> list[tuple[str, float]]:
+        """Czas własny importów zsumowany po pakiecie najwyższego poziomu (ms), malejąco."""
+        totals: dict[str, int] = {}
+        for t in self.imports:
+            root = t.module.split(".", 1)[0]
+            totals[root] = totals.get(root, 0) + t.self_us
+        ranked = sorted(totals.items(), key=lambda kv: kv[1], reverse=True)[:top]
+        return [(name, us / 1000) for name, us in ranked]
+
+    def as_dict(self, top: int = 15) -> dict[str, Any]:
+        return {
+            "total_ms": round(self.total_s * 1000, 1),
+            "import_ms": round(self.import_s * 1000, 1),
+            "create_app_ms": round(self.create_app_s * 1000, 1),
+            "heavy_loaded": self.heavy_loaded,
+            "packages_ms": {name: round(ms, 1) for name, ms in self.packages(top)},
+        }
+
+
+def parse_importtime(text: str) -> list[ImportTiming]:
+    """Wiersze `import time: <self> | <cumulative> | <moduł>` z stderr `python -X importtime`."""
+    out = []
+    for line in text.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:") :].split("|")
+        if len(parts) != 3:
+            continue
+        try:
+            self_us, cumulative_us = int(parts[0]), int(parts[1])
+        except ValueError:
+            continue  # nagłówek: self [us] | cumulative | imported package
+        name = parts[2].rstrip()
+        module = name.lstrip(" ")
+        # wcięcie: jedna spacja separatora + dwie na poziom zagnieżdżenia
+        depth = max(0, (len(name) - len(module) - 1) // 2)
+        out.append(ImportTiming(module, self_us, cumulative_us, depth))
+    return out
+
+
+def measure_startup(env: Mapping[str, str] | None = None, cwd: Path | None = None, timeout_s: float = 120.0) -> StartupReport:
+    """Uruchamia create_app() w nowym interpreterze (bez harmonogramu odświeżania) i zbiera czasy."""
+    proc_env = {**os.environ, "REFRESH_SCHEDULER": "0", **(env or {})}
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _PROBE, json.dumps(HEAVY_MODULES)],
+        cwd=str(cwd or Path(__file__).resolve().parent.parent),
+        env=proc_env,
+        capture_output=True,
+        text=True,
+        timeout=timeout_s,
+    )
+    lines = proc.stdout.strip().splitlines()
+    if proc.returncode != 0 or not lines:
+        errors = [ln for ln in proc.stderr.splitlines() if not ln.startswith("import time:")]
+        raise RuntimeError("Startup probe failed: " + ("\n".join(errors[-5:]) or f"exit code {proc.returncode}"))
+    probe = json.loads(lines[-1])
+    return StartupReport(
+        import_s=float(probe["import_s"]),
+        create_app_s=float(probe["create_app_s"]),
+        heavy_loaded=list(probe["heavy"]),
+        imports=parse_importtime(proc.stderr),
+    )
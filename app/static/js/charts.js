@@ -0,0 +1,164 @@
+(function () {
+  'use strict';
+
+  // Wykresy rysowane w przeglądarce z /api/charts/<nazwa> (tryb CHART_MODE=client).
+  // Kolory i opisy jak w wersji PNG (app/data/charts.py).
+  if (typeof Chart === 'undefined') return;
+
+  const COLOR_UNEMP = '#2563eb';
+  const COLOR_WAGE = '#f59e0b';
+  const COLOR_GRID = '#e2e8f0';
+  const COLOR_TEXT = '#0f172a';
+
+  Chart.defaults.color = COLOR_TEXT;
+  Chart.defaults.font.family = 'Inter, system-ui, sans-serif';
+  Chart.defaults.font.size = 12;
+  Chart.defaults.maintainAspectRatio = false;
+
+  function emptyMessage(canvas, text) {
+    const p = document.createElement('div');
+    p.className = 'text-muted fw-semibold';
+    p.textContent = text;
+    canvas.replaceWith(p);
+  }
+
+  // gradient YlOrRd w uproszczeniu: od jasnożółtego do bordowego
+  function heatColor(t) {
+    const stops = [[255, 255, 204], [254, 178, 76], [240, 59, 32], [128, 0, 38]];
+    const x = Math.min(Math.max(t, 0), 1) * (stops.length - 1);
+    const i = Math.min(Math.floor(x), stops.length - 2);
+    const f = x - i;
+    const c = stops[i].map((v, k) => Math.round(v + (stops[i + 1][k] - v) * f));
+    return `rgb(${c[0]}, ${c[1]}, ${c[2]})`;
+  }
+
+  function norm(values) {
+    const nums = values.filter((v) => v !== null);
+    const lo = Math.min(...nums);
+    const hi = Math.max(...nums);
+    return (v) => (hi > lo ? (v - lo) / (hi - lo) : 0.5);
+  }
+
+  const builders = {
+    trend(data) {
+      if (!data.years.length) return null;
+      return {
+        type: 'line',
+        data: {
+          labels: data.years,
+          datasets: [
+            { label: 'Bezrobocie (%)', data: data.unemployment_rate, borderColor: COLOR_UNEMP,
+              backgroundColor: COLOR_UNEMP, borderWidth: 2.6, pointRadius: 3, yAxisID: 'y' },
+            { label: 'Płace (zł)', data: data.avg_wage, borderColor: COLOR_WAGE, backgroundColor: COLOR_WAGE,
+              borderWidth: 2.6, pointRadius: 3, pointStyle: 'rect', yAxisID: 'y1' },
+          ],
+        },
+        options: {
+          plugins: { title: { display: true, text: data.title || 'Trend: bezrobocie i płace (średnia po województwach)' } },
+          scales: {
+            x: { title: { display: true, text: 'Rok' }, grid: { display: false } },
+            y: { position: 'left', title: { display: true, text: 'Bezrobocie (%)' }, grid: { color: COLOR_GRID } },
+            y1: { position: 'right', title: { display: true, text: 'Płace (zł)' }, grid: { drawOnChartArea: false } },
+          },
+        },
+      };
+    },
+
+    bar_unemp(data) {
+      if (!data.values.length) return null;
+      // najwyższe bezrobocie na górze, jak w PNG
+      const labels = data.labels.slice().reverse();
+      const values = data.values.slice().reverse();
+      const n = norm(values);
+      return {
+        type: 'bar',
+        data: {
+          labels,
+          datasets: [{ label: 'Stopa bezrobocia (%)', data: values,
+            backgroundColor: values.map((v) => heatColor(n(v))), borderColor: '#ffffff', borderWidth: 0.8 }],
+        },
+        options: {
+          indexAxis: 'y',
+          plugins: {
+            legend: { display: false },
+            title: { display: true, text: data.title || `Stopa bezrobocia – województwa (${data.year})` },
+            tooltip: { callbacks: { label: (ctx) => `${ctx.parsed.x.toFixed(2)}%` } },
+          },
+          scales: {
+            x: { title: { display: true, text: 'Stopa bezrobocia (%)' }, grid: { color: COLOR_GRID } },
+            y: { grid: { display: false }, ticks: { autoSkip: false } },
+          },
+        },
+      };
+    },
+
+    scatter(data) {
+      if (!data.points.length) return null;
+      const n = norm(data.points.map((p) => p[1]));
+      return {
+        type: 'scatter',
+        data: {
+          datasets: [{
+            label: 'Jednostki',
+            data: data.points.map((p, i) => ({ x: p[0], y: p[1], label: data.labels[i] })),
+            // setki/tysiące punktów (powiaty, gminy) – mniejsze kropki
+            pointRadius: data.points.length > 30 ? 2.5 : 6,
+            pointBackgroundColor: data.points.map((p) => heatColor(n(p[1]))),
+            pointBorderColor: '#ffffff',
+          }],
+        },
+        options: {
+          plugins: {
+            legend: { display: false },
+            title: { display: true, text: data.title || `Zależność: wynagrodzenie vs bezrobocie (${data.year})` },
+            tooltip: { callbacks: { label: (ctx) => `${ctx.raw.label}: ${ctx.raw.x} zł, ${ctx.raw.y}%` } },
+          },
+          scales: {
+            x: { title: { display: true, text: 'Przeciętne wynagrodzenie (zł)' }, grid: { color: COLOR_GRID } },
+            y: { title: { display: true, text: 'Stopa bezrobocia (%)' }, grid: { color: COLOR_GRID } },
+          },
+        },
+      };
+    },
+
+    hist_unemp(data) {
+      if (!data.counts || !data.counts.length) return null;
+      const labels = data.counts.map((_, i) => `${data.edges[i]}–${data.edges[i + 1]}`);
+      return {
+        type: 'bar',
+        data: {
+          labels,
+          datasets: [{ label: 'Liczba jednostek', data: data.counts, backgroundColor: COLOR_UNEMP,
+            borderColor: '#ffffff', borderWidth: 0.8, barPercentage: 1.0, categoryPercentage: 1.0 }],
+        },
+        options: {
+          plugins: { legend: { display: false }, title: { display: true, text: data.title } },
+          scales: {
+            x: { title: { display: true, text: 'Stopa bezrobocia (%)' }, grid: { display: false } },
+            y: { title: { display: true, text: 'Liczba jednostek' }, grid: { color: COLOR_GRID } },
+          },
+        },
+      };
+    },
+  };
+
+  document.querySelectorAll('canvas[data-chart]').forEach((canvas) => {
+    const build = builders[canvas.dataset.chart];
+    if (!build) return;
+
+    fetch(canvas.dataset.src, { credentials: 'same-origin', headers: { Accept: 'application/json' } })
+      .then((r) => {
+        if (!r.ok) throw new Error(`HTTP ${r.status}`);
+        return r.json();
+      })
+      .then((data) => {
+        const config = build(data);
+        if (!config) {
+          emptyMessage(canvas, 'Brak danych do wykresu');
+          return;
+        }
+        new Chart(canvas, config);
+      })
+      .catch(() => emptyMessage(canvas, 'Nie udało się pobrać danych wykresu'));
+  });
+})();
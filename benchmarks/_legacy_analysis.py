@@ -0,0 +1,151 @@
+"""
+Implementacja analizy sprzed wektoryzacji (kopia `analyze` z app/data/analysis.py).
+
+Trzymana tylko jako punkt odniesienia: benchmarks/bench_analysis.py mierzy nowe jądro
+względem niej, a tests/test_analysis.py sprawdza, że wyniki się zgadzają.
+"""
+from __future__ import annotations
+
+import pandas as pd
+
+from app.data.analysis import AnalysisResult
+from app.data.pipeline import unit_level_labels
+
+
+def _auto_fix_scales(data: pd.DataFrame) -> pd.DataFrame:
+    
+    d = data.copy()
+
+    if "unemployment_rate" in d.columns and d["unemployment_rate"].notna().any():
+        med = float(d["unemployment_rate"].dropna().median())
+        if 0 < med <= 1.0:
+            d["unemployment_rate"] = d["unemployment_rate"] * 100.0
+
+    if "avg_wage" in d.columns and d["avg_wage"].notna().any():
+        med = float(d["avg_wage"].dropna().median())
+        # 95 -> 9500; 120 -> 12000 itp.
+        if 1.0 < med < 500.0:
+            d["avg_wage"] = d["avg_wage"] * 100.0
+
+    return d
+
+
+def analyze(df: pd.DataFrame, unit_level: int = 2) -> AnalysisResult:
+    data = df.copy()
+    unit_label = unit_level_labels(unit_level).label
+
+    # typy
+    data["year"] = pd.to_numeric(data.get("year"), errors="coerce").astype("Int64")
+    data["unemployment_rate"] = pd.to_numeric(data.get("unemployment_rate"), errors="coerce")
+    data["avg_wage"] = pd.to_numeric(data.get("avg_wage"), errors="coerce")
+
+    # nazwy/ID (bez "nan")
+    if "unitId" not in data.columns:
+        data["unitId"] = ""
+    if "unitName" not in data.columns:
+        data["unitName"] = ""
+
+    # cache trzyma je jako category – czyścimy tylko, gdy przyszły surowe
+    for col in ("unitId", "unitName"):
+        if not isinstance(data[col].dtype, pd.CategoricalDtype):
+            data[col] = data[col].fillna("").astype(str).replace("nan", "").str.strip()
+
+    # skale
+    data = _auto_fix_scales(data)
+
+    # Guard: brak danych
+    if data.empty or data["year"].dropna().empty:
+        summary = {
+            "latest_unemp_year": None,
+            "latest_wage_year": None,
+            "latest_both_year": None,
+            "avg_unemployment_latest": None,
+            "avg_wage_latest": None,
+            "corr_unemp_vs_wage_latest": None,
+        }
+        empty_rank = pd.DataFrame(columns=[unit_label, "Stopa bezrobocia (%)", "Przeciętne wynagrodzenie (zł)"])
+        tables = {"ranking": empty_rank, "top5": empty_rank, "bottom5": empty_rank}
+        return AnalysisResult(summary=summary, tables=tables, unit_level=unit_level)
+
+    # lata dostępności osobno
+    unemp_years = data.dropna(subset=["unemployment_rate", "year"])["year"]
+    wage_years = data.dropna(subset=["avg_wage", "year"])["year"]
+    both_years = data.dropna(subset=["unemployment_rate", "avg_wage", "year"])["year"]
+
+    latest_unemp_year = int(unemp_years.max()) if not unemp_years.empty else None
+    latest_wage_year = int(wage_years.max()) if not wage_years.empty else None
+    latest_both_year = int(both_years.max()) if not both_years.empty else None
+
+    latest_unemp = data[data["year"] == latest_unemp_year].copy() if latest_unemp_year else pd.DataFrame()
+    latest_wage = data[data["year"] == latest_wage_year].copy() if latest_wage_year else pd.DataFrame()
+    latest_both = data[data["year"] == latest_both_year].copy() if latest_both_year else pd.DataFrame()
+
+    both = latest_both.dropna(subset=["unemployment_rate", "avg_wage"]).copy()
+
+    # korelacja tylko jeśli ma sens
+    corr = None
+    if len(both) >= 3:
+        if both["avg_wage"].nunique(dropna=True) >= 2 and both["unemployment_rate"].nunique(dropna=True) >= 2:
+            c = both["unemployment_rate"].corr(both["avg_wage"])
+            if pd.notna(c):
+                corr = float(c)
+
+    summary = {
+        "latest_unemp_year": latest_unemp_year,
+        "latest_wage_year": latest_wage_year,
+        "latest_both_year": latest_both_year,
+        "avg_unemployment_latest": float(latest_unemp["unemployment_rate"].dropna().mean()) if not latest_unemp.empty else None,
+        "avg_wage_latest": float(latest_wage["avg_wage"].dropna().mean()) if not latest_wage.empty else None,
+        "corr_unemp_vs_wage_latest": corr,
+    }
+
+
+    rank_src = latest_unemp.dropna(subset=["unemployment_rate"])[["unitId", "unitName", "unemployment_rate"]].copy()
+
+    if latest_wage_year is not None and not latest_wage.empty:
+        wage_for_ranking = latest_wage[["unitId", "avg_wage"]].copy()
+    else:
+        wage_for_ranking = pd.DataFrame(columns=["unitId", "avg_wage"])
+
+    rank_src = rank_src.merge(wage_for_ranking, on="unitId", how="left")
+
+    # displayName: unitName jeśli jest, inaczej "ID: <unitId>"
+    rank_src["displayName"] = rank_src["unitName"].astype(str).where(
+        rank_src["unitName"].astype(str).str.len() > 0,
+        "ID: " + rank_src["unitId"].astype(str),
+    )
+
+    ranking = (
+        rank_src.sort_values("unemployment_rate", ascending=False)[["displayName", "unemployment_rate", "avg_wage"]]
+        .rename(
+            columns={
+                "displayName": unit_label,
+                "unemployment_rate": "Stopa bezrobocia (%)",
+                "avg_wage": "Przeciętne wynagrodzenie (zł)",
+            }
+        )
+        .reset_index(drop=True)
+    )
+
+    tables = {
+        "ranking": ranking,
+        "top5": ranking.head(5),
+        "bottom5": ranking.tail(5).sort_values("Stopa bezrobocia (%)", ascending=True) if not ranking.empty else ranking,
+    }
+
+    yearly = (
+        data.groupby("year", dropna=True)[["unemployment_rate", "avg_wage"]]
+        .mean(numeric_only=True)
+        .reset_index()
+        .dropna(subset=["year"])
+        .sort_values("year")
+    )
+
+    return AnalysisResult(
+        summary=summary,
+        tables=tables,
+        yearly=yearly,
+        latest_unemp=latest_unemp.dropna(subset=["unemployment_rate"]) if not latest_unemp.empty else latest_unemp,
+        both=both,
+        unit_level=unit_level,
+    )
@@ -0,0 +1,80 @@
+"""
+Normalizacja sprzed wersji strumieniowej (kopia `_normalize` z app/data/pipeline.py).
+
+Trzymana tylko jako punkt odniesienia: benchmarks/bench_normalize.py mierzy nową
+normalizację względem niej, a tests/test_normalize.py sprawdza, że wyniki się zgadzają.
+"""
+from __future__ import annotations
+
+from typing import Any
+
+import pandas as pd
+
+
+def normalize(rows: list[dict[str, Any]], metric: str) -> pd.DataFrame:
+    """
+    Obsługuje dwa formaty, które realnie pojawiają się w BDL:
+    A) płaski: { unitId, unitName, year, val }
+    B) zagnieżdżony: { id/unitId, name/unitName, values: [{year,val}, ...] }
+    """
+    df = pd.DataFrame(rows)
+    if df.empty:
+        return pd.DataFrame(columns=["year", "unitId", "unitName", metric])
+
+    # ------- helpers: unitId/unitName mogą się nazywać różnie -------
+    def series_or_empty(colnames: list[str]) -> pd.Series:
+        for c in colnames:
+            if c in df.columns:
+                s = df[c]
+                if isinstance(s, pd.Series):
+                    return s
+        return pd.Series([""] * len(df), index=df.index)
+
+    unit_id_raw = series_or_empty(["unitId", "unit_id", "id"])
+    unit_name_raw = series_or_empty(["unitName", "unit_name", "name"])
+
+    unit_id = unit_id_raw.fillna("").astype(str).replace("nan", "").str.strip()
+    unit_name = unit_name_raw.fillna("").astype(str).replace("nan", "").str.strip()
+
+    # ------- CASE A: płaski -------
+    if "year" in df.columns and "val" in df.columns:
+        val_s = df["val"].fillna("").astype(str).str.replace(" ", "", regex=False).str.replace(",", ".", regex=False)
+        out = pd.DataFrame(
+            {
+                "year": pd.to_numeric(df["year"], errors="coerce").astype("Int64"),
+                "unitId": unit_id,
+                "unitName": unit_name,
+                metric: pd.to_numeric(val_s, errors="coerce"),
+            }
+        )
+        return out.dropna(subset=["year"]).reset_index(drop=True)
+
+    # ------- CASE B: values list -------
+    if "values" in df.columns:
+        base = df.copy()
+        base["unitId"] = unit_id
+        base["unitName"] = unit_name
+
+        exploded = base.explode("values", ignore_index=True)
+        exploded = exploded[exploded["values"].notna()].copy()
+        if exploded.empty:
+            return pd.DataFrame(columns=["year", "unitId", "unitName", metric])
+
+        vals = pd.json_normalize(exploded["values"])
+        if "year" not in vals.columns or "val" not in vals.columns:
+            return pd.DataFrame(columns=["year", "unitId", "unitName", metric])
+
+        val_s = vals["val"].fillna("").astype(str).str.replace(" ", "", regex=False).str.replace(",", ".", regex=False)
+
+        out = pd.DataFrame(
+            {
+                "year": pd.to_numeric(vals["year"], errors="coerce").astype("Int64"),
+                "unitId": exploded["unitId"].reset_index(drop=True),
+                "unitName": exploded["unitName"].reset_index(drop=True),
+                metric: pd.to_numeric(val_s, errors="coerce"),
+            }
+        )
+        return out.dropna(subset=["year"]).reset_index(drop=True)
+
+    # nieznany format
+    return pd.DataFrame(columns=["year", "unitId", "unitName", metric])
@@ -0,0 +1,32 @@
+"""
+Jądro analizy: wektoryzowane analyze() vs implementacja sprzed przepisania (pytest-benchmark).
+
+    python -m pytest benchmarks/bench_analysis.py
+    python -m pytest benchmarks/bench_analysis.py --benchmark-json=analysis.json
+
+Dane wejściowe jak z cache (apply_schema: Int16 / category / float32), 20 lat.
+"""
+from __future__ import annotations
+
+import pytest
+
+from app.data.analysis import analyze
+from app.data.cache import apply_schema
+from benchmarks._legacy_analysis import analyze as legacy_analyze
+from benchmarks.cache_formats import synthetic_dataset
+
+YEARS = 20
+IMPLEMENTATIONS = {"legacy": legacy_analyze, "vectorized": analyze}
+
+
+@pytest.fixture(scope="module", params=[16, 400, 2500], ids=lambda n: f"{n}-units")
+def dataset(request):
+    return request.param, apply_schema(synthetic_dataset(request.param, YEARS))
+
+
+@pytest.mark.parametrize("impl", list(IMPLEMENTATIONS))
+def test_analyze(benchmark, dataset, impl):
+    units, df = dataset
+    benchmark.group = f"analyze: {units} units x {YEARS} years"
+    result = benchmark(IMPLEMENTATIONS[impl], df)
+    assert len(result.tables["ranking"]) == units
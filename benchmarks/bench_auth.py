@@ -0,0 +1,114 @@
+"""
+Przepustowość zalogowanych zapytań: koszt samego uwierzytelnienia (user_loader + sesja SQLite)
+przed i po cache tożsamości, WAL i puli połączeń.
+
+    python -m pytest benchmarks/bench_auth.py --benchmark-autosave
+    python -m pytest benchmarks/bench_auth.py --benchmark-compare
+
+`baseline` – user_loader pyta bazę na każde zapytanie, domyślne ustawienia SQLite;
+`tuned` – ustawienia z Config (USER_CACHE_TTL_S, SQLITE_PRAGMAS, SQLALCHEMY_ENGINE_OPTIONS).
+Wariant `with-writes` dokłada wątek rejestrujący użytkowników w trakcie pomiaru (/register).
+Zapytania na sekundę trafiają do extra_info.
+"""
+from __future__ import annotations
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from itertools import count
+
+import pytest
+from flask_login import current_user, login_required
+
+from app import create_app
+from app.config import Config
+from app.extensions import db
+
+THREADS = 8
+REQUESTS_PER_THREAD = 50
+PASSWORD = "password123"
+
+SETUPS = {
+    "baseline": {"USER_CACHE_TTL_S": 0, "SQLITE_PRAGMAS": "", "SQLALCHEMY_ENGINE_OPTIONS": {}},
+    "tuned": {},
+}
+
+
+def _make_app(root, overrides):
+    class BenchConfig(Config):
+        TESTING = True
+        WTF_CSRF_ENABLED = False
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{root / 'app.sqlite3'}"
+        CACHE_DIR = str(root / "cache")
+        REFRESH_SCHEDULER = False
+        METRICS_ENABLED = False
+
+    for k, v in overrides.items():
+        setattr(BenchConfig, k, v)
+    app = create_app(BenchConfig)
+
+    @login_required
+    def whoami():
+        return {"email": current_user.email}
+
+    # sam koszt uwierzytelnienia – bez danych dashboardu
+    app.add_url_rule("/_bench/whoami", "bench_whoami", whoami)
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def _logged_in_client(app, email):
+    client = app.test_client()
+    client.post("/register", data={"email": email, "password": PASSWORD, "password2": PASSWORD})
+    client.post("/login", data={"email": email, "password": PASSWORD})
+    return client
+
+
+@pytest.fixture(scope="module", params=list(SETUPS), ids=list(SETUPS))
+def auth_app(request, tmp_path_factory):
+    app = _make_app(tmp_path_factory.mktemp(request.param), SETUPS[request.param])
+    clients = [_logged_in_client(app, f"u{i}@bench.pl") for i in range(THREADS)]
+    return request.param, app, clients
+
+
+def _burst(pool, clients):
+    def run(client):
+        for _ in range(REQUESTS_PER_THREAD):
+            assert client.get("/_bench/whoami").status_code == 200
+
+    list(pool.map(run, clients))
+
+
+@pytest.mark.parametrize("writes", [False, True], ids=["read-only", "with-writes"])
+@pytest.mark.parametrize("threads", [1, THREADS], ids=["1-thread", f"{THREADS}-threads"])
+def test_authenticated_throughput(benchmark, auth_app, threads, writes):
+    setup, app, all_clients = auth_app
+    clients = all_clients[:threads]
+    benchmark.group = f"auth: {threads} thread(s) x {REQUESTS_PER_THREAD} requests ({'with' if writes else 'no'} writes)"
+    stop = threading.Event()
+    writer_client = app.test_client()
+    emails = count()
+
+    def writer():
+        while not stop.is_set():
+            n = next(emails)
+            writer_client.post(
+                "/register",
+                data={"email": f"w{setup}{n}@bench.pl", "password": PASSWORD, "password2": PASSWORD},
+            )
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        thread = threading.Thread(target=writer, daemon=True) if writes else None
+        if thread:
+            thread.start()
+        try:
+            benchmark.pedantic(_burst, args=(pool, clients), rounds=5, iterations=1, warmup_rounds=1)
+        finally:
+            stop.set()
+            if thread:
+                thread.join(timeout=10)
+
+    total = threads * REQUESTS_PER_THREAD
+    benchmark.extra_info["setup"] = setup
+    benchmark.extra_info["requests_per_s"] = round(total / benchmark.stats.stats.mean, 1)
+    benchmark.extra_info["registrations"] = next(emails) if writes else 0
@@ -0,0 +1,155 @@
+"""
+Pomiary end-to-end na lokalnej atrapie BDL (tests/fake_bdl.py) – bez sieci, powtarzalnie.
+
+    python -m pytest benchmarks/bench_e2e.py --benchmark-autosave
+    python -m pytest benchmarks/bench_e2e.py --benchmark-compare   # vs ostatni zapis w .benchmarks/
+    python -m pytest benchmarks/bench_e2e.py --benchmark-json=e2e.json
+
+Mierzone ścieżki: zimne odświeżenie z BDL (województwa, gminy), ciepły dashboard (memo + 304), API,
+generowanie eksportów i renderowanie wykresów. Atrapa ma opóźnienie i co N-te zapytanie
+oddaje 429, więc pomiar obejmuje też stronicowanie, ponowienia i Retry-After.
+Liczba zapytań do atrapy trafia do extra_info, obok czasów w pliku JSON.
+"""
+from __future__ import annotations
+
+import asyncio
+from pathlib import Path
+
+import pytest
+
+from app import create_app
+from app.dashboard.exports import EXPORT_FORMATS, export_available, get_export
+from app.data import pipeline
+from app.data.analysis import analyze, build_aggregates, render_charts
+from app.data.charts import ChartRenderer
+from app.extensions import db
+from tests.fake_bdl import FakeBDL, FakeBDLConfig, serve
+
+LATENCY_S = 0.005
+THROTTLE_EVERY = 40
+START_YEAR = 2015
+BDL_OPTIONS = {"backoff_base_s": 0.05, "max_workers": 4}
+
+
+@pytest.fixture(scope="module")
+def fake_bdl():
+    bdl = FakeBDL(
+        FakeBDLConfig(latency_s=LATENCY_S, throttle_every=THROTTLE_EVERY, retry_after_s=0.05)
+    )
+    with serve(bdl) as url:
+        bdl.url = url
+        yield bdl
+
+
+def _refresh(url: str, cache_dir: Path, level: int, use_async: bool = False):
+    kwargs = dict(bdl_options=BDL_OPTIONS, dataset_options={"unit_level": level, "start_year": START_YEAR})
+    if use_async:
+        return asyncio.run(pipeline.refresh_dataset_async(cache_dir, None, url, max_concurrency=16, **kwargs))
+    return pipeline.refresh_dataset(cache_dir, None, url, **kwargs)
+
+
+@pytest.fixture(scope="module")
+def gminy(fake_bdl, tmp_path_factory):
+    return _refresh(fake_bdl.url, tmp_path_factory.mktemp("gminy"), level=6)
+
+
+def _record_requests(benchmark, bdl: FakeBDL, before: int, rounds: int) -> None:
+    benchmark.extra_info["bdl_requests_per_round"] = (sum(bdl.requests.values()) - before) // rounds
+    benchmark.extra_info["bdl_429"] = bdl.throttled
+
+
+@pytest.mark.parametrize("use_async", [False, True], ids=["threads", "asyncio"])
+@pytest.mark.parametrize("level", [2, 6], ids=["wojewodztwa", "gminy"])
+def test_cold_refresh(benchmark, fake_bdl, tmp_path, level, use_async):
+    benchmark.group = f"e2e: cold refresh (level {level})"
+    rounds = 3
+    dirs = iter(tmp_path / f"round-{i}" for i in range(rounds + 1))
+    before = sum(fake_bdl.requests.values())
+
+    df = benchmark.pedantic(
+        _refresh, setup=lambda: ((fake_bdl.url, next(dirs), level, use_async), {}), rounds=rounds, iterations=1
+    )
+    _record_requests(benchmark, fake_bdl, before, rounds)
+    assert df["unitId"].nunique() == fake_bdl.config.units[level]
+
+
+@pytest.fixture(scope="module")
+def dashboard_client(fake_bdl, tmp_path_factory):
+    root = tmp_path_factory.mktemp("app")
+
+    class BenchConfig:
+        SECRET_KEY = "bench"
+        TESTING = True
+        WTF_CSRF_ENABLED = False
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{root / 'app.sqlite3'}"
+        SQLALCHEMY_TRACK_MODIFICATIONS = False
+        CACHE_DIR = str(root / "cache")
+        CACHE_MAX_AGE_HOURS = 24
+        BDL_BASE_URL = fake_bdl.url
+        BDL_CLIENT_ID = ""
+        BDL_START_YEAR = START_YEAR
+        CHART_RENDER_MODE = "inline"
+        REFRESH_SCHEDULER = False
+
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.create_all()
+    client = app.test_client()
+    client.post("/register", data={"email": "b@bench.pl", "password": "password123", "password2": "password123"})
+    client.post("/login", data={"email": "b@bench.pl", "password": "password123"})
+    for level in (2, 6):
+        client.get(f"/dashboard?level={level}")  # zimne odświeżenie + wykresy poza pomiarem
+    return client
+
+
+@pytest.mark.parametrize("level", [2, 6], ids=["wojewodztwa", "gminy"])
+@pytest.mark.parametrize("conditional", [False, True], ids=["200", "304"])
+def test_warm_dashboard(benchmark, dashboard_client, level, conditional):
+    benchmark.group = "e2e: warm dashboard"
+    url = f"/dashboard?level={level}"
+    headers = {}
+    if conditional:
+        headers["If-None-Match"] = dashboard_client.get(url).headers["ETag"]
+
+    r = benchmark(dashboard_client.get, url, headers=headers)
+    assert r.status_code == (304 if conditional else 200)
+
+
+@pytest.mark.parametrize(
+    "url",
+    ["/api/series?level=6&unit=060001000000&from=2018", "/api/ranking?level=6&limit=100&offset=500"],
+    ids=["series", "ranking"],
+)
+def test_warm_api(benchmark, dashboard_client, url):
+    benchmark.group = "e2e: warm API (gminy)"
+    dashboard_client.get(url)  # indeks wersji budowany poza pomiarem
+
+    r = benchmark(dashboard_client.get, url)
+    assert r.status_code == 200
+
+
+@pytest.mark.parametrize("name", [n for n in EXPORT_FORMATS if export_available(n)])
+def test_export(benchmark, gminy, tmp_path, name):
+    benchmark.group = "e2e: export (gminy, cold)"
+    aggregates = build_aggregates(gminy, unit_level=6)
+    data = {"summary": aggregates["summary"], "tables": aggregates["tables"], "unit_level": 6, "version": None}
+    dirs = iter(tmp_path / f"round-{i}" for i in range(6))
+
+    path = benchmark.pedantic(
+        lambda d: get_export(d, data, name), setup=lambda: ((next(dirs),), {}), rounds=5, iterations=1
+    )
+    assert path.stat().st_size > 0
+
+
+@pytest.mark.parametrize("level", [2, 6], ids=["wojewodztwa", "gminy"])
+def test_chart_rendering(benchmark, fake_bdl, gminy, tmp_path, level):
+    benchmark.group = "e2e: chart rendering (cold)"
+    df = gminy if level == 6 else _refresh(fake_bdl.url, tmp_path / "cache", level=2)
+    result = analyze(df, unit_level=level)
+    renderer = ChartRenderer(mode="inline")
+    dirs = iter(tmp_path / f"charts-{i}" for i in range(4))
+
+    paths = benchmark.pedantic(
+        lambda d: render_charts(result, d, renderer), setup=lambda: ((next(dirs),), {}), rounds=3, iterations=1
+    )
+    assert set(paths) >= {"trend", "bar_unemp", "scatter"}
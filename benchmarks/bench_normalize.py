@@ -0,0 +1,70 @@
+"""
+Normalizacja stron BDL: strumieniowe normalize_pages vs implementacja sprzed zmiany (pytest-benchmark).
+
+    python -m pytest benchmarks/bench_normalize.py
+    python -m pytest benchmarks/bench_normalize.py --benchmark-json=normalize.json
+
+Strony są generowane leniwie jak z klienta (100 wierszy na stronę). Stara wersja dostaje
+listę wszystkich wierszy, jak dawniej z get_data_by_variable. Szczyt pamięci
+(tracemalloc) ląduje w extra_info każdego pomiaru.
+"""
+from __future__ import annotations
+
+import itertools
+import tracemalloc
+
+import pytest
+
+from app.data.normalize import normalize_pages
+from benchmarks._legacy_normalize import normalize as legacy_normalize
+
+YEARS = list(range(2015, 2025))
+PAGE_SIZE = 100
+
+
+def synthetic_pages(units: int, nested: bool):
+    """Strony w formacie BDL: płaskim (wiersz = jednostka + rok) albo zagnieżdżonym (values)."""
+    if nested:
+        rows = (
+            {
+                "id": f"{i:012d}",
+                "name": f"GMINA {i}",
+                "values": [{"year": str(y), "val": f"{(i % 200) / 10 + y % 7:.1f}".replace(".", ","), "attrId": 1} for y in YEARS],
+            }
+            for i in range(units)
+        )
+    else:
+        rows = (
+            {"unitId": f"{i:012d}", "unitName": f"GMINA {i}", "year": y, "val": (i % 200) / 10 + y % 7}
+            for i in range(units)
+            for y in YEARS
+        )
+    while page := list(itertools.islice(rows, PAGE_SIZE)):
+        yield page
+
+
+IMPLEMENTATIONS = {
+    "legacy": lambda pages: legacy_normalize([row for page in pages for row in page], "m"),
+    "streaming": lambda pages: normalize_pages(pages, "m"),
+}
+
+
+def _peak_mb(impl, units: int, nested: bool) -> float:
+    tracemalloc.start()
+    try:
+        IMPLEMENTATIONS[impl](synthetic_pages(units, nested))
+        return tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+    finally:
+        tracemalloc.stop()
+
+
+@pytest.mark.parametrize("nested", [False, True], ids=["flat", "nested"])
+@pytest.mark.parametrize("units", [380, 2500], ids=lambda n: f"{n}-units")
+@pytest.mark.parametrize("impl", list(IMPLEMENTATIONS))
+def test_normalize(benchmark, impl, units, nested):
+    benchmark.group = f"normalize: {units} units x {len(YEARS)} years ({'nested' if nested else 'flat'})"
+    benchmark.extra_info["peak_mb"] = round(_peak_mb(impl, units, nested), 2)
+    out = benchmark.pedantic(
+        lambda: IMPLEMENTATIONS[impl](synthetic_pages(units, nested)), rounds=5, iterations=1
+    )
+    assert len(out) == units * len(YEARS)
@@ -0,0 +1,116 @@
+"""
+Porównanie formatów cache (czas odczytu i pamięć RSS).
+
+    python -m benchmarks.cache_formats --units 2500 --years 20 --repeat 5
+
+Każdy format jest odczytywany w osobnym procesie, żeby pomiar RSS nie mieszał się
+między formatami (alokator nie oddaje pamięci do systemu).
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from app.data.cache import FORMATS, HAS_PYARROW, load_cache, save_cache
+
+KEY = "bench"
+
+
+def synthetic_dataset(units: int, years: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    unit_ids = [f"{i:012d}" for i in range(units)]
+    year_vals = np.arange(2025 - years + 1, 2026)
+    df = pd.DataFrame(
+        {
+            "year": np.repeat(year_vals, units),
+            "unitId": np.tile(unit_ids, years),
+            "unitName": np.tile([f"JEDNOSTKA {i}" for i in range(units)], years),
+            "unemployment_rate": rng.uniform(2, 20, units * years).round(1),
+            "avg_wage": rng.uniform(4000, 12000, units * years).round(2),
+        }
+    )
+    # jak w BDL: płace publikowane z opóźnieniem
+    df.loc[df["year"] == year_vals[-1], "avg_wage"] = np.nan
+    return df
+
+
+def _rss_mb() -> float:
+    # bieżące RSS z /proc (Linux); gdzie indziej szczytowe ru_maxrss (KiB na Linuksie, bajty na macOS)
+    statm = Path("/proc/self/statm")
+    if statm.exists():
+        return int(statm.read_text().split()[1]) * resource.getpagesize() / (1024 * 1024)
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def _measure_child(cache_dir: str, fmt: str, repeat: int) -> None:
+    # rozgrzewka importów leniwych (pyarrow.feather itp.) poza pomiarem
+    load_cache(Path(cache_dir), KEY, fmt=fmt)
+    base = _rss_mb()
+    held = load_cache(Path(cache_dir), KEY, fmt=fmt)
+    rss_delta = _rss_mb() - base
+    del held
+
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        df = load_cache(Path(cache_dir), KEY, fmt=fmt)
+        times.append(time.perf_counter() - t0)
+        del df
+    print(json.dumps({"format": fmt, "load_s_best": min(times), "load_s_median": sorted(times)[len(times) // 2],
+                      "rss_delta_mb": rss_delta}))
+
+
+def run(units: int, years: int, repeat: int) -> list[dict]:
+    df = synthetic_dataset(units, years)
+    results = []
+    for fmt in FORMATS.values():
+        if fmt.requires_pyarrow and not HAS_PYARROW:
+            continue
+        with tempfile.TemporaryDirectory() as tmp:
+            save_cache(Path(tmp), KEY, df, source="benchmark", fmt=fmt.name)
+            size = sum(p.stat().st_size for p in Path(tmp).iterdir() if not p.name.endswith(".json"))
+            out = subprocess.run(
+                [sys.executable, "-m", "benchmarks.cache_formats", "--child", tmp, fmt.name, str(repeat)],
+                check=True, capture_output=True, text=True,
+            )
+            row = json.loads(out.stdout.strip().splitlines()[-1])
+            row["file_kb"] = size / 1024
+            results.append(row)
+    return results
+
+
+def main(argv: list[str] | None = None) -> None:
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["--child"]:
+        _measure_child(argv[1], argv[2], int(argv[3]))
+        return
+
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--units", type=int, default=16)
+    ap.add_argument("--years", type=int, default=11)
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--json", action="store_true", help="wynik jako JSON zamiast tabeli")
+    args = ap.parse_args(argv)
+
+    results = run(args.units, args.years, args.repeat)
+    if args.json:
+        print(json.dumps({"units": args.units, "years": args.years, "results": results}, indent=2))
+        return
+    print(f"{args.units} jednostek x {args.years} lat")
+    print(f"{'format':<10}{'plik KiB':>12}{'odczyt ms (best)':>20}{'RSS +MiB':>12}")
+    for r in results:
+        print(f"{r['format']:<10}{r['file_kb']:>12.1f}{r['load_s_best'] * 1000:>20.2f}{r['rss_delta_mb']:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,11 +4,25 @@ import pytest
 
 from app import create_app
 from app.extensions import db
+from tests.fake_bdl import FakeBDL, FakeBDLConfig, serve
+
+@pytest.fixture(scope="session")
+def fake_bdl():
+    """Lokalna atrapa BDL (mała: 16 województw) – testy nie zależą od sieci ani limitów GUS."""
+    bdl = FakeBDL(FakeBDLConfig(units={2: 16, 5: 40, 6: 120}))
+    with serve(bdl) as url:
+        bdl.url = url
+        yield bdl
 
 @pytest.fixture()
-def app():
+def app(request):
     db_fd, db_path = tempfile.mkstemp()
     os.close(db_fd)
+    # atrapa BDL tylko dla testów, które same proszą o fixture fake_bdl; pozostałe
+    # dostają adres nierozwiązywalny – przypadkowe zapytanie do BDL kończy się błędem
+    bdl_url = "http://bdl.invalid/api/v1"
+    if "fake_bdl" in request.fixturenames:
+        bdl_url = request.getfixturevalue("fake_bdl").url
 
     class TestConfig:
         SECRET_KEY = "test"
@@ -18,7 +32,7 @@ def app():
         SQLALCHEMY_TRACK_MODIFICATIONS = False
         CACHE_DIR = tempfile.mkdtemp()
         CACHE_MAX_AGE_HOURS = 0
-        BDL_BASE_URL = "https://bdl.stat.gov.pl/api/v1"
+        BDL_BASE_URL = bdl_url
         BDL_CLIENT_ID = ""
 
     app = create_app(TestConfig)
@@ -31,3 +45,54 @@ def app():
 @pytest.fixture()
 def client(app):
     return app.test_client()
+
+UNITS = [("011200000000", "MAŁOPOLSKIE"), ("020800000000", "LUBUSKIE"), ("030200000000", "DOLNOŚLĄSKIE")]
+
+
+def _make_frame(rates, wages=None, years=(2023,)):
+    """
+    Mały zbiór w układzie cache: dla każdego roku kolejne jednostki z UNITS.
+    `rates`/`wages` – wartości wiersz po wierszu (rok po roku); domyślne płace 7000, 8000, ...
+    """
+    import pandas as pd
+
+    n_units = len(rates) // len(years)
+    assert n_units * len(years) == len(rates) and n_units <= len(UNITS)
+    units = UNITS[:n_units] * len(years)
+    return pd.DataFrame(
+        {
+            "year": [y for y in years for _ in range(n_units)],
+            "unitId": [uid for uid, _ in units],
+            "unitName": [name for _, name in units],
+            "unemployment_rate": list(rates),
+            "avg_wage": list(wages) if wages is not None else [7000.0 + 1000.0 * i for i in range(len(rates))],
+        }
+    )
+
+
+@pytest.fixture()
+def make_frame():
+    return _make_frame
+
+
+@pytest.fixture()
+def seeded_cache(app):
+    """Świeży cache z małym zbiorem danych – dashboard nie musi pytać BDL."""
+    from pathlib import Path
+    from app.data.cache import save_cache
+    from app.data.pipeline import CACHE_KEY
+
+    df = _make_frame(
+        rates=[5.0, 6.0, 7.0, 4.5, 5.5, 6.5],
+        wages=[7000.0, 8000.0, 9000.0, 7500.0, 8500.0, None],
+        years=(2022, 2023),
+    )
+    app.config["CACHE_MAX_AGE_HOURS"] = 24
+    save_cache(Path(app.config["CACHE_DIR"]), CACHE_KEY, df, source="test")
+    return df
+
+@pytest.fixture()
+def auth_client(client):
+    client.post("/register", data={"email": "u@test.pl", "password": "password123", "password2": "password123"})
+    client.post("/login", data={"email": "u@test.pl", "password": "password123"})
+    return client
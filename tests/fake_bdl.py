@@ -0,0 +1,272 @@
+"""
+Lokalna atrapa API BDL (WSGI) do testów i benchmarków – bez sieci i bez limitów GUS.
+
+    python -m tests.fake_bdl --port 5001 --latency-ms 30 --throttle-every 25
+    BDL_BASE_URL=http://127.0.0.1:5001/api/v1 flask run
+
+Obsługuje to, czego używa BDLClient: /variables/search (name= albo search=), /units,
+/data/by-variable/<id> i /data/by-unit/<id> (wiele var-id) ze stronicowaniem jak w BDL
+(page, page-size, totalRecords, links.next), w formacie zagnieżdżonym (values) albo
+płaskim. Opóźnienie, odpowiedzi 429 z Retry-After i liczba jednostek na poziom są
+konfigurowalne.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import threading
+import time
+import zlib
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Iterator
+
+from werkzeug.serving import WSGIRequestHandler, make_server
+from werkzeug.wrappers import Request, Response
+
+UNEMPLOYMENT_VAR = 60270
+WAGE_VAR = 64428
+
+VARIABLES = [
+    {"id": UNEMPLOYMENT_VAR, "name": "Stopa bezrobocia rejestrowanego", "measureUnitName": "%", "level": 6},
+    {"id": 60271, "name": "Stopa bezrobocia rejestrowanego - dynamika (rok poprzedni=100)", "measureUnitName": "%", "level": 6},
+    {"id": WAGE_VAR, "name": "Przeciętne miesięczne wynagrodzenia brutto", "measureUnitName": "zł", "level": 5},
+    {"id": 64429, "name": "Przeciętne miesięczne wynagrodzenia brutto - indeks (2015=100)", "measureUnitName": "%", "level": 5},
+    {"id": 60520, "name": "Oferty pracy zgłoszone w ciągu roku", "measureUnitName": "szt.", "level": 6},
+    {"id": 64500, "name": "Pracujący na 1000 ludności", "measureUnitName": "osoba", "level": 6},
+]
+
+
+@dataclass
+class FakeBDLConfig:
+    # liczba jednostek na poziomie; każdy poziom dzieli się równo między jednostki poziomu wyżej
+    units: dict[int, int] = field(default_factory=lambda: {2: 16, 5: 380, 6: 2477})
+    first_year: int = 2010
+    last_year: int = 2024  # płace: rok mniej (publikowane z opóźnieniem)
+    shape: str = "nested"  # nested | flat
+    latency_s: float = 0.0
+    throttle_every: int = 0  # co N-te zapytanie dostaje 429 (0 = nigdy)
+    retry_after_s: float = 0.0
+    max_page_size: int = 100
+    search_param: str | None = None  # None = przyjmuje name= i search=
+
+
+@dataclass(frozen=True)
+class _Unit:
+    id: str
+    name: str
+    level: int
+    ancestors: frozenset[str]
+
+
+def _build_units(counts: dict[int, int]) -> dict[int, list[_Unit]]:
+    """Drzewo jednostek: id 12-znakowe, jak TERYT w BDL; dzieci dziedziczą przodków rodzica."""
+    out: dict[int, list[_Unit]] = {}
+    parents: list[_Unit] = []
+    for level in sorted(counts):
+        n = counts[level]
+        units = []
+        for i in range(n):
+            parent = parents[i * len(parents) // n] if parents else None
+            uid = f"{level:02d}{i:06d}0000"
+            name = {2: "WOJEWÓDZTWO", 5: "Powiat", 6: "Gmina"}.get(level, "Jednostka")
+            ancestors = (parent.ancestors | {parent.id}) if parent else frozenset()
+            units.append(_Unit(uid, f"{name} {i + 1}", level, ancestors))
+        out[level] = units
+        parents = units
+    return out
+
+
+def _value(var_id: int, unit_id: str, year: int) -> float | None:
+    # deterministyczne „dane”: zależne od jednostki i roku, bez losowania
+    seed = zlib.crc32(unit_id.encode("ascii"))
+    if var_id == UNEMPLOYMENT_VAR:
+        return round(3.0 + (seed % 170) / 10 - (year - 2010) * 0.25, 1)
+    if var_id == WAGE_VAR:
+        return round(3500.0 + seed % 3000 + (year - 2010) * 260.0, 2)
+    return round((seed % 1000) / 10, 1)
+
+
+class FakeBDL:
+    """Aplikacja WSGI; `requests` liczy zapytania po ścieżce (do asercji w testach i benchmarkach)."""
+
+    def __init__(self, config: FakeBDLConfig | None = None) -> None:
+        self.config = config or FakeBDLConfig()
+        self.units = _build_units(self.config.units)
+        self._by_id = {u.id: u for units in self.units.values() for u in units}
+        self.requests: Counter[str] = Counter()
+        self.throttled = 0
+        self._lock = threading.Lock()
+        self._seq = 0
+
+    # ------- WSGI -------
+
+    def __call__(self, environ: dict[str, Any], start_response) -> Any:
+        return self.handle(Request(environ))(environ, start_response)
+
+    def handle(self, request: Request) -> Response:
+        path = request.path.removeprefix("/api/v1").rstrip("/") or "/"
+        with self._lock:
+            self._seq += 1
+            seq = self._seq
+            self.requests[path.rsplit("/", 1)[0] if path.startswith("/data/") else path] += 1
+        if self.config.latency_s:
+            time.sleep(self.config.latency_s)
+        if self.config.throttle_every and seq % self.config.throttle_every == 0:
+            with self._lock:
+                self.throttled += 1
+            return Response(
+                json.dumps({"errors": ["Too Many Requests"]}),
+                status=429,
+                mimetype="application/json",
+                headers={"Retry-After": f"{self.config.retry_after_s:g}"},
+            )
+
+        if path == "/variables/search":
+            return self._search(request)
+        if path == "/units":
+            return self._units(request)
+        if path.startswith("/data/by-variable/"):
+            try:
+                var_id = int(path.rsplit("/", 1)[1])
+            except ValueError:
+                return self._json({"errors": ["Bad variable id"]}, status=400)
+            return self._data(request, var_id)
+        if path.startswith("/data/by-unit/"):
+            return self._data_by_unit(request, path.rsplit("/", 1)[1])
+        return self._json({"errors": ["Not found"]}, status=404)
+
+    # ------- pomocnicze -------
+
+    @staticmethod
+    def _json(payload: dict[str, Any], status: int = 200) -> Response:
+        return Response(json.dumps(payload, ensure_ascii=False), status=status, mimetype="application/json")
+
+    def _page(self, request: Request, items: list[Any]) -> tuple[list[Any], dict[str, Any]]:
+        page = request.args.get("page", 0, type=int)
+        size = min(request.args.get("page-size", 10, type=int), self.config.max_page_size)
+        chunk = items[page * size : (page + 1) * size]
+        links = {"self": request.url}
+        if (page + 1) * size < len(items):
+            links["next"] = request.base_url + f"?page={page + 1}"
+        return chunk, {"totalRecords": len(items), "page": page, "pageSize": size, "links": links}
+
+    def _scoped_units(self, level: int, parent_id: str | None) -> list[_Unit]:
+        units = self.units.get(level, [])
+        return [u for u in units if parent_id in u.ancestors] if parent_id else units
+
+    def _search(self, request: Request) -> Response:
+        accepted = [self.config.search_param] if self.config.search_param else ["name", "search"]
+        phrase = next((request.args[p] for p in accepted if p in request.args), None)
+        if phrase is None:
+            return self._json({"errors": ["Missing search parameter"]}, status=400)
+        words = phrase.lower().split()
+        hits = [v for v in VARIABLES if all(w in v["name"].lower() for w in words)]
+        chunk, meta = self._page(request, hits)
+        return self._json({**meta, "results": chunk})
+
+    def _units(self, request: Request) -> Response:
+        level = request.args.get("level", 2, type=int)
+        units = self._scoped_units(level, request.args.get("parent-id"))
+        rows = [{"id": u.id, "name": u.name, "level": u.level} for u in units]
+        chunk, meta = self._page(request, rows)
+        return self._json({**meta, "results": chunk})
+
+    def _years(self, request: Request, var_id: int) -> list[int]:
+        last = self.config.last_year - (1 if var_id == WAGE_VAR else 0)
+        return sorted(y for y in (int(v) for v in request.args.getlist("year")) if self.config.first_year <= y <= last)
+
+    def _data(self, request: Request, var_id: int) -> Response:
+        if var_id not in {v["id"] for v in VARIABLES}:
+            return self._json({"errors": ["Unknown variable"]}, status=404)
+        level = request.args.get("unit-level", 2, type=int)
+        units = self._scoped_units(level, request.args.get("unit-parent-id"))
+        years = self._years(request, var_id)
+
+        if self.config.shape == "flat":
+            items: list[Any] = [(u, y) for u in units for y in years]
+            chunk, meta = self._page(request, items)
+            results = [
+                {"unitId": u.id, "unitName": u.name, "year": y, "val": _value(var_id, u.id, y)} for u, y in chunk
+            ]
+        else:
+            chunk, meta = self._page(request, units)
+            results = [
+                {
+                    "id": u.id,
+                    "name": u.name,
+                    "values": [{"year": str(y), "val": _value(var_id, u.id, y), "attrId": 1} for y in years],
+                }
+                for u in chunk
+            ]
+        return self._json({**meta, "variableId": var_id, "results": results})
+
+
+    def _data_by_unit(self, request: Request, unit_id: str) -> Response:
+        unit = self._by_id.get(unit_id)
+        if unit is None:
+            return self._json({"errors": ["Unknown unit"]}, status=404)
+        known = {v["id"] for v in VARIABLES}
+        var_ids = [int(v) for v in request.args.getlist("var-id") if v.isdigit() and int(v) in known]
+        if not var_ids:
+            return self._json({"errors": ["Missing or unknown var-id"]}, status=400)
+        chunk, meta = self._page(request, var_ids)
+        results = [
+            {
+                "id": var_id,
+                "values": [
+                    {"year": str(y), "val": _value(var_id, unit.id, y), "attrId": 1} for y in self._years(request, var_id)
+                ],
+            }
+            for var_id in chunk
+        ]
+        return self._json({**meta, "unitId": unit.id, "unitName": unit.name, "results": results})
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_request(self, *args: Any, **kwargs: Any) -> None:
+        pass
+
+
+@contextmanager
+def serve(app: FakeBDL, host: str = "127.0.0.1", port: int = 0) -> Iterator[str]:
+    """Uruchamia atrapę w wątku; zwraca bazowy URL (jak BDL_BASE_URL)."""
+    server = make_server(host, port, app, threaded=True, request_handler=_QuietHandler)
+    thread = threading.Thread(target=server.serve_forever, name="fake-bdl", daemon=True)
+    thread.start()
+    try:
+        yield f"http://{host}:{server.server_port}/api/v1"
+    finally:
+        server.shutdown()
+        thread.join(timeout=5)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local stand-in for the GUS BDL API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5001)
+    parser.add_argument("--shape", choices=["nested", "flat"], default="nested")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--throttle-every", type=int, default=0)
+    parser.add_argument("--retry-after-s", type=float, default=1.0)
+    parser.add_argument("--gminy", type=int, default=2477, help="number of level-6 units")
+    args = parser.parse_args()
+
+    config = FakeBDLConfig(
+        units={2: 16, 5: 380, 6: args.gminy},
+        shape=args.shape,
+        latency_s=args.latency_ms / 1000,
+        throttle_every=args.throttle_every,
+        retry_after_s=args.retry_after_s,
+    )
+    with serve(FakeBDL(config), args.host, args.port) as url:
+        print(f"Fake BDL listening on {url} (Ctrl+C to stop)")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
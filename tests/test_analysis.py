@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.data.analysis import analyze
+from app.data.cache import apply_schema
+from benchmarks._legacy_analysis import analyze as legacy_analyze
+
+
+def _messy_frame(units=40, years=6, seed=1):
+    rng = np.random.default_rng(seed)
+    n = units * years
+    df = pd.DataFrame(
+        {
+            "year": np.repeat(np.arange(2018, 2018 + years), units),
+            "unitId": np.tile([f"{i:012d}" for i in range(units)], years),
+            "unitName": np.tile([f" Jednostka {i} " if i % 7 else None for i in range(units)], years),
+            # stopa jako ułamek (0.05 zamiast 5%) – obie implementacje mają ją przeskalować
+            "unemployment_rate": rng.uniform(0.02, 0.2, n),
+            "avg_wage": rng.uniform(4000, 12000, n),
+        }
+    )
+    df.loc[rng.random(n) < 0.1, "unemployment_rate"] = np.nan
+    df.loc[df["year"] == 2018 + years - 1, "avg_wage"] = np.nan  # płace z opóźnieniem
+    return df
+
+
+@pytest.mark.parametrize("schema", [False, True], ids=["raw", "cache-schema"])
+def test_vectorized_kernel_matches_legacy(schema):
+    df = apply_schema(_messy_frame()) if schema else _messy_frame()
+    new, old = analyze(df), legacy_analyze(df)
+
+    assert new.summary == pytest.approx(old.summary, rel=1e-5)
+    for name in ("ranking", "top5", "bottom5"):
+        pd.testing.assert_frame_equal(
+            new.tables[name].reset_index(drop=True), old.tables[name].reset_index(drop=True), check_dtype=False, rtol=1e-5
+        )
+    pd.testing.assert_frame_equal(
+        new.yearly.reset_index(drop=True), old.yearly.reset_index(drop=True), check_dtype=False, rtol=1e-5
+    )
+    assert len(new.latest_unemp) == len(old.latest_unemp)
+    assert len(new.both) == len(old.both)
+
+
+def test_no_unemployment_data_gives_empty_ranking():
+    df = pd.DataFrame({"year": [2022, 2023], "unitId": ["1", "2"], "unitName": ["A", "B"], "avg_wage": [7000.0, None]})
+    result = analyze(df)
+
+    assert result.summary["latest_unemp_year"] is None
+    assert result.summary["avg_wage_latest"] == 7000.0
+    assert result.tables["ranking"].empty
@@ -0,0 +1,69 @@
+def test_series_by_unit_and_year_range(auth_client, seeded_cache):
+    r = auth_client.get("/api/series?unit=020800000000&metric=unemployment_rate&from=2023&to=2023")
+    assert r.status_code == 200
+    assert r.json["series"] == [
+        {"unitId": "020800000000", "unitName": "LUBUSKIE", "points": [{"year": 2023, "unemployment_rate": 5.5}]}
+    ]
+
+    r = auth_client.get("/api/series?unit=030200000000")
+    assert r.json["metrics"] == ["unemployment_rate", "avg_wage"]
+    assert r.json["series"][0]["points"][1] == {"year": 2023, "unemployment_rate": 6.5, "avg_wage": None}
+
+
+def test_series_paginates_units_and_validates(auth_client, seeded_cache):
+    r = auth_client.get("/api/series?metric=avg_wage&limit=2")
+    assert [s["unitId"] for s in r.json["series"]] == ["011200000000", "020800000000"]
+    assert r.json["page"]["total"] == 3
+    assert "offset=2" in r.json["page"]["next"]
+
+    r = auth_client.get(r.json["page"]["next"])
+    assert [s["unitId"] for s in r.json["series"]] == ["030200000000"]
+    assert r.json["page"]["next"] is None
+
+    assert auth_client.get("/api/series?unit=nope").status_code == 404
+    assert auth_client.get("/api/series?metric=nope").status_code == 400
+    assert auth_client.get("/api/series?from=abc").json == {"error": "Parameter 'from' must be an integer"}
+
+
+def test_ranking_latest_year_order_and_etag(auth_client, seeded_cache):
+    r = auth_client.get("/api/ranking?limit=2")
+    assert r.status_code == 200
+    assert r.json["year"] == 2023 and r.json["metric"] == "unemployment_rate"
+    assert [(row["rank"], row["unitName"], row["value"]) for row in r.json["rows"]] == [
+        (1, "DOLNOŚLĄSKIE", 6.5),
+        (2, "LUBUSKIE", 5.5),
+    ]
+    etag = r.headers["ETag"]
+    assert auth_client.get("/api/ranking?limit=2", headers={"If-None-Match": etag}).status_code == 304
+    assert auth_client.get("/api/ranking?limit=1", headers={"If-None-Match": etag}).status_code == 200
+
+    r = auth_client.get("/api/ranking?year=2023&metric=avg_wage&order=asc&offset=1")
+    # brak płacy dla DOLNOŚLĄSKIE w 2023 – poza rankingiem
+    assert r.json["page"]["total"] == 2
+    assert r.json["rows"] == [{"rank": 2, "unitId": "020800000000", "unitName": "LUBUSKIE", "value": 8500.0}]
+    assert auth_client.get("/api/ranking?order=up").status_code == 400
+
+
+def test_series_index_built_once_per_version(app, auth_client, seeded_cache, monkeypatch):
+    from pathlib import Path
+
+    from app.dashboard import services
+    from app.data.cache import save_cache
+    from app.data.pipeline import CACHE_KEY
+
+    built = []
+    real = services.build_series_index
+    monkeypatch.setattr(services, "build_series_index", lambda df: built.append(len(df)) or real(df))
+    for _ in range(3):
+        auth_client.get("/api/ranking")
+        auth_client.get("/api/series?unit=011200000000")
+    assert built == [6]
+
+    # nowa wersja danych czyści indeks
+    save_cache(Path(app.config["CACHE_DIR"]), CACHE_KEY, seeded_cache.assign(unemployment_rate=3.0), source="test")
+    assert auth_client.get("/api/ranking").json["rows"][0]["value"] == 3.0
+    assert built == [6, 6]
+
+
+def test_api_requires_login(client):
+    assert client.get("/api/ranking").status_code in (302, 401)
@@ -1,4 +1,8 @@
-def test_register_and_login_flow(client):
+import pytest
+
+from app.models import User
+
+def test_register_and_login_flow(client, fake_bdl):
     r = client.post("/register", data={"email": "a@b.com", "password": "password123", "password2": "password123"}, follow_redirects=True)
     assert r.status_code == 200
     assert "Konto utworzone" in r.get_data(as_text=True)
@@ -10,3 +14,70 @@ def test_register_and_login_flow(client):
 def test_protected_requires_login(client):
     r = client.get("/dashboard", follow_redirects=False)
     assert r.status_code in (302, 401)
+
+def _count_user_selects(app):
+    from sqlalchemy import event
+    from app.extensions import db
+
+    seen = []
+
+    def before(conn, cursor, statement, *args):
+        if statement.lstrip().upper().startswith("SELECT") and "FROM user" in statement:
+            seen.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", before)
+    return seen
+
+def test_user_loader_served_from_cache(app, auth_client):
+    from app.auth.identity import load_user
+    from app.extensions import db
+
+    uid = User.query.filter_by(email="u@test.pl").one().id
+    db.session.remove()
+    selects = _count_user_selects(app)
+    for _ in range(3):
+        assert load_user(str(uid)).email == "u@test.pl"
+        db.session.remove()  # nowe zapytanie = nowa sesja
+    assert len(selects) == 1
+    assert load_user("nope") is None
+
+def test_user_cache_invalidated_on_update_and_ttl(app, auth_client, monkeypatch):
+    from app.auth.identity import load_user, user_cache
+    from app.extensions import db
+
+    user = User.query.filter_by(email="u@test.pl").one()
+    uid = str(user.id)
+    load_user(uid)
+    assert len(user_cache) == 1
+
+    user.email = "renamed@test.pl"
+    db.session.commit()
+    assert len(user_cache) == 0
+    db.session.remove()
+    assert load_user(uid).email == "renamed@test.pl"
+
+    db.session.remove()
+    monkeypatch.setattr("app.auth.identity.time.monotonic", lambda: float("inf"))
+    selects = _count_user_selects(app)
+    load_user(uid)
+    assert len(selects) == 1
+
+def test_sqlite_pragmas_applied_to_new_connections(tmp_path):
+    import sqlalchemy as sa
+    from app import create_app
+    from app.config import Config
+    from app.extensions import db, parse_pragmas
+
+    class PragmaConfig(Config):
+        TESTING = True
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'app.sqlite3'}"
+        CACHE_DIR = str(tmp_path / "cache")
+        SQLITE_PRAGMAS = "journal_mode=WAL, synchronous=NORMAL, busy_timeout=2500"
+
+    app = create_app(PragmaConfig)
+    with app.app_context(), db.engine.connect() as conn:
+        assert conn.execute(sa.text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(sa.text("PRAGMA synchronous")).scalar() == 1
+        assert conn.execute(sa.text("PRAGMA busy_timeout")).scalar() == 2500
+    with pytest.raises(ValueError):
+        parse_pragmas("journal_mode=WAL; DROP TABLE user")
@@ -0,0 +1,87 @@
+import asyncio
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from app.data import pipeline
+from app.data.bdl_async import AsyncBDLClient
+from app.data.bdl_client import BDLClientError
+from app.data.cache import read_meta, refresh_lock
+from tests.fake_bdl import FakeBDL, FakeBDLConfig, serve
+
+pytest.importorskip("httpx")
+
+OPTIONS = {"unit_level": 6, "start_year": 2020}
+BDL_OPTIONS = {"backoff_base_s": 0.01, "max_workers": 2}
+
+
+def _sorted(df):
+    return df.sort_values(["year", "unitId"]).reset_index(drop=True)
+
+
+@pytest.mark.parametrize("shape", ["nested", "flat"])
+def test_async_refresh_matches_sync(tmp_path, shape):
+    bdl = FakeBDL(FakeBDLConfig(units={2: 4, 5: 12, 6: 30}, shape=shape, throttle_every=9, max_page_size=10))
+    with serve(bdl) as url:
+        sync_df = pipeline.refresh_dataset(tmp_path / "sync", None, url, BDL_OPTIONS, dataset_options=OPTIONS)
+        async_df = asyncio.run(
+            pipeline.refresh_dataset_async(
+                tmp_path / "async", None, url, BDL_OPTIONS, dataset_options=OPTIONS, max_concurrency=8
+            )
+        )
+
+    pd.testing.assert_frame_equal(_sorted(async_df), _sorted(sync_df))
+    assert read_meta(tmp_path / "async", pipeline.dataset_key(OPTIONS)).aggregates_file is not None
+
+
+def test_breaking_out_of_pages_cancels_pending_requests():
+    bdl = FakeBDL(FakeBDLConfig(units={2: 4, 5: 12, 6: 200}, max_page_size=5, latency_s=0.01))
+
+    async def first_page(url):
+        async with AsyncBDLClient(url, max_concurrency=4) as client:
+            pages = client.iter_data_by_variable(60270, [2024], unit_level=6)
+            async for page in pages:
+                break
+            await pages.aclose()
+            return page, [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+
+    with serve(bdl) as url:
+        page, leftover = asyncio.run(first_page(url))
+    assert len(page) == 5
+    assert leftover == []
+    assert bdl.requests["/data/by-variable"] < 40  # 40 stron łącznie; pobrane tylko okno wyprzedzenia
+
+
+def test_refresh_timeout_raises_and_releases_lock(tmp_path):
+    bdl = FakeBDL(FakeBDLConfig(units={2: 4, 5: 12, 6: 30}, latency_s=0.2))
+    with serve(bdl) as url:
+        with pytest.raises(BDLClientError, match="timed out"):
+            asyncio.run(
+                pipeline.refresh_dataset_async(tmp_path, None, url, BDL_OPTIONS, dataset_options=OPTIONS, timeout_s=0.1)
+            )
+    with refresh_lock(tmp_path, pipeline.dataset_key(OPTIONS), timeout_s=0):
+        pass
+
+
+def test_async_load_serves_stale_cache_when_refresh_times_out(tmp_path, fake_bdl):
+    df = asyncio.run(
+        pipeline.load_or_refresh_dataset_async(tmp_path, 0, None, fake_bdl.url, BDL_OPTIONS, dataset_options=OPTIONS)
+    )
+    assert df["unitId"].nunique() == fake_bdl.config.units[6]
+
+    slow = FakeBDL(FakeBDLConfig(units={2: 16, 5: 40, 6: 120}, latency_s=0.2))
+    with serve(slow) as url:
+        stale = asyncio.run(
+            pipeline.load_or_refresh_dataset_async(
+                tmp_path, 0, None, url, BDL_OPTIONS, dataset_options=OPTIONS, timeout_s=0.05
+            )
+        )
+    assert len(stale) == len(df)
+
+
+def test_flask_refresh_command_uses_async_client(app, fake_bdl):
+    result = app.test_cli_runner().invoke(args=["refresh", "--level", "6", "--async"])
+    assert result.exit_code == 0, result.output
+    assert '"refresh_count": 1' in result.output
+    assert read_meta(Path(app.config["CACHE_DIR"]), pipeline.dataset_key({"unit_level": 6})) is not None
@@ -0,0 +1,165 @@
+import json
+import random
+import time
+
+import pytest
+import requests
+from requests.adapters import BaseAdapter
+
+from app.data.bdl_client import BDLClient, BDLClientError, RateLimiter, parse_seconds
+
+
+class ScriptedAdapter(BaseAdapter):
+    """Zwraca z góry zadane odpowiedzi (status, nagłówki, JSON) zamiast łączyć się z BDL."""
+
+    def __init__(self, script):
+        super().__init__()
+        self.script = list(script)
+        self.calls = 0
+
+    def send(self, request, **kwargs):
+        status, headers, body = self.script.pop(0)
+        self.calls += 1
+        r = requests.Response()
+        r.status_code = status
+        r.headers.update(headers)
+        r._content = body.encode("utf-8")
+        r.url = request.url
+        r.request = request
+        return r
+
+    def close(self):
+        pass
+
+
+def _client(script, **kw):
+    client = BDLClient("http://bdl.test/api/v1", backoff_base_s=0.0, **kw)
+    adapter = ScriptedAdapter(script)
+    client.session.mount("http://", adapter)
+    return client, adapter
+
+
+def test_retries_429_and_5xx_then_succeeds():
+    client, adapter = _client(
+        [
+            (429, {"Retry-After": "0"}, "{}"),
+            (503, {}, "{}"),
+            (200, {}, '{"results": [{"id": 1, "name": "x"}]}'),
+        ]
+    )
+    assert [v.id for v in client.search_variables("x")] == [1]
+    assert adapter.calls == 3
+
+
+def test_gives_up_after_max_retries():
+    client, adapter = _client([(500, {}, "{}")] * 3, max_retries=2)
+    with pytest.raises(BDLClientError, match="500"):
+        client._get_json("/x")
+    assert adapter.calls == 3
+
+
+def test_limiter_paces_by_quota_headers():
+    limiter = RateLimiter()
+    limiter.update_from_headers({"X-Rate-Limit-Remaining": "10", "X-Rate-Limit-Reset": "5"})
+    assert abs(limiter._interval_s - 0.5) < 1e-9
+    limiter.update_from_headers({"X-Rate-Limit-Limit": "100"})
+    assert abs(limiter._interval_s - 0.5) < 1e-9
+
+
+def test_parse_seconds_formats():
+    assert parse_seconds("3") == 3.0
+    assert parse_seconds("1000000010", now=1000000000) == 10.0
+    assert parse_seconds("Wed, 21 Oct 2015 07:28:00 GMT", now=0) > 0
+    assert parse_seconds("nonsense") is None
+
+
+class PagedAdapter(BaseAdapter):
+    """Symuluje /data/by-variable: 10 rekordów na stronę, losowe opóźnienia, totalRecords na każdej stronie."""
+
+    def __init__(self, total):
+        super().__init__()
+        self.total = total
+        self.pages_seen = []
+
+    def send(self, request, **kwargs):
+        from urllib.parse import parse_qs, urlparse
+
+        q = parse_qs(urlparse(request.url).query)
+        page, size = int(q["page"][0]), int(q["page-size"][0])
+        self.pages_seen.append(page)
+        time.sleep(random.uniform(0, 0.01))
+        start = page * size
+        results = [{"unitId": str(i), "year": 2020, "val": i} for i in range(start, min(start + size, self.total))]
+        body = {"totalRecords": self.total, "results": results, "links": {}}
+        if start + size < self.total:
+            body["links"]["next"] = "more"
+        r = requests.Response()
+        r.status_code = 200
+        r._content = json.dumps(body).encode("utf-8")
+        r.url = request.url
+        r.request = request
+        return r
+
+    def close(self):
+        pass
+
+
+def test_pages_fetched_concurrently_in_deterministic_order():
+    client = BDLClient("http://bdl.test/api/v1", max_workers=4)
+    adapter = PagedAdapter(total=95)
+    client.session.mount("http://", adapter)
+
+    rows = client.get_data_by_variable(1, years=[2020], page_size=10)
+
+    assert [int(r["unitId"]) for r in rows] == list(range(95))
+    assert sorted(adapter.pages_seen) == list(range(10))
+
+
+def test_search_param_accepted_by_gateway_is_tried_first():
+    found = '{"results": [{"id": 7, "name": "stopa bezrobocia"}]}'
+    client, adapter = _client([(400, {}, "{}"), (200, {}, found), (200, {}, found)])
+
+    client.search_variables("stopa")
+    assert client.search_param == "search"
+    client.search_variables("stopa")  # ta sama fraza – z pamięci klienta
+    client.search_variables("płace")
+
+    assert adapter.calls == 3
+
+
+class ChunkAdapter(BaseAdapter):
+    """Po 3 rekordy (jedna strona) na każdy unit-parent-id; zapisuje, o które kawałki pytano."""
+
+    def __init__(self):
+        super().__init__()
+        self.parents = []
+
+    def send(self, request, **kwargs):
+        from urllib.parse import parse_qs, urlparse
+
+        q = parse_qs(urlparse(request.url).query)
+        parent = q["unit-parent-id"][0]
+        self.parents.append(parent)
+        time.sleep(random.uniform(0, 0.01))
+        body = {"totalRecords": 3, "results": [{"unitId": f"{parent}-{i}", "year": 2020, "val": i} for i in range(3)]}
+        r = requests.Response()
+        r.status_code = 200
+        r._content = json.dumps(body).encode("utf-8")
+        r.url = request.url
+        r.request = request
+        return r
+
+    def close(self):
+        pass
+
+
+def test_chunked_fetch_by_parent_keeps_parent_order():
+    client = BDLClient("http://bdl.test/api/v1", max_workers=4)
+    adapter = ChunkAdapter()
+    client.session.mount("http://", adapter)
+    parents = [f"p{i:02d}" for i in range(16)]
+
+    rows = client.get_data_by_variable_chunked(1, years=[2020], unit_level=6, parent_ids=parents)
+
+    assert [r["unitId"] for r in rows] == [f"{p}-{i}" for p in parents for i in range(3)]
+    assert sorted(adapter.parents) == parents
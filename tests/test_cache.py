@@ -0,0 +1,149 @@
+import gzip
+import multiprocessing as mp
+import os
+import time
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from app.data import pipeline
+from app.data.cache import (
+    HAS_PYARROW,
+    CacheLockTimeout,
+    is_cache_fresh,
+    load_aggregates,
+    load_cache,
+    migrate_cache,
+    read_meta,
+    refresh_lock,
+    save_cache,
+)
+
+KEY = "test_key"
+# jedna jednostka, dwa lata, brak płacy w drugim roku
+FRAME = dict(rates=[5.1, 4.9], wages=[6000.5, None], years=(2020, 2021))
+
+
+@pytest.mark.parametrize("fmt", ["csv.gz", "parquet", "feather"])
+def test_roundtrip_keeps_explicit_dtypes(tmp_path, fmt, make_frame):
+    if fmt != "csv.gz" and not HAS_PYARROW:
+        pytest.skip("pyarrow not installed")
+    save_cache(tmp_path, KEY, make_frame(**FRAME), source="test", fmt=fmt)
+    df = load_cache(tmp_path, KEY, fmt=fmt)
+
+    assert str(df["year"].dtype) == "Int16"
+    assert isinstance(df["unitId"].dtype, pd.CategoricalDtype)
+    assert df["unitId"].iloc[0] == "011200000000"
+    assert df["avg_wage"].dtype == "float32"
+    assert is_cache_fresh(tmp_path, KEY, max_age_hours=1)
+
+
+@pytest.mark.skipif(not HAS_PYARROW, reason="pyarrow not installed")
+def test_legacy_csv_cache_is_migrated_without_refreshing(tmp_path, make_frame):
+    with gzip.open(tmp_path / f"{KEY}.csv.gz", "wt", encoding="utf-8") as f:
+        make_frame(**FRAME).to_csv(f, index=False)
+    (tmp_path / f"{KEY}.meta.json").write_text(
+        '{"created_at_iso": "2020-01-01T00:00:00+00:00", "source": "old"}', encoding="utf-8"
+    )
+
+    df = load_cache(tmp_path, KEY, fmt="parquet")
+
+    assert len(df) == 2
+    assert not (tmp_path / f"{KEY}.csv.gz").exists()
+    meta = read_meta(tmp_path, KEY)
+    assert meta.format == "parquet"
+    assert meta.data_file.endswith(".parquet")
+    assert (tmp_path / meta.data_file).exists()
+    assert meta.created_at_iso == "2020-01-01T00:00:00+00:00"
+
+
+def test_aggregates_are_versioned_with_the_data(tmp_path, make_frame):
+    for n in range(3):
+        save_cache(tmp_path, KEY, make_frame(**FRAME), source="test", fmt="csv.gz", aggregates=lambda df, n=n: {"n": n, "rows": len(df)})
+
+    assert load_aggregates(tmp_path, KEY) == {"n": 2, "rows": 2}
+    # jak pliki danych: bieżąca i poprzednia wersja
+    assert len(list(tmp_path.glob(f"{KEY}.*.aggregates.json"))) == 2
+
+    assert migrate_cache(tmp_path, KEY, fmt="parquet")
+    assert load_aggregates(tmp_path, KEY) == {"n": 2, "rows": 2}
+
+
+# ------- wiele procesów: blokada odświeżania i atomowe zapisy -------
+
+def _fake_refresh(calls_file, df):
+    def fake(client, cache_dir, cache_format=None, dataset_options=None):
+        with open(calls_file, "a", encoding="utf-8") as f:
+            f.write(f"{os.getpid()}\n")
+        time.sleep(0.5)  # „długie” pobieranie z BDL – reszta procesów musi poczekać
+        save_cache(cache_dir, pipeline.CACHE_KEY, df, source="fake")
+        return df
+
+    return fake
+
+
+def _refresh_worker(cache_dir, calls_file, df, start, results):
+    pipeline._refresh_dataset = _fake_refresh(calls_file, df)
+    start.wait()
+    df = pipeline.load_or_refresh_dataset(
+        cache_dir=Path(cache_dir),
+        max_age_hours=1,
+        bdl_client_id=None,
+        bdl_base_url="http://bdl.invalid",
+        lock_timeout_s=30.0,
+    )
+    results.put(len(df))
+
+
+def _rewrite_worker(cache_dir, df, rounds):
+    for i in range(rounds):
+        save_cache(Path(cache_dir), KEY, df.assign(avg_wage=float(i)), source=f"round {i}")
+
+
+def test_only_one_process_refreshes_cold_cache(tmp_path, make_frame):
+    ctx = mp.get_context("spawn")
+    start, results = ctx.Event(), ctx.Queue()
+    calls = tmp_path / "calls.txt"
+    procs = [ctx.Process(target=_refresh_worker, args=(str(tmp_path), str(calls), make_frame(**FRAME), start, results)) for _ in range(4)]
+    for p in procs:
+        p.start()
+    start.set()
+    got = [results.get(timeout=60) for _ in procs]
+    for p in procs:
+        p.join(timeout=30)
+
+    assert got == [2, 2, 2, 2]
+    assert len(calls.read_text(encoding="utf-8").splitlines()) == 1
+
+
+def test_readers_never_see_partial_writes(tmp_path, make_frame):
+    save_cache(tmp_path, KEY, make_frame(**FRAME), source="seed")
+    writer = mp.get_context("spawn").Process(target=_rewrite_worker, args=(str(tmp_path), make_frame(**FRAME), 30))
+    writer.start()
+    reads = 0
+    while writer.is_alive() or reads == 0:
+        assert len(load_cache(tmp_path, KEY)) == 2
+        reads += 1
+    writer.join()
+
+    assert writer.exitcode == 0
+    # zostaje bieżąca i co najwyżej poprzednia wersja danych
+    assert len([p for p in tmp_path.iterdir() if p.name.startswith(f"{KEY}.") and not p.name.endswith((".json", ".lock"))]) <= 2
+
+
+def test_stale_cache_is_served_while_another_process_refreshes(tmp_path, monkeypatch, make_frame):
+    save_cache(tmp_path, pipeline.CACHE_KEY, make_frame(**FRAME), source="old")
+
+    def must_not_run(*args, **kwargs):
+        raise AssertionError("refresh should be left to the lock holder")
+
+    monkeypatch.setattr(pipeline, "_refresh_dataset", must_not_run)
+    with refresh_lock(tmp_path, pipeline.CACHE_KEY):
+        df = pipeline.load_or_refresh_dataset(
+            cache_dir=tmp_path, max_age_hours=0, bdl_client_id=None, bdl_base_url="http://bdl.invalid"
+        )
+        with pytest.raises(CacheLockTimeout):
+            pipeline.refresh_dataset(tmp_path, None, "http://bdl.invalid", lock_timeout_s=0.2)
+
+    assert len(df) == 2
@@ -0,0 +1,96 @@
+import os
+from pathlib import Path
+
+import pandas as pd
+
+from app.data.analysis import build_analysis_outputs
+from app.data.charts import CHART_NAME_RE, PENDING_CHART, ChartRenderer, gc_charts
+
+
+FRAME = dict(
+    rates=[5.0, 6.0, 7.0, 4.5, 5.5, 6.5],
+    wages=[7000.0, 8000.0, 9000.0, 7500.0, 8500.0, 9500.0],
+    years=(2022, 2023),
+)
+
+
+def test_charts_are_content_addressed_and_reused(tmp_path, make_frame):
+    _, _, paths = build_analysis_outputs(make_frame(**FRAME), tmp_path)
+    names = {k: Path(v).name for k, v in paths.items()}
+    assert all(CHART_NAME_RE.match(n) for n in names.values())
+
+    inode = (tmp_path / names["trend"]).stat().st_ino
+    os.utime(tmp_path / names["trend"], ns=(0, 0))
+    _, _, again = build_analysis_outputs(make_frame(**FRAME), tmp_path)
+    assert again == paths
+    # ponowne użycie tylko „dotyka” plik (LRU), nie renderuje go od nowa
+    st = (tmp_path / names["trend"]).stat()
+    assert st.st_ino == inode
+    assert st.st_mtime_ns > 0
+
+    shifted = make_frame(**{**FRAME, "rates": [6.0, *FRAME["rates"][1:]]})
+    _, _, changed = build_analysis_outputs(shifted, tmp_path)
+    assert changed["trend"] != paths["trend"]
+    assert changed["bar_unemp"] == paths["bar_unemp"]  # najnowszy rok się nie zmienił
+
+
+def test_gc_keeps_recent_and_protected_files(tmp_path):
+    for i in range(5):
+        p = tmp_path / f"trend-{i:016x}.png"
+        p.write_bytes(b"x" * 10)
+        os.utime(p, (i, i))
+    (tmp_path / "placeholder.png").write_bytes(b"x")
+
+    removed = gc_charts(tmp_path, keep={f"trend-{0:016x}.png"}, max_files=2)
+
+    assert removed == 2
+    left = sorted(p.name for p in tmp_path.iterdir())
+    assert left == ["placeholder.png", f"trend-{0:016x}.png", f"trend-{3:016x}.png", f"trend-{4:016x}.png"]
+
+
+def test_chart_assets_get_immutable_cache_headers(client, app):
+    charts = Path(app.static_folder) / "charts"
+    charts.mkdir(parents=True, exist_ok=True)
+    f = charts / f"trend-{'ab' * 8}.png"
+    f.write_bytes(b"\x89PNG")
+    try:
+        r = client.get(f"/static/charts/{f.name}")
+        assert r.status_code == 200
+        assert "immutable" in r.headers["Cache-Control"]
+        assert "max-age=31536000" in r.headers["Cache-Control"]
+        r.close()
+    finally:
+        f.unlink()
+
+
+def test_pool_renderer_returns_placeholder_then_files(tmp_path, make_frame):
+    renderer = ChartRenderer(mode="pool", max_workers=2, wait_s=0)
+    try:
+        _, _, pending = build_analysis_outputs(make_frame(**FRAME), tmp_path, renderer=renderer)
+        assert PENDING_CHART in pending.values()
+
+        renderer.wait_s = 60
+        _, _, ready = build_analysis_outputs(make_frame(**FRAME), tmp_path, renderer=renderer)
+        assert PENDING_CHART not in ready.values()
+        assert all((tmp_path / Path(p).name).exists() for p in ready.values())
+    finally:
+        renderer.shutdown()
+
+
+def test_many_units_render_top_n_bar_and_histogram(tmp_path):
+    n = 400
+    df = pd.DataFrame(
+        {
+            "year": [2023] * n,
+            "unitId": [f"{i:07d}" for i in range(n)],
+            "unitName": [f"Powiat {i}" for i in range(n)],
+            "unemployment_rate": [1.0 + (i % 97) * 0.2 for i in range(n)],
+            "avg_wage": [6000.0 + i for i in range(n)],
+        }
+    )
+    summary, tables, paths = build_analysis_outputs(df, tmp_path, unit_level=5)
+
+    assert set(paths) == {"trend", "bar_unemp", "scatter", "hist_unemp"}
+    assert all((tmp_path / Path(p).name).exists() for p in paths.values())
+    assert list(tables["ranking"].columns)[0] == "Powiat"
+    assert len(tables["ranking"]) == n
@@ -0,0 +1,120 @@
+def test_chart_series_endpoint_with_etag(auth_client, seeded_cache):
+    r = auth_client.get("/api/charts/trend")
+    assert r.status_code == 200
+    assert r.json == {
+        "title": "Trend: bezrobocie i płace (średnia po województwach)",
+        "years": [2022, 2023],
+        "unemployment_rate": [6.0, 5.5],
+        "avg_wage": [8000.0, 8000.0],
+    }
+    etag = r.headers["ETag"]
+
+    r = auth_client.get("/api/charts/trend", headers={"If-None-Match": etag})
+    assert r.status_code == 304
+
+    r = auth_client.get("/api/charts/scatter")
+    assert r.json["year"] == 2023
+    assert r.json["points"] == [[7500.0, 4.5], [8500.0, 5.5]]
+
+    assert auth_client.get("/api/charts/nope").status_code == 404
+
+
+def test_client_chart_mode_skips_png(auth_client, seeded_cache):
+    r = auth_client.get("/dashboard?charts=client")
+    html = r.get_data(as_text=True)
+    assert r.status_code == 200
+    assert 'data-chart="bar_unemp"' in html
+    assert "/static/charts/" not in html
+
+
+def test_gmina_level_uses_aggregated_charts_and_paged_ranking(app, auth_client):
+    from pathlib import Path
+
+    import pandas as pd
+
+    from app.data.cache import save_cache
+    from app.data.pipeline import dataset_key
+
+    n = 120
+    df = pd.DataFrame(
+        {
+            "year": [2023] * n,
+            "unitId": [f"{i:012d}" for i in range(n)],
+            "unitName": [f"Gmina {i}" for i in range(n)],
+            "unemployment_rate": [2.0 + i * 0.1 for i in range(n)],
+            "avg_wage": [6000.0 + i for i in range(n)],
+        }
+    )
+    app.config.update(CACHE_MAX_AGE_HOURS=24, RANKING_PAGE_SIZE=50)
+    save_cache(Path(app.config["CACHE_DIR"]), dataset_key({"unit_level": 6}), df, source="test")
+
+    html = auth_client.get("/dashboard?level=6&charts=client&page=3").get_data(as_text=True)
+    assert "Ranking gmin" in html
+    assert 'data-chart="hist_unemp"' in html
+    assert "101–120 z 120" in html
+
+    bar = auth_client.get("/api/charts/bar_unemp?level=6").json
+    assert len(bar["labels"]) == 20 and bar["values"][-1] == 13.9
+    assert sum(auth_client.get("/api/charts/hist_unemp?level=6").json["counts"]) == n
+
+
+def test_exports_are_cached_per_version_and_conditional(app, auth_client, seeded_cache):
+    import io
+    from pathlib import Path
+
+    import pandas as pd
+    from openpyxl import load_workbook
+
+    r = auth_client.get("/export/excel")
+    assert r.status_code == 200
+    wb = load_workbook(io.BytesIO(r.data), read_only=True)
+    assert wb.sheetnames == ["Podsumowanie", "Ranking", "Top5", "Bottom5"]
+    rows = list(wb["Ranking"].iter_rows(min_row=2, max_col=3, values_only=True))
+    assert rows == [("DOLNOŚLĄSKIE", 6.5, None), ("LUBUSKIE", 5.5, 8500.0), ("MAŁOPOLSKIE", 4.5, 7500.0)]
+
+    # drugi raz ten sam plik z dysku: 304 po ETag, Range działa
+    exports = list((Path(app.config["CACHE_DIR"]) / "exports").glob("*.xlsx"))
+    assert len(exports) == 1
+    assert auth_client.get("/export/excel", headers={"If-None-Match": r.headers["ETag"]}).status_code == 304
+    assert auth_client.get("/export/excel", headers={"Range": "bytes=0-3"}).data == r.data[:4]
+
+    csv = auth_client.get("/export/csv").get_data(as_text=True).splitlines()
+    assert csv[0] == "Województwo,Stopa bezrobocia (%),Przeciętne wynagrodzenie (zł)"
+    assert csv[-1] == "MAŁOPOLSKIE,4.5,7500.0"
+
+    ranking = pd.read_parquet(io.BytesIO(auth_client.get("/export/parquet").data))
+    assert ranking["Województwo"].tolist() == ["DOLNOŚLĄSKIE", "LUBUSKIE", "MAŁOPOLSKIE"]
+    assert ranking["Przeciętne wynagrodzenie (zł)"].isna().tolist() == [True, False, False]
+
+
+def test_dashboard_conditional_get_and_fragment_cache(app, auth_client, seeded_cache):
+    from app.dashboard.services import fragments
+
+    fragments.invalidate()
+    # pierwsza wizyta po logowaniu pokazuje flash – ta odpowiedź nie ma walidatorów
+    assert "ETag" not in auth_client.get("/dashboard?charts=client").headers
+    r = auth_client.get("/dashboard?charts=client")
+    assert r.status_code == 200
+    assert "private" in r.headers["Cache-Control"] and r.headers["Last-Modified"]
+    assert auth_client.get("/dashboard?charts=client", headers={"If-None-Match": r.headers["ETag"]}).status_code == 304
+
+    # inna strona/tryb = inny ETag; fragment podsumowania jest wspólny
+    other = auth_client.get("/dashboard?charts=client&page=2")
+    assert other.status_code == 200 and other.headers["ETag"] != r.headers["ETag"]
+    assert len([k for k in fragments._items if "summary" in k]) == 1
+
+    # inny użytkownik nie dostaje 304 z cudzym ETag
+    auth_client.get("/logout")
+    auth_client.post("/register", data={"email": "v@test.pl", "password": "password123", "password2": "password123"})
+    auth_client.post("/login", data={"email": "v@test.pl", "password": "password123"})
+    auth_client.get("/dashboard?charts=client")
+    assert auth_client.get("/dashboard?charts=client", headers={"If-None-Match": r.headers["ETag"]}).status_code == 200
+
+
+def test_static_assets_get_versioned_urls(app, auth_client, seeded_cache):
+    import re
+
+    html = auth_client.get("/dashboard?charts=client").get_data(as_text=True)
+    url = re.search(r'/static/js/charts\.js\?v=[0-9a-f]{12}', html).group(0)
+    assert "immutable" in auth_client.get(url).headers["Cache-Control"]
+    assert "immutable" not in auth_client.get("/static/js/charts.js?v=old").headers.get("Cache-Control", "")
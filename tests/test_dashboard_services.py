@@ -0,0 +1,83 @@
+import functools
+
+from app.dashboard import services
+from app.data.analysis import analyze, build_aggregates, render_charts
+from app.data.cache import load_aggregates, load_cache, read_meta, save_cache
+from app.data.pipeline import CACHE_KEY
+
+
+def _get(cache_dir, charts_dir):
+    return services.get_dashboard_data(
+        cache_dir=cache_dir,
+        static_charts_dir=charts_dir,
+        max_age_hours=1,
+        bdl_client_id=None,
+        bdl_base_url="http://bdl.invalid",
+    )
+
+
+def test_warm_requests_reuse_memo_until_cache_is_rewritten(tmp_path, monkeypatch, make_frame):
+    cache_dir, charts_dir = tmp_path / "cache", tmp_path / "static" / "charts"
+    calls = []
+    real = services.build_aggregates
+
+    def counting(df, **kwargs):
+        calls.append(1)
+        return real(df, **kwargs)
+
+    # cache bez agregatów (jak sprzed ich wprowadzenia) – liczone przy pierwszym zapytaniu
+    monkeypatch.setattr(services, "build_aggregates", counting)
+    services.memo.invalidate()
+
+    save_cache(cache_dir, CACHE_KEY, make_frame(rates=[5.0, 6.0, 7.0]), source="test")
+    first = _get(cache_dir, charts_dir)
+    second = _get(cache_dir, charts_dir)
+    assert second["summary"] is first["summary"]
+    assert second["chart_paths"] == first["chart_paths"]
+    assert len(calls) == 1
+
+    save_cache(cache_dir, CACHE_KEY, make_frame(rates=[7.0, 8.0, 9.0]), source="test")
+    third = _get(cache_dir, charts_dir)
+    assert len(calls) == 2
+    assert third["summary"]["avg_unemployment_latest"] == 8.0
+
+
+def test_stored_aggregates_are_served_without_loading_the_dataset(tmp_path, monkeypatch, make_frame):
+    cache_dir, charts_dir = tmp_path / "cache", tmp_path / "static" / "charts"
+    services.memo.invalidate()
+    save_cache(cache_dir, CACHE_KEY, make_frame(rates=[5.0, 6.0, 7.0]), source="test", aggregates=functools.partial(build_aggregates, unit_level=2))
+    assert read_meta(cache_dir, CACHE_KEY).aggregates_file
+    assert load_aggregates(cache_dir, CACHE_KEY)["summary"]["avg_unemployment_latest"] == 6.0
+
+    def fail(*args, **kwargs):
+        raise AssertionError("dataset should not be loaded")
+
+    monkeypatch.setattr(services, "load_or_refresh_dataset", fail)
+    monkeypatch.setattr(services, "build_aggregates", fail)
+    data = _get(cache_dir, charts_dir)
+
+    assert data["tables"]["ranking"]["rows"][0] == ["DOLNOŚLĄSKIE", 7.0, 9000.0]
+    # ramki odtworzone z JSON dają te same (adresowane treścią) PNG co analiza ramki
+    direct = render_charts(analyze(load_cache(cache_dir, CACHE_KEY)), charts_dir)
+    assert data["chart_paths"] == direct
+
+
+def test_chart_rendering_does_not_modify_shared_memo_entry(tmp_path, monkeypatch, make_frame):
+    cache_dir, charts_dir = tmp_path / "cache", tmp_path / "static" / "charts"
+    services.memo.invalidate()
+    save_cache(cache_dir, CACHE_KEY, make_frame(rates=[5.0, 6.0, 7.0]), source="test")
+    data = _get(cache_dir, charts_dir)
+    entry = services.memo.get(data["version"])
+    before = dict(entry)
+
+    calls = []
+    real = services.result_from_aggregates
+    monkeypatch.setattr(services, "result_from_aggregates", lambda agg: calls.append(1) or real(agg))
+    for path in data["chart_paths"].values():
+        (charts_dir.parent / path).unlink()
+    again = _get(cache_dir, charts_dir)
+
+    assert again["chart_paths"] == data["chart_paths"]
+    assert calls == []  # AnalysisResult z analysis_results, nie odtwarzany ponownie
+    assert services.memo.get(data["version"]) == before
+    assert services.rendered_charts.get((*data["version"], str(charts_dir))) == data["chart_paths"]
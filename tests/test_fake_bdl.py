@@ -0,0 +1,33 @@
+import pytest
+
+from app.data import pipeline
+from tests.fake_bdl import FakeBDL, FakeBDLConfig, serve
+
+
+@pytest.mark.parametrize("shape", ["nested", "flat"])
+def test_refresh_against_fake_bdl_with_throttling(tmp_path, shape):
+    bdl = FakeBDL(FakeBDLConfig(units={2: 4, 5: 12, 6: 30}, shape=shape, throttle_every=7))
+    with serve(bdl) as url:
+        df = pipeline.refresh_dataset(
+            tmp_path,
+            None,
+            url,
+            bdl_options={"backoff_base_s": 0.01, "max_workers": 2},
+            dataset_options={"unit_level": 6, "start_year": 2020},
+        )
+
+    assert df["unitId"].nunique() == 30
+    assert sorted(df["year"].unique()) == [2020, 2021, 2022, 2023, 2024]
+    # płace publikowane z opóźnieniem: ostatni rok tylko z bezrobociem
+    assert df.loc[df["year"] == 2024, "avg_wage"].isna().all()
+    assert df["unemployment_rate"].notna().all()
+    assert bdl.throttled > 0  # 429 z Retry-After obsłużone przez klienta
+    assert bdl.requests["/data/by-variable"] >= 2
+
+
+def test_dashboard_cold_refresh_uses_fake_bdl(auth_client, fake_bdl):
+    before = fake_bdl.requests["/data/by-variable"]
+    r = auth_client.get("/dashboard?charts=client")
+    assert r.status_code == 200
+    assert "Raport: rynek pracy" in r.get_data(as_text=True)
+    assert fake_bdl.requests["/data/by-variable"] > before
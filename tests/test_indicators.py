@@ -0,0 +1,85 @@
+import asyncio
+
+import pandas as pd
+import pytest
+
+from app.data import pipeline
+from app.data.indicators import Indicator, parse_indicator_defs, select_indicators
+from tests.fake_bdl import FakeBDL, FakeBDLConfig, serve
+
+OPTIONS = {"unit_level": 2, "start_year": 2020}
+EXTRA = ["job_offers", "employed_per_1000"]
+
+
+@pytest.fixture()
+def bdl():
+    app = FakeBDL(FakeBDLConfig(units={2: 6, 5: 12, 6: 30}))
+    with serve(app) as url:
+        app.url = url
+        yield app
+
+
+def _refresh(bdl, cache_dir, **options):
+    return pipeline.refresh_dataset(cache_dir, None, bdl.url, dataset_options={**OPTIONS, **options})
+
+
+def test_select_indicators_keeps_core_first_and_accepts_custom_defs():
+    defs = '[{"column": "firms", "phrase": "podmioty gospodarki", "name": "podmioty"}]'
+    selected = select_indicators("avg_wage, firms", defs)
+
+    assert [i.column for i in selected] == ["unemployment_rate", "avg_wage", "firms"]
+    assert selected[2].must_name_contains_any == ("podmioty",)
+    with pytest.raises(ValueError):
+        select_indicators(["no_such_indicator"])
+    with pytest.raises(ValueError):
+        parse_indicator_defs([{"column": "x"}])
+    assert pipeline.dataset_key({"indicators": ["avg_wage"]}) == pipeline.CACHE_KEY
+    assert pipeline.dataset_key({"indicators": EXTRA}) != pipeline.CACHE_KEY
+
+
+def test_by_unit_batches_match_by_variable(tmp_path, bdl):
+    by_var = _refresh(bdl, tmp_path / "a", indicators=EXTRA, batch_strategy="by-variable")
+    assert bdl.requests["/data/by-variable"] == 4 and bdl.requests["/data/by-unit"] == 0
+
+    by_unit = _refresh(bdl, tmp_path / "b", indicators=EXTRA, batch_strategy="by-unit")
+    # cztery zmienne w jednym zapytaniu na jednostkę
+    assert bdl.requests["/data/by-variable"] == 4 and bdl.requests["/data/by-unit"] == 6
+
+    assert list(by_unit.columns) == ["year", "unitId", "unitName", "unemployment_rate", "avg_wage", *EXTRA]
+    pd.testing.assert_frame_equal(by_unit, by_var)
+
+
+def test_by_unit_cost_does_not_grow_with_indicators(tmp_path, bdl):
+    _refresh(bdl, tmp_path / "a", batch_strategy="by-unit")
+    two = bdl.requests["/data/by-unit"]
+    _refresh(bdl, tmp_path / "b", indicators=EXTRA, batch_strategy="by-unit")
+
+    assert two == 6
+    assert bdl.requests["/data/by-unit"] - two == two
+
+
+def test_indicators_sharing_a_variable_search_and_fetch_once(tmp_path, bdl):
+    twin = Indicator("unemployment_copy", "stopa bezrobocia rejestrowanego", ("%",), ("stopa",))
+    df = _refresh(bdl, tmp_path, indicators=[twin])
+
+    assert bdl.requests["/variables/search"] == 2
+    assert bdl.requests["/data/by-variable"] == 2
+    assert (df["unemployment_copy"] == df["unemployment_rate"]).all()
+
+
+def test_cost_model_prefers_by_unit_only_for_many_variables():
+    options = {**pipeline.DEFAULT_DATASET_OPTIONS, "unit_level": 2}
+    assert not pipeline._use_by_unit(4, options)
+    assert pipeline._use_by_unit(60, options)
+    assert not pipeline._use_by_unit(40, {**options, "unit_level": 6})
+    assert pipeline._use_by_unit(200, {**options, "unit_level": 6, "max_vars_per_call": 200})
+
+
+def test_async_by_unit_matches_sync(tmp_path, bdl):
+    sync = _refresh(bdl, tmp_path / "a", indicators=EXTRA, batch_strategy="by-unit")
+    df = asyncio.run(
+        pipeline.refresh_dataset_async(
+            tmp_path / "b", None, bdl.url, dataset_options={**OPTIONS, "indicators": EXTRA, "batch_strategy": "by-unit"}
+        )
+    )
+    pd.testing.assert_frame_equal(df, sync)
@@ -0,0 +1,74 @@
+import tempfile
+
+import pytest
+
+from app import create_app, metrics
+from app.extensions import db
+
+
+@pytest.fixture()
+def metrics_client(fake_bdl, tmp_path):
+    class MetricsConfig:
+        SECRET_KEY = "test"
+        TESTING = True
+        WTF_CSRF_ENABLED = False
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'app.sqlite3'}"
+        SQLALCHEMY_TRACK_MODIFICATIONS = False
+        CACHE_DIR = tempfile.mkdtemp(dir=tmp_path)
+        CACHE_MAX_AGE_HOURS = 24
+        BDL_BASE_URL = fake_bdl.url
+        BDL_CLIENT_ID = ""
+        METRICS_ENABLED = True
+
+    metrics.registry.reset()
+    app = create_app(MetricsConfig)
+    with app.app_context():
+        db.create_all()
+    client = app.test_client()
+    client.post("/register", data={"email": "m@test.pl", "password": "password123", "password2": "password123"})
+    client.post("/login", data={"email": "m@test.pl", "password": "password123"})
+    yield client
+    metrics.configure(False)
+    metrics.registry.reset()
+
+
+def test_registry_renders_prometheus_text():
+    reg = metrics.Registry(buckets=(0.1, 1.0))
+    reg.inc("hits_total", result="hit")
+    reg.inc("hits_total", 2, result="hit")
+    reg.observe("stage_duration_seconds", 0.05, stage="analyze")
+    reg.observe("stage_duration_seconds", 0.5, stage="analyze")
+    text = reg.render()
+
+    assert 'hits_total{result="hit"} 3' in text
+    assert "# TYPE stage_duration_seconds histogram" in text
+    assert 'stage_duration_seconds_bucket{stage="analyze",le="0.1"} 1' in text
+    assert 'stage_duration_seconds_bucket{stage="analyze",le="1"} 2' in text
+    assert 'stage_duration_seconds_bucket{stage="analyze",le="+Inf"} 2' in text
+    assert 'stage_duration_seconds_count{stage="analyze"} 2' in text
+
+
+def test_disabled_metrics_are_noops(client):
+    assert not metrics.enabled()
+    assert metrics.stage("x") is metrics.stage("y")  # współdzielony pusty context manager
+    with metrics.stage("x"):
+        metrics.inc("c_total")
+    assert metrics.registry.counter_value("c_total") == 0
+    assert client.get("/metrics").status_code == 404
+    assert "Server-Timing" not in client.get("/health").headers
+
+
+def test_server_timing_and_metrics_endpoint(metrics_client):
+    r = metrics_client.get("/dashboard?charts=client")
+    assert r.status_code == 200
+    timing = r.headers["Server-Timing"]
+    for stage in ("dataset", "bdl_refresh", "aggregates_read", "app"):
+        assert f"{stage};dur=" in timing
+
+    metrics_client.get("/dashboard?charts=client")  # drugi raz: memo
+    body = metrics_client.get("/metrics").get_data(as_text=True)
+    assert 'dataset_cache_lookups_total{result="refresh"} 1' in body
+    assert 'dashboard_memo_lookups_total{result="hit"} 1' in body
+    assert 'bdl_http_request_duration_seconds_count{endpoint="/data/by-variable",status="200"}' in body
+    assert 'stage_duration_seconds_count{stage="normalize"} 2' in body
+    assert 'http_request_duration_seconds_count{endpoint="dashboard.dashboard",method="GET",status="200"} 2' in body
@@ -0,0 +1,35 @@
+import pandas as pd
+import pytest
+
+from app.data.normalize import normalize_pages
+from benchmarks._legacy_normalize import normalize as legacy_normalize
+
+FLAT = [
+    {"unitId": "011200000000", "unitName": " MAŁOPOLSKIE ", "year": 2022, "val": 5.1},
+    {"unitId": "011200000000", "unitName": "MAŁOPOLSKIE", "year": "2023", "val": "4,9"},
+    {"unitId": "020800000000", "unitName": None, "year": 2023, "val": "7 512,50"},
+    {"unitId": "020800000000", "unitName": "nan", "year": None, "val": 1.0},
+    {"unitId": "030200000000", "unitName": "DOLNOŚLĄSKIE", "year": 2023, "val": None},
+]
+
+NESTED = [
+    {"id": "011200000000", "name": "MAŁOPOLSKIE", "values": [{"year": 2022, "val": 5.1, "attrId": 1}, {"year": "2023", "val": "4,9"}]},
+    {"id": "020800000000", "name": "LUBUSKIE", "values": [{"year": 2023, "val": "x"}, None]},
+    {"id": "030200000000", "name": "DOLNOŚLĄSKIE", "values": []},
+]
+
+
+@pytest.mark.parametrize("rows", [FLAT, NESTED], ids=["flat", "nested"])
+def test_streaming_normalize_matches_previous_implementation(rows):
+    # te same wiersze podzielone na strony po 2
+    pages = (rows[i : i + 2] for i in range(0, len(rows), 2))
+    new = normalize_pages(pages, "unemployment_rate")
+    old = legacy_normalize(rows, "unemployment_rate")
+
+    pd.testing.assert_frame_equal(new, old)
+
+
+def test_empty_and_unknown_payloads():
+    for pages in ([], [[]], [[{"foo": 1}]]):
+        out = normalize_pages(pages, "avg_wage")
+        assert out.empty and list(out.columns) == ["year", "unitId", "unitName", "avg_wage"]
@@ -0,0 +1,92 @@
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+
+from app.data import pipeline
+from app.data.bdl_client import BDLVariable
+from app.data.cache import load_cache
+from app.data.partitions import PartitionStore
+from app.data.variables import VariableStore
+
+YEARS = list(range(2015, 2027))
+
+
+def _rows(years, metric_value):
+    return pd.DataFrame(
+        {
+            "year": [y for y in years for _ in range(2)],
+            "unitId": ["011200000000", "020800000000"] * len(years),
+            "unitName": ["MAŁOPOLSKIE", "LUBUSKIE"] * len(years),
+            "unemployment_rate": [metric_value] * (2 * len(years)),
+        }
+    )
+
+
+def test_plan_fetches_missing_years_and_mutable_window(tmp_path):
+    store = PartitionStore(tmp_path)
+    assert store.plan("unemployment_rate", 1, YEARS) == YEARS
+
+    # 2025–2026 jeszcze puste: okno liczy się od 2024, ostatniego roku z danymi
+    store.write("unemployment_rate", 1, YEARS, _rows(range(2015, 2025), 5.0))
+
+    assert store.plan("unemployment_rate", 1, YEARS, mutable_years=2) == [2023, 2024, 2025, 2026]
+    assert store.plan("unemployment_rate", 1, YEARS, mutable_years=0) == [2025, 2026]
+    later = datetime.now(timezone.utc) + timedelta(days=31)
+    assert store.plan("unemployment_rate", 1, YEARS, mutable_years=0, max_age_days=30, now=later) == YEARS
+    assert len(store.assemble("unemployment_rate", 1, YEARS)) == 20
+
+
+class FakeClient:
+    """Udaje BDL: po jednej zmiennej na frazę, 2 województwa na rok, dane do 2024."""
+
+    def __init__(self):
+        self.requested = []
+        self.search_param = None
+
+    def search_variables(self, phrase, page_size=100):
+        if "bezrobocia" in phrase:
+            return [BDLVariable(60270, "Stopa bezrobocia rejestrowanego", "%", 3)]
+        return [BDLVariable(64428, "Przeciętne miesięczne wynagrodzenia brutto", "zł", 3)]
+
+    def iter_data_by_variable(self, var_id, years, unit_level=2, **kwargs):
+        self.requested.append((var_id, list(years)))
+        # jedna strona na rok
+        for y in years:
+            if y <= 2024:
+                yield [
+                    {"unitId": uid, "unitName": name, "year": y, "val": 5.0 if var_id == 60270 else 7000.0}
+                    for uid, name in (("011200000000", "MAŁOPOLSKIE"), ("020800000000", "LUBUSKIE"))
+                ]
+
+
+def test_second_refresh_fetches_only_recent_years(tmp_path, monkeypatch):
+    monkeypatch.setattr(pipeline, "_years_range", lambda start=2015, end=None: list(range(start, 2027)))
+    client = FakeClient()
+
+    first = pipeline._refresh_dataset(client, tmp_path, "parquet", {"mutable_years": 2})
+    client.requested.clear()
+    second = pipeline._refresh_dataset(client, tmp_path, "parquet", {"mutable_years": 2})
+
+    assert sorted(client.requested) == [(60270, [2023, 2024, 2025, 2026]), (64428, [2023, 2024, 2025, 2026])]
+    assert len(first) == len(second) == 20
+    cached = load_cache(tmp_path, pipeline.CACHE_KEY, fmt="parquet")
+    assert cached["avg_wage"].notna().all() and cached["unemployment_rate"].notna().all()
+
+
+def test_variable_resolution_is_persisted_and_overridable(tmp_path, monkeypatch):
+    monkeypatch.setattr(pipeline, "_years_range", lambda start=2015, end=None: list(range(start, 2027)))
+    searches = []
+    client = FakeClient()
+    client.search_param = "search"
+    original = client.search_variables
+    monkeypatch.setattr(client, "search_variables", lambda *a, **kw: searches.append(a[0]) or original(*a, **kw))
+
+    pipeline._refresh_dataset(client, tmp_path, "parquet")
+    assert len(searches) == 2
+    assert VariableStore(tmp_path / "variables.json").search_param == "search"
+
+    searches.clear()
+    pipeline._refresh_dataset(client, tmp_path, "parquet", {"variable_overrides": {"avg_wage": 99}})
+
+    assert searches == []
+    assert {var_id for var_id, _ in client.requested} == {60270, 64428, 99}
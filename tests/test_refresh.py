@@ -0,0 +1,74 @@
+import json
+import threading
+
+import pandas as pd
+
+from app.data import refresh as refresh_mod
+from app.data.cache import save_cache
+from app.data.pipeline import CACHE_KEY, load_or_refresh_dataset
+from app.data.refresh import BackgroundRefresher
+
+UNREACHABLE = "http://127.0.0.1:9/api/v1"
+
+
+def _make_stale(cache_dir):
+    df = pd.DataFrame({"year": [2023], "unitId": ["1"], "unitName": ["A"], "unemployment_rate": [5.0], "avg_wage": [7000.0]})
+    save_cache(cache_dir, CACHE_KEY, df, source="test")
+    meta_path = cache_dir / f"{CACHE_KEY}.meta.json"
+    meta = json.loads(meta_path.read_text(encoding="utf-8"))
+    meta["created_at_iso"] = "2000-01-01T00:00:00+00:00"
+    meta_path.write_text(json.dumps(meta), encoding="utf-8")
+
+
+def test_stale_cache_is_served_and_revalidated_in_background(tmp_path):
+    _make_stale(tmp_path)
+    calls = []
+
+    df = load_or_refresh_dataset(
+        tmp_path, max_age_hours=1, bdl_client_id=None, bdl_base_url=UNREACHABLE, revalidate=lambda: calls.append(1)
+    )
+
+    assert len(df) == 1
+    assert calls == [1]
+
+
+def test_stale_cache_is_served_when_bdl_is_down(tmp_path):
+    _make_stale(tmp_path)
+
+    df = load_or_refresh_dataset(
+        tmp_path, max_age_hours=1, bdl_client_id=None, bdl_base_url=UNREACHABLE,
+        bdl_options={"max_retries": 0, "timeout_s": 1.0},
+    )
+
+    assert df["unitName"].tolist() == ["A"]
+
+
+def test_refresher_runs_single_flight_and_reports_status(tmp_path, monkeypatch):
+    release = threading.Event()
+    calls = []
+
+    def fake_refresh(**kwargs):
+        calls.append(kwargs["cache_dir"])
+        release.wait(5)
+
+    monkeypatch.setattr(refresh_mod, "refresh_dataset", fake_refresh)
+    r = BackgroundRefresher(tmp_path, max_age_hours=1, bdl_client_id=None, bdl_base_url=UNREACHABLE)
+
+    assert r.trigger() is True
+    assert r.trigger() is False
+    assert r.health()["refresh"]["running"] is True
+    release.set()
+    r.wait(5)
+
+    status = r.health()
+    assert calls == [tmp_path]
+    assert status["refresh"]["running"] is False
+    assert status["refresh"]["refresh_count"] == 1
+    assert status["cache_fresh"] is False
+
+
+def test_health_exposes_freshness(client):
+    body = client.get("/health").json
+    assert body["status"] == "ok"
+    assert body["data"]["cache_fresh"] is False
+    assert body["data"]["refresh"]["last_error"] is None
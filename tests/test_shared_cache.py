@@ -0,0 +1,132 @@
+import time
+
+import pytest
+
+from app.data import charts, pipeline
+from app.data.analysis import analyze, build_aggregates, render_charts
+from app.data.cache import (
+    CacheBackend,
+    CacheLockTimeout,
+    LocalDiskBackend,
+    RedisBackend,
+    SQLiteBackend,
+    configure_shared_cache,
+    load_aggregates,
+    save_cache,
+)
+
+
+@pytest.fixture(params=["disk", "sqlite", "redis"])
+def backend(request, tmp_path):
+    if request.param == "disk":
+        return LocalDiskBackend(tmp_path / "shared")
+    if request.param == "sqlite":
+        return SQLiteBackend(tmp_path / "shared.db")
+    fakeredis = pytest.importorskip("fakeredis")
+    return RedisBackend(client=fakeredis.FakeRedis())
+
+
+@pytest.fixture()
+def shared(tmp_path):
+    cache = configure_shared_cache(None, backend=SQLiteBackend(tmp_path / "shared.db"))
+    yield cache
+    configure_shared_cache(None)
+
+
+def test_backend_get_set_add_and_ttl(backend):
+    assert backend.get("a") is None
+    backend.set("a", b"1")
+    assert backend.get("a") == b"1"
+
+    assert backend.add("lock", b"x", ttl_s=60)
+    assert not backend.add("lock", b"y", ttl_s=60)
+    backend.delete("lock")
+    assert backend.add("lock", b"y", ttl_s=0.05)
+    time.sleep(0.1)
+    assert backend.get("lock") is None
+    assert backend.add("lock", b"z", ttl_s=60)  # wygasła blokada nie blokuje
+
+
+def test_backend_delete_if_and_renew_only_for_owner(backend):
+    assert backend.add("lock", b"mine", ttl_s=0.2)
+    assert not backend.delete_if("lock", b"other")
+    assert backend.renew("lock", b"mine", ttl_s=60)
+    assert not backend.renew("lock", b"other", ttl_s=60)
+    time.sleep(0.3)
+    assert backend.get("lock") == b"mine"  # przedłużona
+
+    assert backend.delete_if("lock", b"mine")
+    assert backend.get("lock") is None
+    # blokada po wygaśnięciu przejęta przez inną replikę – stary właściciel jej nie zdejmie
+    assert backend.add("lock", b"old", ttl_s=0.05)
+    time.sleep(0.1)
+    assert backend.add("lock", b"new", ttl_s=60)
+    assert not backend.delete_if("lock", b"old")
+    assert not backend.renew("lock", b"old", ttl_s=60)
+    assert backend.get("lock") == b"new"
+
+
+def test_disk_add_treats_incomplete_lock_file_as_held(tmp_path):
+    backend = LocalDiskBackend(tmp_path / "shared")
+    backend._path("lock").touch()  # inna replika utworzyła plik, treść jeszcze niezapisana
+    assert not backend.add("lock", b"mine", ttl_s=60)
+    assert backend._path("lock").read_bytes() == b""
+
+
+def test_shared_lock_heartbeat_outlives_ttl(tmp_path):
+    backend = SQLiteBackend(tmp_path / "shared.db")
+    cache = configure_shared_cache(None, backend=backend, lock_ttl_s=0.15)
+    try:
+        with cache.lock("k", timeout_s=0):
+            time.sleep(0.5)  # ponad trzy TTL – heartbeat przedłuża blokadę
+            with pytest.raises(CacheLockTimeout):
+                with cache.lock("k", timeout_s=0):
+                    pass
+        assert backend.get("bdl:lock:k") is None
+    finally:
+        configure_shared_cache(None)
+
+
+def test_incomplete_backend_fails_on_instantiation():
+    class GetOnly(CacheBackend):
+        def get(self, name):
+            return None
+
+    with pytest.raises(TypeError):
+        GetOnly()
+
+
+def test_second_replica_uses_shared_dataset_instead_of_bdl(tmp_path, shared, monkeypatch, make_frame):
+    calls = []
+
+    def fake_refresh(client, cache_dir, cache_format=None, dataset_options=None):
+        calls.append(cache_dir)
+        df = make_frame(rates=[4.5, 5.5], wages=[7500.0, 8500.0])
+        save_cache(cache_dir, pipeline.CACHE_KEY, df, source="test", fmt=cache_format, aggregates=build_aggregates)
+        return df
+
+    monkeypatch.setattr(pipeline, "_refresh_dataset", fake_refresh)
+    replica_a, replica_b = tmp_path / "a", tmp_path / "b"
+    kwargs = dict(max_age_hours=1, bdl_client_id=None, bdl_base_url="http://bdl.invalid", cache_format="parquet")
+
+    first = pipeline.load_or_refresh_dataset(cache_dir=replica_a, **kwargs)
+    second = pipeline.load_or_refresh_dataset(cache_dir=replica_b, **kwargs)
+
+    assert calls == [replica_a]
+    assert second["unemployment_rate"].tolist() == first["unemployment_rate"].tolist()
+    assert load_aggregates(replica_b, pipeline.CACHE_KEY)["summary"]["avg_unemployment_latest"] == 5.0
+
+
+def test_charts_rendered_once_across_replicas(tmp_path, shared, monkeypatch, make_frame):
+    result = analyze(make_frame(rates=[4.5, 5.5], wages=[7500.0, 8500.0]))
+    renderer = charts.ChartRenderer(mode="inline")
+    first = render_charts(result, tmp_path / "a" / "charts", renderer)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("chart should come from the shared cache")
+
+    monkeypatch.setattr(charts, "_render_job", fail)
+    second = render_charts(result, tmp_path / "b" / "charts", renderer)
+
+    assert second == first
+    assert all((tmp_path / "b" / p).exists() for p in second.values())
@@ -0,0 +1,40 @@
+import sqlalchemy as sa
+
+from app.extensions import db
+from app.startup import HEAVY_MODULES, measure_startup, parse_importtime
+
+SAMPLE = """\
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 |     pandas._libs
+import time:      3000 |       3120 |   pandas
+import time:       500 |       3620 | app.data.analysis
+import time:        80 |         80 | app.lazy
+"""
+
+
+def test_parse_importtime():
+    timings = parse_importtime(SAMPLE)
+
+    assert [(t.module, t.depth) for t in timings] == [
+        ("pandas._libs", 2),
+        ("pandas", 1),
+        ("app.data.analysis", 0),
+        ("app.lazy", 0),
+    ]
+    assert timings[2].cumulative_us == 3620
+
+
+def test_create_app_does_not_import_heavy_modules(tmp_path):
+    report = measure_startup(env={"DATABASE_URL": f"sqlite:///{tmp_path / 'app.sqlite3'}", "DB_AUTO_CREATE": "0"})
+
+    assert report.heavy_loaded == [], f"loaded at startup: {report.heavy_loaded} (expected none of {HEAVY_MODULES})"
+    assert report.create_app_s > 0
+    assert "app" in dict(report.packages(top=50))
+
+
+def test_init_db_creates_schema(app):
+    db.drop_all()
+    result = app.test_cli_runner().invoke(args=["init-db"])
+
+    assert result.exit_code == 0, result.output
+    assert "user" in sa.inspect(db.engine).get_table_names()